@@ -1,7 +1,7 @@
 import os
-import pprint
 import argparse
-import requests
+
+from O1A_assessment.client import O1AClient
 
 
 def parse_arguments():
@@ -17,18 +17,14 @@ def call_fastapi_service(
         url="http://your-remote-server-url:8000/process", 
     ):
     assert os.path.isfile(file_path)
-    files = {'file': open(file_path, 'rb')}
-    data={
-      "filename": file_path ,
-      "type" : "multipart/form-data"
-    }, 
-    response = requests.post(url, files=files, data=data)
-    
-    if response.status_code == 200:
-        output = response.json()
-        print(output['result']['content'])
-    else:
-        print(f"Error: {response.status_code}, {response.text}")
+    # NOTE: see client.py for concurrent submission (O1AClient.assess_many / AsyncO1AClient), jobs and streaming
+    base_url = url[:-len("/process")] if url.rstrip("/").endswith("/process") else url
+    with O1AClient(base_url) as client:
+        try:
+            output = client.assess(file_path)
+            print(output['result']['content'])
+        except Exception as e:
+            print(f"Error: {e}")
 
 
 if __name__ == "__main__":
@@ -36,4 +32,4 @@ if __name__ == "__main__":
     print("Parsed Arguments:")
     for key, value in vars(args).items():
         print(f"   {key}: {value}")
-    call_fastapi_service(file_path=args.input_resume_path, url=args.url)
\ No newline at end of file
+    call_fastapi_service(file_path=args.input_resume_path, url=args.url)
@@ -1,12 +1,120 @@
+import json
 import argparse
-from fastapi import FastAPI, File, UploadFile, Depends
+import asyncio
+import contextlib
+import functools
+from typing import Optional
+from fastapi import FastAPI, File, Form, UploadFile, Depends, HTTPException
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
+from fastapi.concurrency import run_in_threadpool
 import os
 import shutil
 import uvicorn
 from O1A_assessment.utils.uuid import create_unique_id
-from O1A_assessment.inference.workflows import workflows_fn
+from O1A_assessment.utils.job_store import JobStore
+from O1A_assessment.utils.job_queue import JobQueue
+from O1A_assessment.utils.result_cache import ResultCache, hash_file, hash_bytes, make_cache_key
+from O1A_assessment.utils.result_store import create_result_store, RESULT_STORE_BACKENDS
+from O1A_assessment.utils.preprocess_resume_pdf import pdf_bytes_to_text, PDFLimitError
+from O1A_assessment.utils.judgement_cache import configure_judgement_cache
+from O1A_assessment.utils.llm_concurrency import configure_llm_controller, get_llm_controller, parse_model_limits
+from O1A_assessment.utils.tail_latency import configure_tail_latency
+from O1A_assessment.utils import item_prefilter
+from O1A_assessment.utils.get_O1A_knowledge import get_O1A_definitions_fingerprint
+from O1A_assessment.utils.metrics import Counter, Gauge, render_prometheus, time_stage
+from O1A_assessment.inference.workflows import workflows_fn, workflows_fn_async, workflows_fn_stream, workflows_llm_names
+from O1A_assessment.inference.baseline import export_workflow_output, is_degraded_entry
+from O1A_assessment.inference.incremental import incremental_fn_async, incremental_stream_fn, check_incremental_workflow
 
-app = FastAPI()
+job_queue = None
+result_cache = None
+result_store = None
+persist_tasks = set() # NOTE: keeps background upload writes alive until they finish
+
+# NOTE: refreshed from the queue / cache on every scrape of /metrics
+JOB_QUEUE_DEPTH = Gauge("o1a_job_queue_depth", "Number of jobs waiting in the job queue.")
+JOB_QUEUE_WORKERS = Gauge("o1a_job_queue_workers", "Number of job queue workers.")
+RESULT_CACHE_LOOKUPS = Counter("o1a_result_cache_lookups_total", "Number of result cache lookups by outcome.")
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    global job_queue, result_cache, result_store
+    configure_llm_controller(model_limits=parse_model_limits(args.llm_rate_limits), max_concurrency=args.llm_max_concurrency)
+    configure_tail_latency(
+        extraction_deadline=args.extraction_deadline_seconds,
+        judging_deadline=args.judging_deadline_seconds,
+        hedging=args.hedge_judge_calls,
+        percentile=args.hedge_percentile,
+    )
+    item_prefilter.configure_prefilter(enabled=not args.disable_prefilter)
+    if not args.disable_judgement_cache:
+        configure_judgement_cache(
+            db_path=args.judgement_cache_path or os.path.join(args.output_dir, "judgement_cache.sqlite3"),
+            max_entries=args.judgement_cache_max_entries,
+        )
+    if not args.disable_result_cache:
+        result_cache = ResultCache(
+            db_path=args.result_cache_path or os.path.join(args.output_dir, "result_cache.sqlite3"),
+            max_entries=args.result_cache_max_entries,
+            max_bytes=args.result_cache_max_mb*(1<<20),
+            max_age_seconds=args.result_cache_max_age_hours*3600,
+        )
+    if not args.disable_result_store:
+        result_store = create_result_store(
+            backend=args.result_store_backend,
+            db_path=args.result_store_path or os.path.join(args.output_dir, "result_store.sqlite3"),
+            max_age_seconds=None if args.result_retention_days is None else args.result_retention_days*24*3600,
+            max_entries=args.result_retention_max_entries,
+            remove_run_dirs=args.remove_expired_run_dirs,
+        )
+    job_db_path = args.job_db_path or os.path.join(args.output_dir, "jobs.sqlite3")
+    job_queue = JobQueue(
+        job_store=JobStore(job_db_path),
+        run_fn=run_workflow,
+        num_workers=args.num_workers,
+        max_queue_size=args.max_queue_size,
+    )
+    await job_queue.start()
+    yield
+    await job_queue.stop()
+    if persist_tasks:
+        await asyncio.gather(*persist_tasks, return_exceptions=True)
+    if result_store is not None:
+        await run_in_threadpool(result_store.close)
+
+class UploadSizeLimitMiddleware:
+    """Answers 413 to in-memory uploads whose request body exceeds `--max_upload_mb`, before the multipart parser reads it.
+
+    Starlette parses the whole multipart body (spooling files above 1 MB to a temp file) before the route runs,
+    so the limit is enforced on `Content-Length` and, for chunked bodies, while the body is received.
+    """
+    paths = ["/process", "/process/stream"]
+    multipart_overhead_bytes = 64*1024 # NOTE: boundaries, part headers and small form fields around the PDF
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"]!="http" or scope["method"]!="POST" or scope["path"] not in self.paths or not args.in_memory_uploads:
+            return await self.app(scope, receive, send)
+        max_body_bytes = int(args.max_upload_mb*(1<<20)) + self.multipart_overhead_bytes
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > max_body_bytes:
+            response = JSONResponse({"detail": f"Upload exceeds {args.max_upload_mb} MB"}, status_code=413)
+            return await response(scope, receive, send)
+        received_bytes = 0
+
+        async def limited_receive():
+            nonlocal received_bytes
+            message = await receive()
+            received_bytes += len(message.get("body", b""))
+            if received_bytes > max_body_bytes:
+                raise HTTPException(status_code=413, detail=f"Upload exceeds {args.max_upload_mb} MB")
+            return message
+        return await self.app(scope, limited_receive, send)
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(UploadSizeLimitMiddleware)
 
 def parse_arguments():
     parser = argparse.ArgumentParser(description='FastAPI Server for O-1A assessment.')
@@ -14,32 +122,300 @@ def parse_arguments():
     parser.add_argument('--port', type=int, default=8000, help='Port to run the FastAPI server on')
     parser.add_argument('--output_dir', type=str, default="./results", help='directory path to store results')
     parser.add_argument('--workflow_version', type=str, default="default", help='which version of workflow to execute')
+    parser.add_argument('--num_workers', type=int, default=4, help='number of workers executing queued jobs')
+    parser.add_argument('--max_queue_size', type=int, default=64, help='max number of queued jobs before answering 429')
+    parser.add_argument('--job_db_path', type=str, default=None, help='path to SQLite job store (default: <output_dir>/jobs.sqlite3)')
+    parser.add_argument('--in_memory_uploads', action='store_true', help='parse uploads of /process and /process/stream from memory instead of saving them first; no run directory is written')
+    parser.add_argument('--persist_uploads', action='store_true', help='with --in_memory_uploads, still write the run directory: the original PDF (in the background) and workflows_output.jsonl')
+    parser.add_argument('--max_upload_mb', type=float, default=20, help='max size of an uploaded PDF in MB')
+    parser.add_argument('--max_pdf_pages', type=int, default=50, help='max number of pages of an uploaded PDF')
+    parser.add_argument('--disable_result_cache', action='store_true', help='always execute the workflow, even for previously seen PDFs')
+    parser.add_argument('--result_cache_path', type=str, default=None, help='path to SQLite result cache (default: <output_dir>/result_cache.sqlite3)')
+    parser.add_argument('--result_cache_max_entries', type=int, default=10000, help='max number of cached assessments')
+    parser.add_argument('--result_cache_max_mb', type=int, default=512, help='max size of cached assessments in MB')
+    parser.add_argument('--result_cache_max_age_hours', type=float, default=24*30, help='max age of a cached assessment in hours')
+    parser.add_argument('--disable_result_store', action='store_true', help='do not index finished assessments')
+    parser.add_argument('--result_store_backend', type=str, default="sqlite", choices=list(RESULT_STORE_BACKENDS), help='result store backend')
+    parser.add_argument('--result_store_path', type=str, default=None, help='path to SQLite result store (default: <output_dir>/result_store.sqlite3)')
+    parser.add_argument('--result_retention_days', type=float, default=None, help='drop indexed assessments older than this (default: keep)')
+    parser.add_argument('--result_retention_max_entries', type=int, default=None, help='keep at most this many indexed assessments (default: no limit)')
+    parser.add_argument('--remove_expired_run_dirs', action='store_true', help='also delete the run directory of expired assessments')
+    parser.add_argument('--disable_prefilter', action='store_true', help='send every extracted item to the LLM judge, without local rejection or duplicate merging')
+    parser.add_argument('--disable_judgement_cache', action='store_true', help='always call the LLM for per-item judgements')
+    parser.add_argument('--judgement_cache_path', type=str, default=None, help='path to SQLite judgement cache shared by all workers (default: <output_dir>/judgement_cache.sqlite3)')
+    parser.add_argument('--judgement_cache_max_entries', type=int, default=100000, help='max number of cached judgements (LRU eviction)')
+    parser.add_argument('--llm_rate_limits', type=str, default=None, help='per-model budgets as JSON or path to a JSON file, e.g. {"gpt-4o-mini": {"requests_per_minute": 500, "tokens_per_minute": 200000}}')
+    parser.add_argument('--llm_max_concurrency', type=int, default=None, help='cap on the adaptive number of concurrent LLM calls per model')
+    parser.add_argument('--extraction_deadline_seconds', type=float, default=None, help='extraction chains still running after this are dropped (default: no deadline)')
+    parser.add_argument('--judging_deadline_seconds', type=float, default=None, help='items not judged this long after judging started are marked "More information needed" (default: no deadline)')
+    parser.add_argument('--hedge_judge_calls', action='store_true', help='send a duplicate judge call when one is slower than --hedge_percentile of recent calls')
+    parser.add_argument('--hedge_percentile', type=float, default=95, help='latency percentile after which a judge call is hedged')
     return parser.parse_args()
 
+def save_upload(src_file, file_path):
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "wb") as buffer:
+        shutil.copyfileobj(src_file, buffer)
+    return file_path
+
+def persist_upload_in_background(pdf_bytes, file_path):
+    def write_upload():
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as buffer:
+            buffer.write(pdf_bytes)
+        print(f"File saved to: {file_path}")
+    task = asyncio.create_task(run_in_threadpool(write_upload))
+    persist_tasks.add(task)
+    task.add_done_callback(persist_tasks.discard)
+
+async def read_upload_in_memory(file):
+    # NOTE: the body was already parsed by Starlette (oversized requests are stopped earlier by UploadSizeLimitMiddleware);
+    # this is the exact check on the PDF bytes
+    max_bytes = int(args.max_upload_mb*(1<<20))
+    pdf_bytes = await file.read(max_bytes+1)
+    if len(pdf_bytes) > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds {args.max_upload_mb} MB")
+    try:
+        with time_stage("preprocess_pdf"):
+            pdf_text = await run_in_threadpool(pdf_bytes_to_text, pdf_bytes, max_bytes=max_bytes, max_pages=args.max_pdf_pages)
+    except PDFLimitError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not read PDF: {e}")
+    return pdf_bytes, pdf_text
+
+async def receive_upload(file, task_dir):
+    # returns (file_path, pdf_text, file_hash); pdf_text/file_hash are None when the upload was saved to disk
+    file_path = os.path.join(task_dir, file.filename)
+    if not args.in_memory_uploads:
+        await run_in_threadpool(save_upload, file.file, file_path)
+        print(f"File saved to: {file_path}")
+        return file_path, None, None
+    pdf_bytes, pdf_text = await read_upload_in_memory(file)
+    if args.persist_uploads:
+        persist_upload_in_background(pdf_bytes, file_path)
+    else:
+        file_path = None
+    return file_path, pdf_text, hash_bytes(pdf_bytes)
+
+def get_run_output_dir(task_dir):
+    # NOTE: in-memory uploads write no run directory unless --persist_uploads; the entry is kept in the result store/cache only
+    return None if args.in_memory_uploads and not args.persist_uploads else task_dir
+
+async def load_previous_run(previous_run_id, workflow_version):
+    # NOTE: incremental re-assessment diffs against a run kept in the result store, assessed with the same workflow
+    if result_store is None:
+        raise HTTPException(status_code=400, detail="Incremental re-assessment needs the result store")
+    previous_run = await run_in_threadpool(result_store.get, previous_run_id, True)
+    if previous_run is None:
+        raise HTTPException(status_code=404, detail=f"Unknown run: {previous_run_id}")
+    error = check_incremental_workflow(previous_run, workflow_version)
+    if error is not None:
+        raise HTTPException(status_code=400, detail=error)
+    return previous_run
+
+async def run_workflow_uncached(workflow_version, input_file_path, output_dir, pdf_text=None, previous_run=None):
+    if previous_run is not None:
+        return await incremental_fn_async(previous_run, input_file_path = input_file_path, output_dir = output_dir, pdf_text = pdf_text, workflow_version = workflow_version)
+    # NOTE: prefer async-native workflows; fall back to a worker thread so the event loop is never blocked.
+    if workflow_version in workflows_fn_async:
+        return await workflows_fn_async[workflow_version](input_file_path = input_file_path, output_dir = output_dir, pdf_text = pdf_text)
+    return await run_in_threadpool(workflows_fn[workflow_version], input_file_path = input_file_path, output_dir = output_dir, pdf_text = pdf_text)
+
+def make_result_cache_key(file_hash, workflow_version):
+    return make_cache_key(
+        file_hash,
+        workflow_version,
+        workflows_llm_names.get(workflow_version, []),
+        get_O1A_definitions_fingerprint(),
+        item_prefilter.prefilter_enabled,
+    )
+
+async def record_run(output_dir, entry, file_hash, run_id=None):
+    # NOTE: output_dir is <output_dir>/<run_id>/<workflow_version>, or None (no run directory, `run_id` given)
+    run_dir = None if output_dir is None else os.path.dirname(os.path.abspath(output_dir))
+    run_id = run_id or os.path.basename(run_dir)
+    await run_in_threadpool(result_store.put, run_id, entry, content_hash=file_hash, run_dir=run_dir)
+    return run_id
+
+async def run_workflow(workflow_version, input_file_path, output_dir, pdf_text=None, file_hash=None, previous_run=None, run_id=None):
+    if result_cache is None and result_store is None:
+        result = await run_workflow_uncached(workflow_version, input_file_path, output_dir, pdf_text=pdf_text)
+        return {"content": result["content"]}
+
+    async def run_and_load():
+        result = await run_workflow_uncached(workflow_version, input_file_path, output_dir, pdf_text=pdf_text, previous_run=previous_run)
+        return result["entry"]
+
+    if file_hash is None:
+        file_hash = await run_in_threadpool(hash_file, input_file_path)
+    result = {}
+    # NOTE: incremental runs bypass the result cache, they already reuse the previous run
+    if result_cache is None or previous_run is not None:
+        entry = await run_and_load()
+    else:
+        key = make_result_cache_key(file_hash, workflow_version)
+        entry, result["cache"] = await result_cache.get_or_run(key, run_and_load, should_store=lambda entry: not is_degraded_entry(entry))
+        if result["cache"]!="miss" and output_dir is not None:
+            print(f"Result cache {result['cache']}: {key}")
+            await run_in_threadpool(export_workflow_output, output_dir, entry)
+    if result_store is not None:
+        result["run_id"] = await record_run(output_dir, entry, file_hash, run_id)
+    return {"content": entry["final_summary"], **result}
+
 @app.post("/process")
 async def process_file(
     file: UploadFile = File(...), 
+    previous_run_id: Optional[str] = Form(None),
     output_dir: str = Depends(lambda: args.output_dir),
     workflow_version: str = Depends(lambda: args.workflow_version)
   ):
+    # Look up the previous run of an incremental re-assessment
+    previous_run = None if previous_run_id is None else await load_previous_run(previous_run_id, workflow_version)
+
     # Validate output directory
-    task_dir = os.path.join(output_dir, create_unique_id(), workflow_version)
-    os.makedirs(task_dir, exist_ok=True)
+    run_id = create_unique_id()
+    task_dir = os.path.join(output_dir, run_id, workflow_version)
 
-    # Save the uploaded file
-    file_path = os.path.join(task_dir, file.filename)
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Save the uploaded file (worker thread), or parse it in memory
+    file_path, pdf_text, file_hash = await receive_upload(file, task_dir)
 
     # Process the file
-    print(f"File saved to: {file_path}")
     print(f"Executing: {workflow_version} workflow")
-    result = workflows_fn[workflow_version](input_file_path = file_path, output_dir = task_dir)
+    result = await run_workflow(workflow_version, input_file_path = file_path, output_dir = get_run_output_dir(task_dir), pdf_text = pdf_text, file_hash = file_hash, previous_run = previous_run, run_id = run_id)
     print(f"Finished {workflow_version} workflow")
 
     # Return a success message
     return {"message": "Processing complete", "file_path": file_path, "result":result}
 
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/process/stream")
+async def process_file_stream(
+    file: UploadFile = File(...), 
+    previous_run_id: Optional[str] = Form(None),
+    output_dir: str = Depends(lambda: args.output_dir),
+    workflow_version: str = Depends(lambda: args.workflow_version)
+  ):
+    if workflow_version not in workflows_fn_stream:
+        raise HTTPException(status_code=400, detail=f"Workflow {workflow_version} does not support streaming")
+    previous_run = None if previous_run_id is None else await load_previous_run(previous_run_id, workflow_version)
+    stream_fn = workflows_fn_stream[workflow_version] if previous_run is None else functools.partial(incremental_stream_fn, previous_run, workflow_version=workflow_version)
+    run_id = create_unique_id()
+    task_dir = os.path.join(output_dir, run_id, workflow_version)
+
+    # Save the uploaded file (worker thread), or parse it in memory
+    file_path, pdf_text, file_hash = await receive_upload(file, task_dir)
+
+    # Stream server-sent events: extraction -> judgement (one per item) -> summary
+    async def event_stream():
+        yield format_sse("started", {"file_path": file_path, "workflow_version": workflow_version})
+        try:
+            entry = None
+            async for event, data in stream_fn(input_file_path = file_path, output_dir = get_run_output_dir(task_dir), pdf_text = pdf_text):
+                if event=="entry":
+                    entry = data
+                    continue
+                yield format_sse(event, data)
+            if result_store is not None:
+                await record_run(get_run_output_dir(task_dir), entry, file_hash or await run_in_threadpool(hash_file, file_path), run_id)
+        except Exception as e:
+            print(f"Streaming {workflow_version} workflow failed: {e!r}")
+            yield format_sse("error", {"detail": repr(e)})
+        print(f"Finished {workflow_version} workflow")
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/jobs", status_code=202)
+async def submit_job(
+    file: UploadFile = File(...), 
+    output_dir: str = Depends(lambda: args.output_dir),
+    workflow_version: str = Depends(lambda: args.workflow_version)
+  ):
+    if job_queue.full():
+        raise HTTPException(status_code=429, detail="Job queue is full", headers={"Retry-After": str(job_queue.retry_after())})
+
+    # Save the uploaded file (worker thread)
+    job_id = create_unique_id()
+    task_dir = os.path.join(output_dir, job_id, workflow_version)
+    file_path = os.path.join(task_dir, file.filename)
+    await run_in_threadpool(save_upload, file.file, file_path)
+    await run_in_threadpool(job_queue.job_store.create_job, job_id, workflow_version, file_path, task_dir)
+
+    # Enqueue (the queue may have filled up while saving)
+    try:
+        job_queue.submit(job_id)
+    except asyncio.QueueFull:
+        await run_in_threadpool(job_queue.job_store.update_job, job_id, "rejected", error="Job queue is full")
+        # NOTE: a rejected job never runs, so its saved upload (<output_dir>/<job_id>/) is removed
+        await run_in_threadpool(shutil.rmtree, os.path.dirname(task_dir), ignore_errors=True)
+        raise HTTPException(status_code=429, detail="Job queue is full", headers={"Retry-After": str(job_queue.retry_after())})
+    print(f"Queued job {job_id} ({job_queue.depth()} in queue)")
+    return {"message": "Job queued", "job_id": job_id, "status": "queued"}
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await run_in_threadpool(job_queue.job_store.get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "workflow_version": job["workflow_version"],
+        "file_path": job["file_path"],
+        "result": job["result"],
+        "error": job["error"],
+    }
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    if result_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **(await run_in_threadpool(result_cache.stats))}
+
+@app.get("/llm/limits")
+async def get_llm_limits():
+    return get_llm_controller().stats()
+
+@app.get("/results/{run_id}")
+async def get_result(run_id: str, include_contents: bool = True):
+    if result_store is None:
+        raise HTTPException(status_code=404, detail="Result store is disabled")
+    result = await run_in_threadpool(result_store.get, run_id, include_contents)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Unknown run: {run_id}")
+    return result
+
+@app.get("/results")
+async def list_results(
+    workflow: Optional[str] = None,
+    rating: Optional[str] = None,
+    content_hash: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    limit: int = 50,
+    offset: int = 0,
+  ):
+    if result_store is None:
+        raise HTTPException(status_code=404, detail="Result store is disabled")
+    runs = await run_in_threadpool(
+        result_store.list, workflow=workflow, rating=rating, content_hash=content_hash,
+        since=since, until=until, limit=min(limit, 500), offset=offset,
+    )
+    return {"runs": runs, "limit": min(limit, 500), "offset": offset}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    if job_queue is not None:
+        JOB_QUEUE_DEPTH.set(job_queue.depth())
+        JOB_QUEUE_WORKERS.set(job_queue.num_workers)
+    if result_cache is not None:
+        for status in ["hit", "miss", "coalesced"]:
+            RESULT_CACHE_LOOKUPS.set(result_cache.counters[status], status=status)
+    lines = JOB_QUEUE_DEPTH.render() + JOB_QUEUE_WORKERS.render() + RESULT_CACHE_LOOKUPS.render()
+    return render_prometheus() + "\n".join(lines) + "\n"
+
 if __name__ == "__main__":
     args = parse_arguments()
     uvicorn.run(app, host=args.host, port=args.port)
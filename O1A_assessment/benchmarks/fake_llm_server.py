@@ -0,0 +1,175 @@
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# NOTE: verdicts returned for `structured_judgement`, drawn uniformly
+FAKE_VERDICTS = ["Pass", "Reject", "More information needed"]
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='OpenAI-compatible stand-in server returning structured outputs for the O-1A workflows.')
+    parser.add_argument('--host', type=str, default="127.0.0.1", help='host to listen on')
+    parser.add_argument('--port', type=int, default=9999, help='port to listen on')
+    parser.add_argument('--latency_ms', type=float, default=500, help='base latency of every response')
+    parser.add_argument('--jitter_ms', type=float, default=200, help='extra latency, uniform in [0, jitter_ms]')
+    parser.add_argument('--slow_rate', type=float, default=0.0, help='fraction of requests with --slow_ms extra latency (a latency tail, e.g. for hedging)')
+    parser.add_argument('--slow_ms', type=float, default=5000, help='extra latency of slow requests')
+    parser.add_argument('--error_rate', type=float, default=0.0, help='fraction of requests answered with 500')
+    parser.add_argument('--rate_limit_rate', type=float, default=0.0, help='fraction of requests answered with 429')
+    parser.add_argument('--items_per_list', type=int, default=2, help='number of items extracted per criterion')
+    parser.add_argument('--seed', type=int, default=None, help='random seed')
+    return parser.parse_args()
+
+
+class FakeLLMConfig:
+    def __init__(self, latency_ms=500, jitter_ms=200, slow_rate=0.0, slow_ms=5000, error_rate=0.0, rate_limit_rate=0.0, items_per_list=2, seed=None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.items_per_list = items_per_list
+        self.random = random.Random(seed)
+        self.counters = {"requests": 0, "ok": 0, "errors": 0, "rate_limited": 0}
+        self.lock = threading.Lock()
+
+    def count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
+
+
+def fill_schema(schema, definitions, config, field_name=None, num_items=None):
+    # a value valid for the JSON schema of a structured output
+    if "$ref" in schema:
+        return fill_schema(definitions[schema["$ref"].split("/")[-1]], definitions, config, field_name, num_items)
+    if "allOf" in schema:
+        return fill_schema(schema["allOf"][0], definitions, config, field_name, num_items)
+    schema_type = schema.get("type")
+    if schema_type=="object":
+        return {key: fill_schema(value, definitions, config, key, num_items) for key, value in schema.get("properties", {}).items()}
+    if schema_type=="array":
+        if field_name=="judgements" and num_items is not None:
+            items = [fill_schema(schema["items"], definitions, config, None, num_items) for _ in range(num_items)]
+            for index, item in enumerate(items):
+                item["index"] = index
+            return items
+        return [f"{field_name} item {config.random.randint(0, 9)} ({config.random.randint(2000, 2024)})" for _ in range(config.items_per_list)]
+    if schema_type=="integer":
+        return 0
+    if schema_type=="number":
+        return round(config.random.random(), 2) if field_name=="confidence" else 0.5
+    if schema_type=="boolean":
+        return True
+    if field_name=="verdict":
+        return config.random.choice(FAKE_VERDICTS)
+    return f"Fake {field_name or 'text'}."
+
+
+def count_batch_items(messages):
+    # batched judge calls send {"user contents": [{"index": ..., "content": ...}, ...]}
+    try:
+        return len(json.loads(messages[-1]["content"])["user contents"])
+    except (KeyError, TypeError, ValueError, IndexError):
+        return None
+
+
+def make_completion(body, config):
+    messages = body.get("messages", [])
+    tool = body["tools"][0]["function"]
+    parameters = tool["parameters"]
+    arguments = fill_schema(parameters, parameters.get("definitions", parameters.get("$defs", {})), config, num_items=count_batch_items(messages))
+    prompt_tokens = sum(len(str(message.get("content", ""))) for message in messages)//4 + len(json.dumps(body["tools"]))//4
+    completion_tokens = len(json.dumps(arguments))//4
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {
+                "role": "assistant",
+                "content": None,
+                "tool_calls": [{"id": "call_fake", "type": "function", "function": {"name": tool["name"], "arguments": json.dumps(arguments)}}],
+            },
+        }],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens},
+    }
+
+
+def make_handler(config):
+    class FakeLLMHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def send_json(self, status, payload, headers=None):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            try:
+                self.end_headers()
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                # NOTE: the client gave up on the call (e.g. a cancelled judge call in rating-only mode)
+                self.close_connection = True
+
+        def do_GET(self):
+            if self.path.rstrip("/")=="/stats":
+                return self.send_json(200, config.stats())
+            self.send_json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                return self.send_json(404, {"error": {"message": "not found"}})
+            if "tools" not in body:
+                # NOTE: also a request body cut short by a client that gave up (e.g. a cancelled hedge)
+                return self.send_json(400, {"error": {"message": "structured output (tools) required"}})
+            config.count("requests")
+            slow_ms = config.slow_ms if config.random.random() < config.slow_rate else 0
+            time.sleep((config.latency_ms + config.random.random()*config.jitter_ms + slow_ms) / 1000)
+            draw = config.random.random()
+            if draw < config.rate_limit_rate:
+                config.count("rate_limited")
+                return self.send_json(429, {"error": {"message": "Rate limit reached", "type": "requests"}}, headers={"retry-after-ms": "100"})
+            if draw < config.rate_limit_rate + config.error_rate:
+                config.count("errors")
+                return self.send_json(500, {"error": {"message": "Injected server error", "type": "server_error"}})
+            config.count("ok")
+            self.send_json(200, make_completion(body, config))
+
+    return FakeLLMHandler
+
+
+def start_fake_llm_server(host="127.0.0.1", port=0, **config_kwargs):
+    # returns (server, config) with the server running in a daemon thread; port=0 picks a free port
+    config = FakeLLMConfig(**config_kwargs)
+    server = ThreadingHTTPServer((host, port), make_handler(config))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, config
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    config_kwargs = {key: value for key, value in vars(args).items() if key not in ["host", "port"]}
+    server, config = start_fake_llm_server(args.host, args.port, **config_kwargs)
+    print(f"Fake LLM server listening on http://{args.host}:{server.server_port}/v1 (stats at /stats)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,190 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+import httpx
+
+from O1A_assessment.benchmarks.fake_llm_server import start_fake_llm_server
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_PDF = os.path.join(PACKAGE_ROOT, "examples", "20240804_AndyWong_Resume.pdf")
+# NOTE: compared against --baseline; a regression is a relative change in the "worse" direction
+REGRESSION_METRICS = {"p50_seconds": 1, "p95_seconds": 1, "p99_seconds": 1, "requests_per_second": -1, "llm_calls_per_request": 1}
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Load-test /process against a local fake LLM server at rising concurrency.')
+    parser.add_argument('--input', type=str, default=DEFAULT_PDF, help='PDF uploaded by every request')
+    parser.add_argument('--workflow_version', type=str, default="default", help='which version of workflow to execute')
+    parser.add_argument('--concurrency', type=str, default="1,2,4,8", help='comma-separated concurrency levels')
+    parser.add_argument('--requests_per_level', type=int, default=16, help='number of requests sent at each level')
+    parser.add_argument('--latency_ms', type=float, default=500, help='fake LLM base latency')
+    parser.add_argument('--jitter_ms', type=float, default=200, help='fake LLM extra latency, uniform in [0, jitter_ms]')
+    parser.add_argument('--slow_rate', type=float, default=0.0, help='fraction of LLM requests with --slow_ms extra latency')
+    parser.add_argument('--slow_ms', type=float, default=5000, help='extra latency of slow LLM requests')
+    parser.add_argument('--error_rate', type=float, default=0.0, help='fraction of LLM requests answered with 500')
+    parser.add_argument('--rate_limit_rate', type=float, default=0.0, help='fraction of LLM requests answered with 429')
+    parser.add_argument('--seed', type=int, default=0, help='random seed of the fake LLM server')
+    parser.add_argument('--port', type=int, default=8765, help='port of the FastAPI server under test')
+    parser.add_argument('--server_args', type=str, default="", help='extra arguments for api_ver_fast_api.py')
+    parser.add_argument('--output', type=str, default=None, help='path to save the JSON report')
+    parser.add_argument('--baseline', type=str, default=None, help='previous JSON report to compare against')
+    parser.add_argument('--regression_threshold', type=float, default=0.2, help='relative change counted as a regression')
+    return parser.parse_args()
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def start_api_server(port, llm_base_url, output_dir, workflow_version, server_args=""):
+    # NOTE: caches are disabled so every request exercises the full workflow
+    env = dict(os.environ, PYTHONPATH=PACKAGE_ROOT, OPENAI_BASE_URL=llm_base_url, OPENAI_API_BASE=llm_base_url, OPENAI_API_KEY="load-test")
+    command = [
+        sys.executable, os.path.join(PACKAGE_ROOT, "O1A_assessment", "api_ver_fast_api.py"),
+        "--host", "127.0.0.1", "--port", str(port), "--output_dir", output_dir, "--workflow_version", workflow_version,
+        "--disable_result_cache", "--disable_judgement_cache",
+    ] + server_args.split()
+    log_file = open(os.path.join(output_dir, "server.log"), "w")
+    process = subprocess.Popen(command, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+    for _ in range(240):
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/docs", timeout=1).status_code==200:
+                return process
+        except httpx.HTTPError:
+            pass
+        if process.poll() is not None:
+            break
+        time.sleep(0.5)
+    process.kill()
+    raise RuntimeError(f"[load_test.py] API server did not start, see {log_file.name}")
+
+
+async def run_level(url, pdf_bytes, file_name, concurrency, num_requests):
+    latencies, statuses = [], {}
+    slots = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=600, limits=limits) as client:
+
+        async def send_one():
+            async with slots:
+                start_time = time.perf_counter()
+                try:
+                    response = await client.post(url, files={"file": (file_name, pdf_bytes, "application/pdf")})
+                    status = str(response.status_code)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                if status=="200":
+                    latencies.append(time.perf_counter() - start_time)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        start_time = time.perf_counter()
+        await asyncio.gather(*[send_one() for _ in range(num_requests)])
+        elapsed = time.perf_counter() - start_time
+    return latencies, statuses, elapsed
+
+
+def summarize_level(concurrency, latencies, statuses, elapsed, llm_stats):
+    num_ok = len(latencies)
+    return {
+        "concurrency": concurrency,
+        "requests": sum(statuses.values()),
+        "statuses": dict(sorted(statuses.items())),
+        "p50_seconds": round(percentile(latencies, 0.50), 3) if latencies else None,
+        "p95_seconds": round(percentile(latencies, 0.95), 3) if latencies else None,
+        "p99_seconds": round(percentile(latencies, 0.99), 3) if latencies else None,
+        "mean_seconds": round(statistics.mean(latencies), 3) if latencies else None,
+        "requests_per_second": round(num_ok / elapsed, 3),
+        "llm_calls_per_request": round(llm_stats["ok"] / num_ok, 2) if num_ok else None,
+        "llm_requests_per_request": round(llm_stats["requests"] / num_ok, 2) if num_ok else None,
+        "llm_errors_injected": llm_stats["errors"],
+        "llm_rate_limited_injected": llm_stats["rate_limited"],
+    }
+
+
+def compare_reports(report, baseline, threshold):
+    # returns human-readable regressions, matched by concurrency level
+    baseline_levels = {level["concurrency"]: level for level in baseline["levels"]}
+    regressions = []
+    for level in report["levels"]:
+        previous = baseline_levels.get(level["concurrency"])
+        if previous is None:
+            continue
+        for metric, direction in REGRESSION_METRICS.items():
+            if level.get(metric) is None or not previous.get(metric):
+                continue
+            change = (level[metric] - previous[metric]) / previous[metric]
+            print(f"  concurrency={level['concurrency']:<3} {metric:<24} {previous[metric]:>9} -> {level[metric]:>9} ({change:+.1%})")
+            if change * direction > threshold:
+                regressions.append(f"concurrency={level['concurrency']} {metric}: {previous[metric]} -> {level[metric]} ({change:+.1%})")
+    return regressions
+
+
+def run_load_test(args):
+    with open(args.input, 'rb') as file:
+        pdf_bytes = file.read()
+    levels = [int(level) for level in args.concurrency.split(",")]
+    llm_server, llm_config = start_fake_llm_server(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, slow_rate=args.slow_rate, slow_ms=args.slow_ms, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate, seed=args.seed,
+    )
+    llm_base_url = f"http://127.0.0.1:{llm_server.server_port}/v1"
+    with tempfile.TemporaryDirectory() as output_dir:
+        api_server = start_api_server(args.port, llm_base_url, output_dir, args.workflow_version, args.server_args)
+        try:
+            url = f"http://127.0.0.1:{args.port}/process"
+            asyncio.run(run_level(url, pdf_bytes, os.path.basename(args.input), 1, 1)) # NOTE: warm-up, not reported
+            results = []
+            for concurrency in levels:
+                before = llm_config.stats()
+                latencies, statuses, elapsed = asyncio.run(run_level(url, pdf_bytes, os.path.basename(args.input), concurrency, args.requests_per_level))
+                after = llm_config.stats()
+                level = summarize_level(concurrency, latencies, statuses, elapsed, {key: after[key] - before[key] for key in after})
+                print(json.dumps(level))
+                results.append(level)
+        finally:
+            api_server.terminate()
+            api_server.wait(timeout=30)
+            llm_server.shutdown()
+    return {
+        "config": {
+            "workflow_version": args.workflow_version,
+            "requests_per_level": args.requests_per_level,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "slow_rate": args.slow_rate,
+            "slow_ms": args.slow_ms,
+            "error_rate": args.error_rate,
+            "rate_limit_rate": args.rate_limit_rate,
+            "seed": args.seed,
+            "server_args": args.server_args,
+        },
+        "levels": results,
+    }
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    report = run_load_test(args)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2, sort_keys=True)
+        print(f"Saved report to {args.output}")
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+        print(f"Compared with {args.baseline}:")
+        regressions = compare_reports(report, baseline, args.regression_threshold)
+        for regression in regressions:
+            print(f"[load_test.py] Regression: {regression}")
+        sys.exit(1 if regressions else 0)
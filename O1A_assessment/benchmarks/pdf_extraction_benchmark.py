@@ -0,0 +1,88 @@
+import os
+import json
+import time
+import argparse
+import tempfile
+import statistics
+
+from O1A_assessment.utils.preprocess_resume_pdf import pdf_to_text_ver_basic
+from O1A_assessment.utils.pdf_text_engine import PDFTextEngine
+
+DEFAULT_PDF = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "examples", "20240804_AndyWong_Resume.pdf")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Compare pdf_to_text_ver_basic with the PDF text engine on small and large PDFs.')
+    parser.add_argument('--input', type=str, default=DEFAULT_PDF, help='small PDF; the large PDF repeats its pages')
+    parser.add_argument('--large_pages', type=int, default=40, help='number of pages of the generated large PDF')
+    parser.add_argument('--repeats', type=int, default=5, help='number of timed runs per case')
+    parser.add_argument('--num_workers', type=int, default=None, help='processes used by the engine for long documents (default: all CPUs)')
+    parser.add_argument('--output', type=str, default=None, help='optional path to save the JSON report')
+    return parser.parse_args()
+
+
+def make_large_pdf(input_path, num_pages, output_path):
+    import fitz
+    with fitz.open(input_path) as src, fitz.open() as doc:
+        while doc.page_count < num_pages:
+            doc.insert_pdf(src, to_page=min(src.page_count, num_pages - doc.page_count) - 1)
+        doc.save(output_path)
+    return output_path
+
+
+def time_runs(fn, repeats):
+    seconds = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        fn()
+        seconds.append(time.perf_counter() - start_time)
+    return round(statistics.median(seconds) * 1000, 3)
+
+
+def benchmark_pdf(pdf_path, engine, repeats):
+    import fitz
+    with fitz.open(pdf_path) as doc:
+        num_pages = doc.page_count
+    expected_text = pdf_to_text_ver_basic(pdf_path) # NOTE: also warms up the llama_index import
+
+    def engine_cold():
+        engine.clear_cache()
+        return engine.extract_text(pdf_path=pdf_path)
+
+    def engine_serial_cold():
+        engine.clear_cache()
+        return engine.extract_text(pdf_path=pdf_path, parallel=False)
+
+    engine_cold() # NOTE: starts the process pool outside the timed runs
+    return {
+        "pages": num_pages,
+        "same_text": engine_cold() == expected_text,
+        "basic_ms": time_runs(lambda: pdf_to_text_ver_basic(pdf_path), repeats),
+        "engine_serial_ms": time_runs(engine_serial_cold, repeats),
+        "engine_parallel_ms": time_runs(engine_cold, repeats),
+        "engine_cached_ms": time_runs(lambda: engine.extract_text(pdf_path=pdf_path), repeats),
+    }
+
+
+def run_pdf_extraction_benchmark(input_path=DEFAULT_PDF, large_pages=40, repeats=5, num_workers=None):
+    engine = PDFTextEngine(num_workers=num_workers)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        large_path = make_large_pdf(input_path, large_pages, os.path.join(temp_dir, "large.pdf"))
+        report = {
+            "small": benchmark_pdf(input_path, engine, repeats),
+            "large": benchmark_pdf(large_path, engine, repeats),
+            "num_workers": engine.num_workers,
+            "parallel_min_pages": engine.parallel_min_pages,
+            "repeats": repeats,
+        }
+    engine.shutdown()
+    return report
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    report = run_pdf_extraction_benchmark(args.input, args.large_pages, args.repeats, args.num_workers)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
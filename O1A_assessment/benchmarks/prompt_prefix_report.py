@@ -0,0 +1,94 @@
+import os
+import json
+import argparse
+
+from langchain_core.messages import HumanMessage
+
+from O1A_assessment.utils.token_counter import count_tokens
+from O1A_assessment.utils.preprocess_resume_pdf import pdf_to_text_ver_fast
+from O1A_assessment.inference import baseline, batched
+
+DEFAULT_PDF = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "examples", "20240804_AndyWong_Resume.pdf")
+# NOTE: OpenAI only caches prompts whose identical prefix is at least this long
+MIN_CACHEABLE_TOKENS = 1024
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Report static (cacheable prefix) vs. dynamic token counts of every prompt.')
+    parser.add_argument('--input', type=str, default=DEFAULT_PDF, help='resume used as the dynamic part of the extraction prompts')
+    parser.add_argument('--output', type=str, default=None, help='optional path to save the JSON report')
+    return parser.parse_args()
+
+
+def render_request(chain, user_input):
+    # the request text in the order the provider reads it: tool schema first, then the messages
+    binding = chain.middle[0]
+    messages = chain.first.format_messages(messages=[user_input])
+    payload = binding.bound._get_request_payload(messages, **binding.kwargs)
+    rendered_messages = [json.dumps(message, ensure_ascii=False) for message in payload["messages"]]
+    prefix = json.dumps([payload.get("tools"), payload.get("tool_choice")], ensure_ascii=False)
+    return prefix + "".join(rendered_messages), prefix + "".join(rendered_messages[:-1])
+
+
+def common_prefix(text_a, text_b):
+    size = 0
+    for char_a, char_b in zip(text_a, text_b):
+        if char_a!=char_b:
+            break
+        size += 1
+    return text_a[:size]
+
+
+def measure_prompt(name, chain, user_input, other_user_input):
+    # static = what two requests with different dynamic inputs share, byte for byte, from the start
+    request, request_without_last_message = render_request(chain, user_input)
+    other_request, _ = render_request(chain, other_user_input)
+    static_prefix = common_prefix(request, other_request)
+    static_tokens = count_tokens(static_prefix, baseline.llm_name)
+    return {
+        "prompt": name,
+        "static_tokens": static_tokens,
+        "dynamic_tokens": count_tokens(request, baseline.llm_name) - static_tokens,
+        "dynamic_only_in_last_message": static_prefix.startswith(request_without_last_message),
+        "cache_eligible": static_tokens >= MIN_CACHEABLE_TOKENS,
+    }
+
+
+def list_prompts(resume_text):
+    # (name, chain, user input, another user input) for every prompt the workflows send
+    def as_resume(text):
+        return HumanMessage(content=json.dumps({"user resume": text}, ensure_ascii=False))
+
+    prompts = [
+        (f"extraction/{chain_name}", chain, as_resume(resume_text), as_resume("another resume"))
+        for chain_name, chain in baseline.get_extraction_chains().items()
+    ]
+    for criterion in baseline.criteria_map["life-long-achievements"] + baseline.criteria_map["employment-status"]:
+        item_states = [baseline.create_base_state(criterion_of_interests=criterion, extracted_content=item) for item in ["Sample achievement, 2024", "Another achievement"]]
+        (judge_chain, user_input), (_, other_user_input) = [baseline.prepare_judge_content(state) for state in item_states]
+        prompts.append((f"judge/{criterion}", judge_chain, user_input, other_user_input))
+        batch_states = [baseline.create_base_state(criterion_of_interests=criterion, extracted_contents=items) for items in [["Sample achievement, 2024", "Second achievement"], ["Another achievement"]]]
+        (batch_chain, batch_input), (_, other_batch_input) = [batched.prepare_judge_content_batch(state) for state in batch_states]
+        prompts.append((f"judge_batch/{criterion}", batch_chain, batch_input, other_batch_input))
+    return prompts
+
+
+def run_prompt_prefix_report(input_path=DEFAULT_PDF):
+    resume_text = pdf_to_text_ver_fast(input_path)
+    rows = [measure_prompt(*prompt) for prompt in list_prompts(resume_text)]
+    return {
+        "prompts": rows,
+        "min_cacheable_tokens": MIN_CACHEABLE_TOKENS,
+        "all_dynamic_content_last": all(row["dynamic_only_in_last_message"] for row in rows),
+    }
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    report = run_prompt_prefix_report(args.input)
+    print(f"{'prompt':<36} {'static':>8} {'dynamic':>8}  last-only  cacheable")
+    for row in report["prompts"]:
+        print(f"{row['prompt']:<36} {row['static_tokens']:>8} {row['dynamic_tokens']:>8}  {str(row['dynamic_only_in_last_message']):<9}  {row['cache_eligible']}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
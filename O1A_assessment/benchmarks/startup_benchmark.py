@@ -0,0 +1,79 @@
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+# NOTE: every measurement runs in a fresh interpreter, so module caches do not hide cold-start costs.
+CHILD_CODE = r'''
+import json, time
+t0 = time.perf_counter()
+from O1A_assessment.inference import baseline
+import O1A_assessment.inference.workflows
+t1 = time.perf_counter()
+
+# Work done by the first request before its first LLM call (knowledge, clients, chains, prompts)
+from langchain_core.messages import HumanMessage
+user_input = HumanMessage(content=json.dumps({"user resume": "benchmark"}))
+for chain in baseline.get_extraction_chains().values():
+    chain.first.format_messages(messages=[user_input])
+for criterion in baseline.criteria_map["life-long-achievements"] + baseline.criteria_map["employment-status"]:
+    judge_chain, user_input = baseline.prepare_judge_content(baseline.create_base_state(criterion_of_interests=criterion, extracted_content="benchmark"))
+    judge_chain.first.format_messages(messages=[user_input])
+t2 = time.perf_counter()
+
+# Per-call overhead of preparing a judge call: prebuilt chain vs. rebuilding it on every call
+n = {num_calls}
+state = baseline.create_base_state(criterion_of_interests="Awards", extracted_content="benchmark")
+t3 = time.perf_counter()
+for _ in range(n):
+    baseline.prepare_judge_content(state)
+t4 = time.perf_counter()
+for _ in range(n):
+    baseline.get_criterion_description.__wrapped__("Awards")
+    judgement_prompt = baseline.prompt_judge_info.partial(criterion_description=baseline.get_criterion_description.__wrapped__("Awards"))
+    judgement_prompt | baseline.get_llm().with_structured_output(baseline.structured_judgement, include_raw=False)
+t5 = time.perf_counter()
+print("BENCHMARK " + json.dumps({
+    "import_seconds": t1 - t0,
+    "time_to_first_request_seconds": t2 - t0,
+    "first_request_prep_seconds": t2 - t1,
+    "per_call_registry_ms": (t4 - t3) / n * 1000,
+    "per_call_rebuild_ms": (t5 - t4) / n * 1000,
+}))
+'''
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Measure import time, time to first request, and per-call overhead.')
+    parser.add_argument('--repeats', type=int, default=5, help='number of fresh interpreter runs')
+    parser.add_argument('--num_calls', type=int, default=200, help='number of judge calls prepared per run')
+    parser.add_argument('--output', type=str, default=None, help='optional path to save the JSON report')
+    return parser.parse_args()
+
+
+def run_once(num_calls):
+    env = dict(os.environ, OPENAI_API_KEY=os.environ.get("OPENAI_API_KEY", "benchmark"))
+    completed = subprocess.run(
+        [sys.executable, "-c", CHILD_CODE.replace("{num_calls}", str(num_calls))],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    lines = [line for line in completed.stdout.splitlines() if line.startswith("BENCHMARK ")]
+    return json.loads(lines[-1][len("BENCHMARK "):])
+
+
+def run_startup_benchmark(repeats=5, num_calls=200):
+    runs = [run_once(num_calls) for _ in range(repeats)]
+    report = {key: round(statistics.median(run[key] for run in runs), 4) for key in runs[0]}
+    report["repeats"] = repeats
+    return report
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    report = run_startup_benchmark(args.repeats, args.num_calls)
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
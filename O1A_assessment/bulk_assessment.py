@@ -0,0 +1,187 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import traceback
+import functools
+import concurrent.futures
+
+from O1A_assessment.utils.preprocess_resume_pdf import pdf_to_text_ver_fast
+from O1A_assessment.utils.pdf_text_engine import get_worker_mp_context
+from O1A_assessment.utils.token_counter import TokenUsageCallback
+from O1A_assessment.utils.llm_concurrency import set_llm_concurrency_limit
+from O1A_assessment.inference.workflows import workflows_get_graph
+from O1A_assessment.utils.metrics import time_stage, track_run_metrics
+from O1A_assessment.inference.baseline import create_overall_state, create_output_entry, attach_run_metrics
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Bulk offline O-1A assessment of many resumes.')
+    parser.add_argument('--input', type=str, required=True, help='directory of PDFs (searched recursively), or a manifest file with one PDF path per line')
+    parser.add_argument('--output_dir', type=str, default="./results/bulk", help='directory for sharded JSONL results, checkpoint manifest, and throughput report')
+    parser.add_argument('--workflow_version', type=str, default="default", help='which version of workflow to execute')
+    parser.add_argument('--num_parse_workers', type=int, default=os.cpu_count(), help='number of processes parsing PDFs')
+    parser.add_argument('--max_concurrent_resumes', type=int, default=32, help='number of resumes in flight at once')
+    parser.add_argument('--max_concurrent_llm_calls', type=int, default=64, help='cap on the adaptive number of concurrent LLM calls per model')
+    parser.add_argument('--shard_size', type=int, default=1000, help='number of results per JSONL shard')
+    parser.add_argument('--retry_failed', action='store_true', help='re-run resumes recorded as failed in the checkpoint manifest')
+    parser.add_argument('--report_every', type=int, default=50, help='print throughput every N resumes')
+    return parser.parse_args()
+
+
+def list_input_pdfs(input_path):
+    if os.path.isdir(input_path):
+        pdf_paths = []
+        for root, _, file_names in os.walk(input_path):
+            pdf_paths += [os.path.join(root, file_name) for file_name in file_names if file_name.lower().endswith(".pdf")]
+    elif os.path.isfile(input_path):
+        manifest_dir = os.path.dirname(os.path.abspath(input_path))
+        with open(input_path, 'r', encoding='utf-8') as file:
+            pdf_paths = [line.strip() for line in file if line.strip() and not line.startswith("#")]
+        pdf_paths = [path if os.path.isabs(path) else os.path.join(manifest_dir, path) for path in pdf_paths]
+    else:
+        raise ValueError(f'[bulk_assessment.py] Could not find input at:\n {input_path}')
+    return sorted(os.path.abspath(path) for path in pdf_paths)
+
+
+def load_checkpoint(checkpoint_path, retry_failed=False):
+    # input paths that do not need to run again; the last record per path wins
+    status = {}
+    if os.path.isfile(checkpoint_path):
+        with open(checkpoint_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue # NOTE: partially written last line after a crash
+                status[record["input_path"]] = record["status"]
+    return {path for path, path_status in status.items() if path_status=="done" or (path_status=="failed" and not retry_failed)}
+
+
+class ShardedJSONLWriter:
+    """Appends results to `shard_XXXXX.jsonl` files, starting a new shard every `shard_size` lines.
+
+    Every run starts a fresh shard, so a shard cut short by a crash is never appended to.
+    """
+    def __init__(self, output_dir, shard_size):
+        self.output_dir = output_dir
+        self.shard_size = shard_size
+        existing_shards = [name for name in os.listdir(output_dir) if name.startswith("shard_") and name.endswith(".jsonl")]
+        self.shard_index = max([int(name[len("shard_"):-len(".jsonl")]) for name in existing_shards], default=-1)
+        self.file = None
+        self.lines_in_shard = 0
+
+    def _open_next_shard(self):
+        if self.file is not None:
+            self.file.close()
+        self.shard_index += 1
+        self.file = open(os.path.join(self.output_dir, f"shard_{self.shard_index:05d}.jsonl"), 'a', encoding='utf-8')
+        self.lines_in_shard = 0
+
+    def write(self, entry):
+        if self.file is None or self.lines_in_shard >= self.shard_size:
+            self._open_next_shard()
+        self.file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.file.flush()
+        self.lines_in_shard += 1
+        return os.path.basename(self.file.name)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+
+class ThroughputMeter:
+    def __init__(self, token_usage):
+        self.token_usage = token_usage
+        self.start_time = time.time()
+        self.num_done = 0
+        self.num_failed = 0
+
+    def report(self, num_total):
+        minutes = max(time.time() - self.start_time, 1e-6) / 60
+        return {
+            "done": self.num_done,
+            "failed": self.num_failed,
+            "total": num_total,
+            "elapsed_minutes": round(minutes, 2),
+            "resumes_per_minute": round(self.num_done / minutes, 2),
+            "tokens_per_minute": round(self.token_usage.total_tokens / minutes, 1),
+            "llm_calls": self.token_usage.llm_calls,
+            "prompt_tokens": self.token_usage.prompt_tokens,
+            "completion_tokens": self.token_usage.completion_tokens,
+        }
+
+
+async def assess_resume(input_path, graph, workflow_version, parse_pool, token_usage):
+    loop = asyncio.get_running_loop()
+    with track_run_metrics(workflow_version) as run_metrics:
+        with time_stage("preprocess_pdf"):
+            # NOTE: the parse pool already spreads resumes over processes, so pages are not split again
+            pdf_text = await loop.run_in_executor(parse_pool, functools.partial(pdf_to_text_ver_fast, parallel=False), input_path)
+        contents = [pdf_text]
+        result = await graph.ainvoke(create_overall_state(contents=contents), config={"callbacks": [token_usage]})
+    entry = attach_run_metrics(create_output_entry(contents, result, workflow=workflow_version), run_metrics)
+    entry["input_path"] = input_path
+    return entry
+
+
+async def run_bulk_assessment(args):
+    os.makedirs(args.output_dir, exist_ok=True)
+    checkpoint_path = os.path.join(args.output_dir, "checkpoint.jsonl")
+    pdf_paths = list_input_pdfs(args.input)
+    finished = load_checkpoint(checkpoint_path, retry_failed=args.retry_failed)
+    pending_paths = [path for path in pdf_paths if path not in finished]
+    print(f"Found {len(pdf_paths)} resume(s), {len(pdf_paths)-len(pending_paths)} already in checkpoint, {len(pending_paths)} to assess.")
+
+    set_llm_concurrency_limit(args.max_concurrent_llm_calls)
+    graph = workflows_get_graph[args.workflow_version]("async")
+    token_usage = TokenUsageCallback()
+    meter = ThroughputMeter(token_usage)
+    writer = ShardedJSONLWriter(args.output_dir, args.shard_size)
+    resume_slots = asyncio.Semaphore(args.max_concurrent_resumes)
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.num_parse_workers, mp_context=get_worker_mp_context()) as parse_pool, \
+            open(checkpoint_path, 'a', encoding='utf-8') as checkpoint:
+
+        async def run_one(input_path):
+            try:
+                entry = await assess_resume(input_path, graph, args.workflow_version, parse_pool, token_usage)
+                # NOTE: write the result before checkpointing it, so a crash never loses a checkpointed result
+                shard = await asyncio.to_thread(writer.write, entry)
+                record = {"input_path": input_path, "status": "done", "shard": shard}
+                meter.num_done += 1
+            except Exception as e:
+                traceback.print_exc()
+                record = {"input_path": input_path, "status": "failed", "error": repr(e)}
+                meter.num_failed += 1
+            finally:
+                resume_slots.release()
+            checkpoint.write(json.dumps(record, ensure_ascii=False) + '\n')
+            checkpoint.flush()
+            if (meter.num_done + meter.num_failed) % args.report_every == 0:
+                print(f"[bulk_assessment.py] {json.dumps(meter.report(len(pending_paths)))}")
+
+        tasks = []
+        for input_path in pending_paths:
+            await resume_slots.acquire()
+            tasks.append(asyncio.create_task(run_one(input_path)))
+        await asyncio.gather(*tasks)
+
+    writer.close()
+    report = meter.report(len(pending_paths))
+    with open(os.path.join(args.output_dir, "throughput.json"), 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    print(f"Finished bulk assessment: {json.dumps(report)}")
+    return report
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    print("Parsed Arguments:")
+    for key, value in vars(args).items():
+        print(f"   {key}: {value}")
+    report = asyncio.run(run_bulk_assessment(args))
+    sys.exit(1 if report["failed"] else 0)
@@ -0,0 +1,364 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import contextlib
+import concurrent.futures
+
+import httpx
+
+# =============== Client Config ===============
+DEFAULT_BASE_URL = "http://localhost:8000"
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+# NOTE: a 500 of a POST is usually deterministic (unparseable PDF, workflow error), retrying it would re-run the paid assessment
+POST_RETRY_STATUS_CODES = [429, 502, 503, 504]
+TERMINAL_JOB_STATUSES = ["succeeded", "failed", "rejected"]
+# NOTE: /process holds the connection for the whole assessment (minutes for long resumes)
+DEFAULT_TIMEOUT = httpx.Timeout(600.0, connect=10.0)
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Submit resumes to the O-1A assessment API.')
+    parser.add_argument('--inputs', type=str, nargs='+', required=True, help='PDF files or directories of PDFs')
+    parser.add_argument('--base_url', type=str, default=DEFAULT_BASE_URL, help='url of the api service')
+    parser.add_argument('--mode', type=str, default="process", choices=["process", "jobs", "stream"], help='/process (wait for the result), /jobs (submit, then poll), or /process/stream (server-sent events)')
+    parser.add_argument('--max_concurrency', type=int, default=8, help='number of resumes in flight at once')
+    parser.add_argument('--max_retries', type=int, default=5, help='retries on 429/502/503/504 and connection errors (any 5xx when polling jobs)')
+    parser.add_argument('--retry_server_errors', action='store_true', help='also retry uploads answered with 500')
+    parser.add_argument('--output', type=str, default=None, help='path to a JSONL file of results (default: print)')
+    return parser.parse_args()
+
+
+class O1AClientError(Exception):
+    def __init__(self, message, status_code=None, detail=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def get_backoff_seconds(attempt, retry_after=None, backoff_base=0.5, backoff_max=30.0):
+    # NOTE: honour the server's Retry-After (e.g. a full job queue), else exponential backoff with full jitter
+    if retry_after is not None:
+        try:
+            return min(float(retry_after), backoff_max)
+        except ValueError:
+            pass
+    return random.uniform(0, min(backoff_max, backoff_base * 2**attempt))
+
+
+def is_retryable(response=None, error=None, status_codes=RETRY_STATUS_CODES):
+    if error is not None:
+        return isinstance(error, httpx.TransportError)
+    return response.status_code in status_codes
+
+
+def raise_for_response(response):
+    if response.is_success:
+        return
+    try:
+        detail = response.json().get("detail")
+    except ValueError:
+        detail = response.text
+    raise O1AClientError(f"{response.request.method} {response.request.url} failed with {response.status_code}: {detail}", response.status_code, detail)
+
+
+def make_upload(file, previous_run_id=None):
+    # NOTE: httpx streams file objects in chunks, the PDF is never read into memory as a whole
+    files = {"file": (os.path.basename(file.name), file, "application/pdf")}
+    data = {"previous_run_id": previous_run_id} if previous_run_id is not None else None
+    return files, data
+
+
+def parse_sse_event(lines):
+    # one server-sent event (lines up to a blank line) as (event, data)
+    event, data = "message", []
+    for line in lines:
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+    return event, json.loads("\n".join(data)) if data else None
+
+
+def list_input_pdfs(inputs):
+    pdf_paths = []
+    for path in inputs:
+        if os.path.isdir(path):
+            pdf_paths += sorted(os.path.join(path, name) for name in os.listdir(path) if name.lower().endswith(".pdf"))
+        else:
+            pdf_paths.append(path)
+    return pdf_paths
+
+# =============== Sync Client ===============
+class O1AClient:
+    """Blocking client of the assessment API over a pool of keep-alive connections; thread-safe.
+
+    `assess_many` keeps at most `max_concurrency` resumes in flight from a thread pool.
+    """
+    def __init__(self, base_url=DEFAULT_BASE_URL, max_concurrency=8, max_retries=5, backoff_base=0.5, backoff_max=30.0, timeout=DEFAULT_TIMEOUT, poll_interval=2.0, retry_server_errors=False):
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.post_retry_status_codes = RETRY_STATUS_CODES if retry_server_errors else POST_RETRY_STATUS_CODES
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.poll_interval = poll_interval
+        limits = httpx.Limits(max_connections=max_concurrency + 2, max_keepalive_connections=max_concurrency + 2)
+        self._client = httpx.Client(base_url=self.base_url, timeout=timeout, limits=limits)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._client.close()
+
+    def _request(self, method, path, file_path=None, previous_run_id=None, **kwargs):
+        # the upload is reopened on every attempt, so a retry re-sends it from the start
+        status_codes = self.post_retry_status_codes if method=="POST" else RETRY_STATUS_CODES
+        for attempt in range(self.max_retries + 1):
+            try:
+                with contextlib.ExitStack() as stack:
+                    if file_path is not None:
+                        kwargs["files"], kwargs["data"] = make_upload(stack.enter_context(open(file_path, 'rb')), previous_run_id)
+                    response = self._client.request(method, path, **kwargs)
+            except httpx.HTTPError as e:
+                if attempt==self.max_retries or not is_retryable(error=e):
+                    raise
+                time.sleep(get_backoff_seconds(attempt, None, self.backoff_base, self.backoff_max))
+                continue
+            if attempt==self.max_retries or not is_retryable(response, status_codes=status_codes):
+                raise_for_response(response)
+                return response.json()
+            time.sleep(get_backoff_seconds(attempt, response.headers.get("Retry-After"), self.backoff_base, self.backoff_max))
+
+    def assess(self, file_path, previous_run_id=None):
+        # POST /process: waits for the assessment, returns {"message", "file_path", "result": {"content", ...}}
+        return self._request("POST", "/process", file_path=file_path, previous_run_id=previous_run_id)
+
+    def submit_job(self, file_path):
+        return self._request("POST", "/jobs", file_path=file_path)["job_id"]
+
+    def get_job(self, job_id):
+        return self._request("GET", f"/jobs/{job_id}")
+
+    def wait_for_job(self, job_id, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get_job(job_id)
+            if job["status"] in TERMINAL_JOB_STATUSES:
+                return job
+            if deadline is not None and time.monotonic() > deadline:
+                raise O1AClientError(f"Job {job_id} still {job['status']} after {timeout}s")
+            time.sleep(self.poll_interval)
+
+    def assess_job(self, file_path, timeout=None):
+        # POST /jobs, then poll GET /jobs/{job_id} until it finished
+        job = self.wait_for_job(self.submit_job(file_path), timeout=timeout)
+        if job["status"]!="succeeded":
+            raise O1AClientError(f"Job {job['job_id']} {job['status']}: {job['error']}", detail=job["error"])
+        return job
+
+    def assess_stream(self, file_path, previous_run_id=None):
+        # POST /process/stream, yields (event, data): started, extraction, judgement (one per item), summary (or error)
+        # NOTE: only the connection is retried; once events arrive, a failure is raised to the caller
+        for attempt in range(self.max_retries + 1):
+            with open(file_path, 'rb') as file:
+                files, data = make_upload(file, previous_run_id)
+                try:
+                    with self._client.stream("POST", "/process/stream", files=files, data=data) as response:
+                        if attempt < self.max_retries and is_retryable(response, status_codes=self.post_retry_status_codes):
+                            retry_after = response.headers.get("Retry-After")
+                        else:
+                            if not response.is_success:
+                                response.read()
+                            raise_for_response(response)
+                            lines = []
+                            for line in response.iter_lines():
+                                if line:
+                                    lines.append(line)
+                                    continue
+                                if lines:
+                                    yield parse_sse_event(lines)
+                                lines = []
+                            return
+                except httpx.TransportError:
+                    if attempt==self.max_retries:
+                        raise
+                    retry_after = None
+            time.sleep(get_backoff_seconds(attempt, retry_after, self.backoff_base, self.backoff_max))
+
+    def assess_many(self, file_paths, mode="process"):
+        # yields (file_path, result or exception) as they finish, at most `max_concurrency` in flight
+        assess_fn = {"process": self.assess, "jobs": self.assess_job, "stream": lambda file_path: collect_stream_result(self.assess_stream(file_path))}[mode]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            futures = {executor.submit(assess_fn, file_path): file_path for file_path in file_paths}
+            for future in concurrent.futures.as_completed(futures):
+                try:
+                    yield futures[future], future.result()
+                except Exception as e:
+                    yield futures[future], e
+
+
+def collect_stream_result(events):
+    # the summary event of a stream, with the number of judgement events seen before it
+    num_judgements = 0
+    for event, data in events:
+        if event=="judgement":
+            num_judgements += 1
+        elif event=="summary":
+            return {**data, "judgements_streamed": num_judgements}
+        elif event=="error":
+            raise O1AClientError(f"Streaming assessment failed: {data['detail']}", detail=data["detail"])
+    raise O1AClientError("Stream ended without a summary event")
+
+# =============== Async Client ===============
+class AsyncO1AClient:
+    """asyncio client of the assessment API; `assess_many` keeps at most `max_concurrency` resumes in flight."""
+    def __init__(self, base_url=DEFAULT_BASE_URL, max_concurrency=8, max_retries=5, backoff_base=0.5, backoff_max=30.0, timeout=DEFAULT_TIMEOUT, poll_interval=2.0, retry_server_errors=False):
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.post_retry_status_codes = RETRY_STATUS_CODES if retry_server_errors else POST_RETRY_STATUS_CODES
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.poll_interval = poll_interval
+        limits = httpx.Limits(max_connections=max_concurrency + 2, max_keepalive_connections=max_concurrency + 2)
+        self._client = httpx.AsyncClient(base_url=self.base_url, timeout=timeout, limits=limits)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        await self._client.aclose()
+
+    async def _request(self, method, path, file_path=None, previous_run_id=None, **kwargs):
+        status_codes = self.post_retry_status_codes if method=="POST" else RETRY_STATUS_CODES
+        for attempt in range(self.max_retries + 1):
+            try:
+                with contextlib.ExitStack() as stack:
+                    if file_path is not None:
+                        kwargs["files"], kwargs["data"] = make_upload(stack.enter_context(open(file_path, 'rb')), previous_run_id)
+                    response = await self._client.request(method, path, **kwargs)
+            except httpx.HTTPError as e:
+                if attempt==self.max_retries or not is_retryable(error=e):
+                    raise
+                await asyncio.sleep(get_backoff_seconds(attempt, None, self.backoff_base, self.backoff_max))
+                continue
+            if attempt==self.max_retries or not is_retryable(response, status_codes=status_codes):
+                raise_for_response(response)
+                return response.json()
+            await asyncio.sleep(get_backoff_seconds(attempt, response.headers.get("Retry-After"), self.backoff_base, self.backoff_max))
+
+    async def assess(self, file_path, previous_run_id=None):
+        return await self._request("POST", "/process", file_path=file_path, previous_run_id=previous_run_id)
+
+    async def submit_job(self, file_path):
+        return (await self._request("POST", "/jobs", file_path=file_path))["job_id"]
+
+    async def get_job(self, job_id):
+        return await self._request("GET", f"/jobs/{job_id}")
+
+    async def wait_for_job(self, job_id, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = await self.get_job(job_id)
+            if job["status"] in TERMINAL_JOB_STATUSES:
+                return job
+            if deadline is not None and time.monotonic() > deadline:
+                raise O1AClientError(f"Job {job_id} still {job['status']} after {timeout}s")
+            await asyncio.sleep(self.poll_interval)
+
+    async def assess_job(self, file_path, timeout=None):
+        job = await self.wait_for_job(await self.submit_job(file_path), timeout=timeout)
+        if job["status"]!="succeeded":
+            raise O1AClientError(f"Job {job['job_id']} {job['status']}: {job['error']}", detail=job["error"])
+        return job
+
+    async def assess_stream(self, file_path, previous_run_id=None):
+        for attempt in range(self.max_retries + 1):
+            with open(file_path, 'rb') as file:
+                files, data = make_upload(file, previous_run_id)
+                try:
+                    async with self._client.stream("POST", "/process/stream", files=files, data=data) as response:
+                        if attempt < self.max_retries and is_retryable(response, status_codes=self.post_retry_status_codes):
+                            retry_after = response.headers.get("Retry-After")
+                        else:
+                            if not response.is_success:
+                                await response.aread()
+                            raise_for_response(response)
+                            lines = []
+                            async for line in response.aiter_lines():
+                                if line:
+                                    lines.append(line)
+                                    continue
+                                if lines:
+                                    yield parse_sse_event(lines)
+                                lines = []
+                            return
+                except httpx.TransportError:
+                    if attempt==self.max_retries:
+                        raise
+                    retry_after = None
+            await asyncio.sleep(get_backoff_seconds(attempt, retry_after, self.backoff_base, self.backoff_max))
+
+    async def assess_stream_result(self, file_path, previous_run_id=None):
+        return collect_stream_result([event async for event in self.assess_stream(file_path, previous_run_id)])
+
+    async def assess_many(self, file_paths, mode="process"):
+        # yields (file_path, result or exception) as they finish, at most `max_concurrency` in flight
+        assess_fn = {"process": self.assess, "jobs": self.assess_job, "stream": self.assess_stream_result}[mode]
+        slots = asyncio.Semaphore(self.max_concurrency)
+
+        async def assess_one(file_path):
+            async with slots:
+                try:
+                    return file_path, await assess_fn(file_path)
+                except Exception as e:
+                    return file_path, e
+
+        tasks = [asyncio.ensure_future(assess_one(file_path)) for file_path in file_paths]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+async def run_client(args):
+    pdf_paths = list_input_pdfs(args.inputs)
+    output_file = open(args.output, 'a', encoding='utf-8') if args.output else None
+    num_failed, start_time = 0, time.perf_counter()
+    try:
+        async with AsyncO1AClient(args.base_url, max_concurrency=args.max_concurrency, max_retries=args.max_retries, retry_server_errors=args.retry_server_errors) as client:
+            async for file_path, result in client.assess_many(pdf_paths, mode=args.mode):
+                if isinstance(result, Exception):
+                    num_failed += 1
+                    record = {"file_path": file_path, "error": repr(result)}
+                else:
+                    record = {"file_path": file_path, "result": result}
+                if output_file is not None:
+                    output_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    output_file.flush()
+                else:
+                    print(json.dumps(record, ensure_ascii=False))
+    finally:
+        if output_file is not None:
+            output_file.close()
+    elapsed = time.perf_counter() - start_time
+    print(f"Assessed {len(pdf_paths)-num_failed}/{len(pdf_paths)} resumes in {elapsed:.1f}s ({num_failed} failed)", file=sys.stderr)
+    return num_failed
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    sys.exit(1 if asyncio.run(run_client(args)) else 0)
@@ -1,20 +1,30 @@
 import os
 import copy
+import asyncio
 import json
 import operator
+import contextvars
+import functools
 import collections
+import concurrent.futures
 from typing import Annotated, TypedDict, List, Dict, List, Type, Literal, Any
 
 from langgraph.constants import Send
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.pydantic_v1 import BaseModel, Field
 from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
 from langgraph.graph import END, StateGraph
 
 from O1A_assessment.utils.llm_configs import LLM_API_dict
-from O1A_assessment.utils.get_O1A_knowledge import O1A_DFFINITIONS
-from O1A_assessment.utils.preprocess_resume_pdf import pdf_to_text_ver_basic
+from O1A_assessment.utils.get_O1A_knowledge import get_O1A_definitions
+from O1A_assessment.utils.preprocess_resume_pdf import pdf_to_text_ver_fast
+from O1A_assessment.utils.judgement_cache import get_judgement_cache, hash_text
+from O1A_assessment.utils.token_counter import count_tokens
+from O1A_assessment.utils.llm_concurrency import llm_call_slot, llm_call_slot_sync, get_llm_controller, completion_reserve_tokens
+from O1A_assessment.utils.metrics import instrument_node, time_stage, track_run_metrics
+from O1A_assessment.utils.tail_latency import run_guarded, arun_guarded, DeadlineExceeded
+from O1A_assessment.utils import item_prefilter
+from O1A_assessment.inference.chain_registry import chain_registry, get_chat_model
 
 # =============== LLM Config ===============
 llm_name = "gpt-4o-mini"
@@ -26,9 +36,15 @@ params = {
     "api_key": LLM_API_dict[llm_name]["api_key"],
     "base_url": LLM_API_dict[llm_name]["base_url"],
 }
-llm = ChatOpenAI(**params)
+
+def get_llm():
+    # NOTE: the client is built on first use and shared afterwards
+    return get_chat_model(**params)
 
 # =============== Prompt Config ===============
+# NOTE: prompts are laid out prefix-first for the provider's prompt caching: tool schema, then a static system
+# message (byte-identical for a given chain/criterion), then the resume or extracted item as the last message.
+# Check static vs. dynamic tokens with benchmarks/prompt_prefix_report.py.
 # [STAGE 1] Generic Prompts for `List all the things that the person has done and meet the 8 criterion of O-1A``
 prompt_extract_info = ChatPromptTemplate.from_messages(
     [
@@ -47,53 +63,6 @@ criterion_template_life_long_achievements = "{brief_definition}\n"\
   "Examples of a qualifed achievement:\n"\
   "{examples}"
 
-class structured_output_life_long_achievements(BaseModel):
-    """List all life long acheivements that satisfy each of the following criterion."""
-    Awards: List[str] = Field(
-        description=criterion_template_life_long_achievements.format(
-            brief_definition = O1A_DFFINITIONS["Awards"]["evidentiary criterion"],
-            considerations = O1A_DFFINITIONS["Awards"]["considerations"],
-            examples = O1A_DFFINITIONS["Awards"]["examples"],
-      )+"\nPlease provide all relevant details, such as date, school information."
-    )
-    Membership: List[str] = Field(
-        description=criterion_template_life_long_achievements.format(
-            brief_definition = O1A_DFFINITIONS["Membership"]["evidentiary criterion"],
-            considerations = O1A_DFFINITIONS["Membership"]["considerations"],
-            examples = O1A_DFFINITIONS["Membership"]["examples"],
-      )+"\nPlease provide all relevant details, such as year, organization information."
-    )
-    Press: List[str] = Field(
-        description=criterion_template_life_long_achievements.format(
-            brief_definition = O1A_DFFINITIONS["Press"]["evidentiary criterion"],
-            considerations = O1A_DFFINITIONS["Press"]["considerations"],
-            examples = O1A_DFFINITIONS["Press"]["examples"],
-      )+"\nPlease provide all relevant details, such as publication type, source, and date."
-    )
-    Judging: List[str] = Field(
-        description=criterion_template_life_long_achievements.format(
-            brief_definition = O1A_DFFINITIONS["Judging"]["evidentiary criterion"],
-            considerations = O1A_DFFINITIONS["Judging"]["considerations"],
-            examples = O1A_DFFINITIONS["Judging"]["examples"],
-      )+"\nPlease provide all relevant details, such as conference, and date."
-    )
-    Original_contribution: List[str] = Field(
-        description=criterion_template_life_long_achievements.format(
-            brief_definition = O1A_DFFINITIONS["Original_contribution"]["evidentiary criterion"],
-            considerations = O1A_DFFINITIONS["Original_contribution"]["considerations"],
-            examples = O1A_DFFINITIONS["Original_contribution"]["examples"],
-      )+"\nPlease provide all relevant details, such as journal, conference, and date."
-    )
-    Scholarly_articles: List[str] = Field(
-        description=criterion_template_life_long_achievements.format(
-            brief_definition = O1A_DFFINITIONS["Scholarly_articles"]["evidentiary criterion"],
-            considerations = O1A_DFFINITIONS["Scholarly_articles"]["considerations"],
-            examples = O1A_DFFINITIONS["Scholarly_articles"]["examples"],
-      )+"\nPlease provide all relevant details, such as journal, conference, and date."
-    )
-
-list_life_long_achievements_chain = prompt_extract_info | llm.with_structured_output(structured_output_life_long_achievements, include_raw=False)
-
 # TODO: "High remuneration" does not fit well in this template
 criterion_template_employment = "{brief_definition}\n"\
   "A qualified cuurent job must fullfill the following consideration:\n"\
@@ -101,24 +70,89 @@ criterion_template_employment = "{brief_definition}\n"\
   "Examples of a qualifed current job:\n"\
   "{examples}"
 
-class structured_output_employment_status(BaseModel):
-    """List information of the user's current employment that could support an O-1A visa application."""
-    Critical_employment: List[str] = Field(
-        description=criterion_template_employment.format(
-            brief_definition = O1A_DFFINITIONS[ "Critical_employment"]["evidentiary criterion"],
-            considerations = O1A_DFFINITIONS["Critical_employment"]["considerations"],
-            examples = O1A_DFFINITIONS["Critical_employment"]["examples"],
-      )+"\nPlease provide all relevant details, such as postion and date."
-    )
-    High_remuneration: List[str] = Field(
-        description=criterion_template_employment.format(
-            brief_definition = O1A_DFFINITIONS["High_remuneration"]["evidentiary criterion"],
-            considerations = O1A_DFFINITIONS["High_remuneration"]["considerations"],
-            examples = O1A_DFFINITIONS["High_remuneration"]["examples"],
-      )+"\nPlease provide all relevant details, such as slary and date."
-    )
+# NOTE: field descriptions embed the O-1A knowledge, so the schemas are built on first use.
+@functools.lru_cache(maxsize=None)
+def build_extraction_schemas():
+    O1A_DFFINITIONS = get_O1A_definitions()
+
+    class structured_output_life_long_achievements(BaseModel):
+        """List all life long acheivements that satisfy each of the following criterion."""
+        Awards: List[str] = Field(
+            description=criterion_template_life_long_achievements.format(
+                brief_definition = O1A_DFFINITIONS["Awards"]["evidentiary criterion"],
+                considerations = O1A_DFFINITIONS["Awards"]["considerations"],
+                examples = O1A_DFFINITIONS["Awards"]["examples"],
+          )+"\nPlease provide all relevant details, such as date, school information."
+        )
+        Membership: List[str] = Field(
+            description=criterion_template_life_long_achievements.format(
+                brief_definition = O1A_DFFINITIONS["Membership"]["evidentiary criterion"],
+                considerations = O1A_DFFINITIONS["Membership"]["considerations"],
+                examples = O1A_DFFINITIONS["Membership"]["examples"],
+          )+"\nPlease provide all relevant details, such as year, organization information."
+        )
+        Press: List[str] = Field(
+            description=criterion_template_life_long_achievements.format(
+                brief_definition = O1A_DFFINITIONS["Press"]["evidentiary criterion"],
+                considerations = O1A_DFFINITIONS["Press"]["considerations"],
+                examples = O1A_DFFINITIONS["Press"]["examples"],
+          )+"\nPlease provide all relevant details, such as publication type, source, and date."
+        )
+        Judging: List[str] = Field(
+            description=criterion_template_life_long_achievements.format(
+                brief_definition = O1A_DFFINITIONS["Judging"]["evidentiary criterion"],
+                considerations = O1A_DFFINITIONS["Judging"]["considerations"],
+                examples = O1A_DFFINITIONS["Judging"]["examples"],
+          )+"\nPlease provide all relevant details, such as conference, and date."
+        )
+        Original_contribution: List[str] = Field(
+            description=criterion_template_life_long_achievements.format(
+                brief_definition = O1A_DFFINITIONS["Original_contribution"]["evidentiary criterion"],
+                considerations = O1A_DFFINITIONS["Original_contribution"]["considerations"],
+                examples = O1A_DFFINITIONS["Original_contribution"]["examples"],
+          )+"\nPlease provide all relevant details, such as journal, conference, and date."
+        )
+        Scholarly_articles: List[str] = Field(
+            description=criterion_template_life_long_achievements.format(
+                brief_definition = O1A_DFFINITIONS["Scholarly_articles"]["evidentiary criterion"],
+                considerations = O1A_DFFINITIONS["Scholarly_articles"]["considerations"],
+                examples = O1A_DFFINITIONS["Scholarly_articles"]["examples"],
+          )+"\nPlease provide all relevant details, such as journal, conference, and date."
+        )
 
-employment_status_chain = prompt_extract_info | llm.with_structured_output(structured_output_employment_status, include_raw=False)
+    class structured_output_employment_status(BaseModel):
+        """List information of the user's current employment that could support an O-1A visa application."""
+        Critical_employment: List[str] = Field(
+            description=criterion_template_employment.format(
+                brief_definition = O1A_DFFINITIONS[ "Critical_employment"]["evidentiary criterion"],
+                considerations = O1A_DFFINITIONS["Critical_employment"]["considerations"],
+                examples = O1A_DFFINITIONS["Critical_employment"]["examples"],
+          )+"\nPlease provide all relevant details, such as postion and date."
+        )
+        High_remuneration: List[str] = Field(
+            description=criterion_template_employment.format(
+                brief_definition = O1A_DFFINITIONS["High_remuneration"]["evidentiary criterion"],
+                considerations = O1A_DFFINITIONS["High_remuneration"]["considerations"],
+                examples = O1A_DFFINITIONS["High_remuneration"]["examples"],
+          )+"\nPlease provide all relevant details, such as slary and date."
+        )
+
+    return {
+        "life-long-achievements": structured_output_life_long_achievements,
+        "employment-status": structured_output_employment_status,
+    }
+
+
+def build_extraction_chains():
+    # NOTE: extraction chains run concurrently; results are merged in this (fixed) order.
+    return {
+        chain_name: prompt_extract_info | get_llm().with_structured_output(schema, include_raw=False)
+        for chain_name, schema in build_extraction_schemas().items()
+    }
+
+
+def get_extraction_chains():
+    return chain_registry.get(("extraction", llm_name), build_extraction_chains)
 
 # [STAGE 2] Role play a judge, output "Pass", "Reject", "More information needed"
 
@@ -156,6 +190,7 @@ class CriterionState(TypedDict):
     judgement: str
     judgements: list[str]
     judgement_summary: str
+    judgement_meta: Dict[Any, Any]
 
 def create_base_state(
         content: str = "",
@@ -166,6 +201,7 @@ def create_base_state(
         judgement: str="",
         judgements: list[Any] = [],
         judgement_summary: str = "",
+        judgement_meta: Dict[Any, Any] = {},
         ) -> CriterionState:
     return CriterionState(
         content=content,
@@ -176,8 +212,13 @@ def create_base_state(
         judgement=judgement,
         judgements=judgements,
         judgement_summary=judgement_summary,
+        judgement_meta=judgement_meta,
     )
 
+def merge_run_stats(left: Dict[Any, Any], right: Dict[Any, Any]) -> Dict[Any, Any]:
+    # NOTE: nodes report per-run statistics under their own keys
+    return {**left, **right}
+
 class OverallGraphState(TypedDict):
     resume_path: str
     contents: List[Any]
@@ -188,6 +229,7 @@ class OverallGraphState(TypedDict):
     judgement_dict: Dict[Any, Any]
     judgement_summary_dict: Dict[Any, Any]
     final_summary: str
+    run_stats: Annotated[dict, merge_run_stats]
 
 def create_overall_state(
         resume_path: str = "",
@@ -199,6 +241,7 @@ def create_overall_state(
         judgement_dict: Dict[Any, Any]={},
         judgement_summary_dict: Dict[Any, Any]={},
         final_summary: str="",
+        run_stats: Dict[Any, Any]={},
         ) -> OverallGraphState:
     return OverallGraphState(
         resume_path=resume_path,
@@ -210,27 +253,155 @@ def create_overall_state(
         judgement_dict=judgement_dict,
         judgement_summary_dict=judgement_summary_dict,
         final_summary=final_summary,
+        run_stats=run_stats,
     )
 
 # =============== Graph Edge Config ===============
+class CallNotNeeded(Exception):
+    pass
+
+# NOTE: set by nodes that schedule judge calls themselves (see rating_only.py): a callable returning False once a call
+# is no longer needed; a sync call that is already running cannot be cancelled, so it checks this before its request is sent
+current_call_needed = contextvars.ContextVar("current_call_needed", default=None)
+
+def ensure_call_needed():
+    call_needed = current_call_needed.get()
+    if call_needed is not None and not call_needed():
+        raise CallNotNeeded("call no longer needed before its request was sent")
+
+
+def estimate_call_tokens(chain, inputs, model):
+    # prompt tokens of a `prompt | llm` chain (messages and bound tool schema) plus a completion reserve, charged to the
+    # model's token budget and reconciled with the reported usage after the call; 0 (no tokenization) without a budget
+    if not get_llm_controller().has_token_budget(model):
+        return 0
+    tokens = chain_registry.get_schema_tokens(chain, lambda text: count_tokens(text, model)) + completion_reserve_tokens
+    prompt = getattr(chain, "first", None)
+    if prompt is None:
+        return tokens
+    return sum(count_tokens(str(message.content), model) for message in prompt.format_messages(**inputs)) + tokens
+
+
+def invoke_llm(chain, inputs, model=llm_name, stage=None, hedge=False):
+    # every LLM call goes through here (or `ainvoke_llm`), so the process-wide adaptive controller can pace it;
+    # `stage` applies that stage's deadline (DeadlineExceeded), `hedge` allows a duplicate call when slow (tail_latency.py)
+    tokens = estimate_call_tokens(chain, inputs, model)
+    def call(mark_started):
+        with llm_call_slot_sync(model, tokens, latency_key=id(chain)):
+            mark_started()
+            ensure_call_needed()
+            return chain.invoke(inputs)
+    return run_guarded(call, stage, hedge_key=(model, id(chain)) if hedge else None)
+
+
+async def ainvoke_llm(chain, inputs, model=llm_name, stage=None, hedge=False):
+    tokens = estimate_call_tokens(chain, inputs, model)
+    async def call(mark_started):
+        async with llm_call_slot(model, tokens, latency_key=id(chain)):
+            mark_started()
+            return await chain.ainvoke(inputs)
+    return await arun_guarded(call, stage, hedge_key=(model, id(chain)) if hedge else None)
+
+
+def make_deadline_judgement(stage):
+    # degraded verdict of an item whose judge call missed its stage deadline
+    return {"verdict": "More information needed", "explanation": f"Not judged: the {stage} deadline was exceeded."}
+
+
+def merge_extraction_responses(responses):
+    # responses: {chain name: structured output or exception}, merged in `build_extraction_schemas` order
+    extracted_content_dict = {}
+    extraction_errors = {}
+    for chain_name in build_extraction_schemas():
+        response = responses[chain_name]
+        if isinstance(response, Exception):
+            print(f"[content_extraction_node] {chain_name} extraction failed: {response!r}")
+            extraction_errors[chain_name] = repr(response)
+            response = {criterion: [] for criterion in criteria_map[chain_name]}
+        for key, val in dict(response).items():
+            extracted_content_dict[key] = copy.deepcopy(val)
+    if len(extraction_errors)==len(responses):
+        raise RuntimeError(f"[content_extraction_node] all extraction chains failed: {extraction_errors}")
+    return extracted_content_dict, extraction_errors
+
 
 def content_extraction_node(state: OverallGraphState):
     contents = state['contents']
     assert len(contents)==1 # NOTE: support text mode only for now.
     content_input = json.dumps({"user resume": contents[0]}, ensure_ascii=False)
     user_input = HumanMessage(content=content_input)
-    response = list_life_long_achievements_chain.invoke({"messages": [user_input]})
-    extracted_content_dict = copy.deepcopy(dict(response))
-    response = employment_status_chain.invoke({"messages": [user_input]})
-    for key, val in dict(response).items():
-        extracted_content_dict[key] = val
+    extraction_chains = get_extraction_chains()
+    responses = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(extraction_chains)) as executor:
+        futures = {
+            # NOTE: copy context so callbacks attached to the graph run see these calls
+            chain_name: executor.submit(contextvars.copy_context().run, invoke_llm, chain, {"messages": [user_input]}, stage="extraction")
+            for chain_name, chain in extraction_chains.items()
+        }
+        for chain_name, future in futures.items():
+            try:
+                responses[chain_name] = future.result()
+            except Exception as e:
+                responses[chain_name] = e
+    extracted_content_dict, extraction_errors = merge_extraction_responses(responses)
+    output = create_overall_state(
+        contents=state['contents'],
+        extracted_content_dict=extracted_content_dict,
+        run_stats={"extraction_errors": extraction_errors} if extraction_errors else {},
+    )
+    return output
+
+
+async def acontent_extraction_node(state: OverallGraphState):
+    contents = state['contents']
+    assert len(contents)==1 # NOTE: support text mode only for now.
+    content_input = json.dumps({"user resume": contents[0]}, ensure_ascii=False)
+    user_input = HumanMessage(content=content_input)
+    extraction_chains = get_extraction_chains()
+    results = await asyncio.gather(
+        *[ainvoke_llm(chain, {"messages": [user_input]}, stage="extraction") for chain in extraction_chains.values()],
+        return_exceptions=True,
+    )
+    responses = dict(zip(extraction_chains.keys(), results))
+    extracted_content_dict, extraction_errors = merge_extraction_responses(responses)
     output = create_overall_state(
         contents=state['contents'],
         extracted_content_dict=extracted_content_dict,
+        run_stats={"extraction_errors": extraction_errors} if extraction_errors else {},
     )
     return output
 
 
+def make_prefilter_judgement(decision):
+    return {"verdict": "Reject", "explanation": f"Rejected by the local pre-filter ({decision['rule']}): {decision['reason']}"}
+
+
+def prefilter_content_node(state: OverallGraphState):
+    # NOTE: runs before distribute_*; rejected items go straight to collect_judgement, merged ones are only kept in the audit records
+    if not item_prefilter.prefilter_enabled:
+        return {"extracted_content_dict": state['extracted_content_dict']}
+    judged = {(j['criterion_of_interests'], j['extracted_content']) for j in state['collected_criterion_state']}
+    extracted_content_dict, decisions = item_prefilter.prefilter_items(state['extracted_content_dict'], keep=judged)
+    rejected_states = [
+        create_base_state(
+            criterion_of_interests = decision["criterion_of_interests"],
+            extracted_content = decision["extracted_content"],
+            judgement = make_prefilter_judgement(decision),
+            judgement_meta = {"prefilter": decision["rule"]},
+        )
+        for decision in decisions if decision["action"]=="rejected"
+    ]
+    num_rejected = len(rejected_states)
+    run_stats = {"prefilter": {
+        "items": sum(len(items) for items in state['extracted_content_dict'].values()),
+        "rejected": num_rejected,
+        "merged": len(decisions) - num_rejected,
+        "saved_judge_calls": len(decisions), # NOTE: one judge call per item (items, not calls, in the batched workflow)
+        "decisions": decisions,
+    }}
+    return {"extracted_content_dict": extracted_content_dict, "collected_criterion_state": rejected_states, "run_stats": run_stats}
+
+
 def distribute_judgement_cases(state: OverallGraphState):
     tasks = []
     for criterion_of_interests, extracted_contents in state['extracted_content_dict'].items():
@@ -243,11 +414,9 @@ def distribute_judgement_cases(state: OverallGraphState):
     return tasks
 
 
-def judge_content_node(state: CriterionState):
-    criterion_of_interests = state["criterion_of_interests"]
-    extracted_content = state["extracted_content"]
-    content_input = json.dumps({"user content": extracted_content}, ensure_ascii=False)
-    user_input = HumanMessage(content=content_input)
+@functools.lru_cache(maxsize=None)
+def get_criterion_description(criterion_of_interests):
+    O1A_DFFINITIONS = get_O1A_definitions()
     if criterion_of_interests in criteria_map["life-long-achievements"]:
         criterion_description = criterion_template_life_long_achievements.format(
             brief_definition = O1A_DFFINITIONS[criterion_of_interests]["evidentiary criterion"],
@@ -262,14 +431,96 @@ def judge_content_node(state: CriterionState):
         )
     else:
         raise ValueError(f"[judge_content_node] unexpected criterion: {criterion_of_interests}")
-    judgement_prompt = prompt_judge_info.partial(criterion_description=criterion_description) 
-    judge_chain =judgement_prompt | llm.with_structured_output(structured_judgement, include_raw=False)
-    response = judge_chain.invoke({"messages": [user_input]})
+    return criterion_description
+
+
+def build_judge_chain(criterion_of_interests):
+    judgement_prompt = prompt_judge_info.partial(criterion_description=get_criterion_description(criterion_of_interests))
+    return judgement_prompt | get_llm().with_structured_output(structured_judgement, include_raw=False)
+
+
+def get_judge_chain(criterion_of_interests):
+    # NOTE: one prebuilt chain per criterion, reused across calls
+    return chain_registry.get(("judge", criterion_of_interests, llm_name), lambda: build_judge_chain(criterion_of_interests))
+
+
+def prepare_judge_content(state: CriterionState):
+    extracted_content = state["extracted_content"]
+    content_input = json.dumps({"user content": extracted_content}, ensure_ascii=False)
+    user_input = HumanMessage(content=content_input)
+    judge_chain = get_judge_chain(state["criterion_of_interests"])
+    return judge_chain, user_input
+
+
+@functools.lru_cache(maxsize=None)
+def get_judge_prompt_hash(criterion_of_interests):
+    # NOTE: hash the rendered criterion prompt, so prompt/knowledge edits invalidate cached verdicts
+    criterion_description = get_criterion_description(criterion_of_interests)
+    system_prompt = prompt_judge_info.format_messages(criterion_description=criterion_description, messages=[])[0].content
+    return hash_text(llm_name + "\n" + system_prompt)
+
+
+def get_judgement_cache_key(state: CriterionState, prompt_hash=None):
+    if prompt_hash is None:
+        prompt_hash = get_judge_prompt_hash(state["criterion_of_interests"])
+    return get_judgement_cache().make_key(state["criterion_of_interests"], state["extracted_content"], prompt_hash)
+
+
+def lookup_judgement_cache(state: CriterionState, prompt_hash=None):
+    # NOTE: workflows judging with another prompt/model pass their own prompt_hash
+    if get_judgement_cache() is None:
+        return None, None, {}
+    cache_key = get_judgement_cache_key(state, prompt_hash)
+    cached = get_judgement_cache().get(cache_key)
+    if cached is None:
+        return cache_key, None, {"judgement_cache": "miss"}
+    saved_tokens = cached["prompt_tokens"] + cached["completion_tokens"]
+    return cache_key, cached["judgement"], {"judgement_cache": "hit", "saved_tokens": saved_tokens}
+
+
+def store_judgement_cache(state: CriterionState, cache_key, judge_chain, user_input, judgement):
+    if cache_key is None:
+        return
+    prompt_messages = judge_chain.first.format_messages(messages=[user_input])
+    prompt_tokens = sum(count_tokens(message.content, llm_name) for message in prompt_messages)
+    completion_tokens = count_tokens(json.dumps(judgement, ensure_ascii=False), llm_name)
+    get_judgement_cache().put(cache_key, state["criterion_of_interests"], judgement, prompt_tokens, completion_tokens)
+
+
+def judge_content_node(state: CriterionState):
+    cache_key, judgement, judgement_meta = lookup_judgement_cache(state)
+    if judgement is None:
+        judge_chain, user_input = prepare_judge_content(state)
+        try:
+            response = invoke_llm(judge_chain, {"messages": [user_input]}, stage="judging", hedge=True)
+            judgement = dict(response)
+            store_judgement_cache(state, cache_key, judge_chain, user_input, judgement)
+        except DeadlineExceeded:
+            judgement, judgement_meta = make_deadline_judgement("judging"), {**judgement_meta, "deadline_exceeded": "judging"}
     output = create_base_state(
         criterion_of_interests = state["criterion_of_interests"],
         extracted_content = state["extracted_content"],
-        judgement = dict(response)
-        
+        judgement = judgement,
+        judgement_meta = judgement_meta,
+    )
+    return {"collected_criterion_state": [output]}
+
+
+async def ajudge_content_node(state: CriterionState):
+    cache_key, judgement, judgement_meta = await asyncio.to_thread(lookup_judgement_cache, state)
+    if judgement is None:
+        judge_chain, user_input = prepare_judge_content(state)
+        try:
+            response = await ainvoke_llm(judge_chain, {"messages": [user_input]}, stage="judging", hedge=True)
+            judgement = dict(response)
+            await asyncio.to_thread(store_judgement_cache, state, cache_key, judge_chain, user_input, judgement)
+        except DeadlineExceeded:
+            judgement, judgement_meta = make_deadline_judgement("judging"), {**judgement_meta, "deadline_exceeded": "judging"}
+    output = create_base_state(
+        criterion_of_interests = state["criterion_of_interests"],
+        extracted_content = state["extracted_content"],
+        judgement = judgement,
+        judgement_meta = judgement_meta,
     )
     return {"collected_criterion_state": [output]}
 
@@ -283,15 +534,57 @@ def collect_judgement_node(state: OverallGraphState):
             "verdict": j['judgement']['verdict'],
             "rationale": j['judgement']['explanation'].replace('\\n', '\n'),
         }
+        if j.get('judgement_meta', {}).get('deadline_exceeded'):
+            reformat_judgement["deadline_exceeded"] = True
+        if j.get('judgement_meta', {}).get('cascade_unresolved'):
+            reformat_judgement["cascade_unresolved"] = True
+        if j.get('judgement_meta', {}).get('prefilter'):
+            reformat_judgement["prefilter"] = j['judgement_meta']['prefilter']
         judgement_dict[criterion_of_interests].append(reformat_judgement)
 
+    run_stats = {}
+    judgement_metas = [j.get('judgement_meta', {}) for j in state['collected_criterion_state']]
+    cache_lookups = [meta for meta in judgement_metas if "judgement_cache" in meta]
+    if cache_lookups:
+        cache_hits = [meta for meta in cache_lookups if meta["judgement_cache"]=="hit"]
+        run_stats["judgement_cache"] = {
+            "hits": len(cache_hits),
+            "misses": len(cache_lookups)-len(cache_hits),
+            "hit_ratio": len(cache_hits)/len(cache_lookups),
+            "saved_tokens": sum(meta["saved_tokens"] for meta in cache_hits),
+        }
+
+    # NOTE: batched judgements share one LLM call per batch; cached, pre-filtered, skipped (rating_only.py), and reused (incremental.py) ones need none
+    run_stats["judge_calls"] = round(sum(
+        0 if meta.get("judgement_cache")=="hit" or meta.get("prefilter") or meta.get("not_judged") or meta.get("reused_from") else 1/meta.get("judge_batch_size", 1)
+        for meta in judgement_metas
+    ))
+
+    # NOTE: degraded items, judged "More information needed" because their call missed the judging deadline
+    num_deadline_exceeded = sum(1 for meta in judgement_metas if meta.get("deadline_exceeded"))
+    if num_deadline_exceeded:
+        run_stats["deadline_exceeded_items"] = num_deadline_exceeded
+
     return create_overall_state(
         contents=state['contents'],
         extracted_content_dict=state['extracted_content_dict'],
         judgement_dict=judgement_dict,
+        run_stats=run_stats,
     )
 
 
+def get_rating(num_solid_criteria, num_questionable_criteria):
+    # NOTE: The rating will be based on the following conditions:
+    # High: Three criteria have been identified, with high confidence that the requirements for those criteria have been fully met.
+    # Medium: Three potential criteria have been identified (including at least one with high confidence), but additional information or justification is needed to ensure the requirements are fully satisfied.
+    # Low: Any other cases that do not meet the above conditions.
+    if num_solid_criteria>=3:
+        return "High"
+    if num_solid_criteria+num_questionable_criteria>=3 and num_solid_criteria>=1:
+        return "Medium"
+    return "Low"
+
+
 def summarize_judgement_node(state: OverallGraphState):
     criteria = ["Awards", "Membership", "Press", "Judging", "Original_contribution", "Scholarly_articles", "Critical_employment", "High_remuneration"]
     judgement_summary_dict = {
@@ -307,19 +600,16 @@ def summarize_judgement_node(state: OverallGraphState):
             elif reformat_judgement["verdict"].lower()=="more information needed":
                 judgement_summary_dict["Content needed more information"][criterion_of_interests]+=1
 
-    # NOTE: The rating will be based on the following conditions:
-    # High: Three criteria have been identified, with high confidence that the requirements for those criteria have been fully met.
-    # Medium: Three potential criteria have been identified (including at least one with high confidence), but additional information or justification is needed to ensure the requirements are fully satisfied.
-    # Low: Any other cases that do not meet the above conditions.
     solid_criteria = [criterion for criterion, count in judgement_summary_dict["Content Passed"].items() if count >= 1]
     questionable_criteria = [criterion for criterion, count in judgement_summary_dict["Content needed more information"].items() if (count >= 1) and (criterion not in solid_criteria)]
-    
-    if len(solid_criteria)>=3:
+    rating = get_rating(len(solid_criteria), len(questionable_criteria))
+
+    if rating=="High":
         judgement_summary_dict["Rating"] = "High"
         judgement_summary_dict["Rating rationale"] = f"The user's experience will likely satisfy {len(solid_criteria)} criteria {solid_criteria} for O-1A application."
-        if questionable_criteria>=1:
+        if len(questionable_criteria)>=1:
             judgement_summary_dict["Rating rationale"]+=f"\nAdditional experience in {len(questionable_criteria)} criteria {questionable_criteria} could potentially satisfy O-1A requirement."
-    elif len(solid_criteria)+len(questionable_criteria)>=3 and len(solid_criteria)>=1:
+    elif rating=="Medium":
         judgement_summary_dict["Rating"] = "Medium"
         judgement_summary_dict["Rating rationale"] = f"The user's experience will likely satisfy {len(solid_criteria)} criteria {solid_criteria} for O-1A application."
         judgement_summary_dict["Rating rationale"]+=f"\nMore information is needed in {len(questionable_criteria)} criteria {questionable_criteria} to see if O-1A requirements could be met."
@@ -360,51 +650,184 @@ def summarize_judgement_node(state: OverallGraphState):
     )
 
 # =============== Graph Config ===============
-workflow = StateGraph(OverallGraphState)
-workflow.add_node("content_extraction", content_extraction_node)
-workflow.add_node("judge_content", judge_content_node)
-workflow.add_node("collect_judgement", collect_judgement_node)
-workflow.add_node("summarize_judgement", summarize_judgement_node)
-
-workflow.set_entry_point("content_extraction")
-workflow.add_conditional_edges("content_extraction", distribute_judgement_cases) # send to: judge_content
-workflow.add_edge("judge_content", "collect_judgement")
-workflow.add_edge("collect_judgement","summarize_judgement")
-
-graph = workflow.compile()
+def build_graph(content_extraction_fn=content_extraction_node, judge_content_fn=judge_content_node, distribute_fn=distribute_judgement_cases, summarize_fn=summarize_judgement_node, collect_fn=collect_judgement_node, prefilter_fn=prefilter_content_node):
+    workflow = StateGraph(OverallGraphState)
+    workflow.add_node("content_extraction", instrument_node("content_extraction", content_extraction_fn))
+    workflow.add_node("prefilter_content", instrument_node("prefilter_content", prefilter_fn))
+    workflow.add_node("judge_content", instrument_node("judge_content", judge_content_fn))
+    workflow.add_node("collect_judgement", instrument_node("collect_judgement", collect_fn))
+    workflow.add_node("summarize_judgement", instrument_node("summarize_judgement", summarize_fn))
+
+    workflow.set_entry_point("content_extraction")
+    workflow.add_edge("content_extraction", "prefilter_content")
+    workflow.add_conditional_edges("prefilter_content", distribute_fn) # send to: judge_content
+    workflow.add_edge("judge_content", "collect_judgement")
+    workflow.add_edge("collect_judgement","summarize_judgement")
+    return workflow.compile()
+
+# NOTE: compiled on first use rather than at import; the async graph is driven through `graph.ainvoke` so LLM calls do not block the event loop.
+@functools.lru_cache(maxsize=None)
+def get_graph(kind="sync"):
+    if kind=="async":
+        return build_graph(acontent_extraction_node, ajudge_content_node)
+    return build_graph()
 
 # =============== workflow wrapper ===============
-# Execute single case
-def basline_fn(input_file_path, output_dir):
-    # =============== Preprocess input ===============
-    pdf_text = pdf_to_text_ver_basic(pdf_path = input_file_path)
-    contents = [pdf_text]
-
-    # =============== INFERENCE ===============
-    initial_state = create_overall_state(
-        contents = contents,
-    )
-    result = graph.invoke(initial_state)
-
-    # =============== EXPORT to local ===============
+def export_workflow_output(output_dir, entry):
+    # NOTE: output_dir None: nothing is written, the caller keeps the returned entry (e.g. in-memory uploads)
+    if output_dir is None:
+        return None
     os.makedirs(output_dir, exist_ok=True)
     export_path = os.path.join(output_dir, "workflows_output.jsonl")
     with open(export_path, 'w', encoding='utf-8') as file:
-        entry = {
-            "workflow": "baseline",
-            "contents": contents,
-            "extracted_content_dict": result["extracted_content_dict"],
-            "judgement_dict": result["judgement_dict"],
-            "judgement_summary_dict":result["judgement_summary_dict"],
-            "final_summary":result["final_summary"],
-        }
         json_line = json.dumps(entry, ensure_ascii=False)
         file.write(json_line + '\n')
         file.flush()
+    return export_path
+
+
+def load_workflow_output(output_dir):
+    export_path = os.path.join(output_dir, "workflows_output.jsonl")
+    with open(export_path, 'r', encoding='utf-8') as file:
+        entry = json.loads(file.readline())
+    return entry
+
+
+def create_output_entry(contents, result, workflow="baseline"):
+    entry = {
+        "workflow": workflow,
+        "contents": contents,
+        "extracted_content_dict": result["extracted_content_dict"],
+        "judgement_dict": result["judgement_dict"],
+        "judgement_summary_dict":result["judgement_summary_dict"],
+        "final_summary":result["final_summary"],
+        "run_stats":result.get("run_stats", {}),
+    }
+    return entry
+
+
+def is_degraded_entry(entry):
+    # NOTE: a run that missed a deadline, lost an extraction chain, or kept an unresolved cascade judgement; callers should not cache it as the answer for this resume
+    run_stats = entry.get("run_stats", {})
+    return bool(run_stats.get("deadline_exceeded_items") or run_stats.get("extraction_errors") or run_stats.get("cascade_unresolved_items"))
+
+
+def attach_run_metrics(entry, run_metrics):
+    entry["metrics"] = run_metrics.to_dict()
+    return entry
+
+
+# Execute single case
+def execute_workflow(graph, input_file_path, output_dir, workflow="baseline", pdf_text=None):
+    with track_run_metrics(workflow) as run_metrics:
+        # =============== Preprocess input (skipped if the upload was parsed in memory) ===============
+        if pdf_text is None:
+            with time_stage("preprocess_pdf"):
+                pdf_text = pdf_to_text_ver_fast(pdf_path = input_file_path)
+        contents = [pdf_text]
+
+        # =============== INFERENCE ===============
+        initial_state = create_overall_state(
+            contents = contents,
+        )
+        result = graph.invoke(initial_state)
+
+    # =============== EXPORT to local ===============
+    entry = attach_run_metrics(create_output_entry(contents, result, workflow=workflow), run_metrics)
+    export_path = export_workflow_output(output_dir, entry)
 
     # =============== RETURN OUTPUT to user ===============
-    print(f"Export completed to {export_path}")
+    if export_path is not None:
+        print(f"Export completed to {export_path}")
     formatted_result = {
         "content": result["final_summary"],
+        "entry": entry,
     }
-    return formatted_result
\ No newline at end of file
+    return formatted_result
+
+
+# Execute single case without blocking the event loop
+async def aexecute_workflow(graph, input_file_path, output_dir, workflow="baseline", pdf_text=None):
+    with track_run_metrics(workflow) as run_metrics:
+        # =============== Preprocess input (worker thread, skipped if the upload was parsed in memory) ===============
+        if pdf_text is None:
+            with time_stage("preprocess_pdf"):
+                pdf_text = await asyncio.to_thread(pdf_to_text_ver_fast, pdf_path = input_file_path)
+        contents = [pdf_text]
+
+        # =============== INFERENCE ===============
+        initial_state = create_overall_state(
+            contents = contents,
+        )
+        result = await graph.ainvoke(initial_state)
+
+    # =============== EXPORT to local (worker thread) ===============
+    entry = attach_run_metrics(create_output_entry(contents, result, workflow=workflow), run_metrics)
+    export_path = await asyncio.to_thread(export_workflow_output, output_dir, entry)
+
+    # =============== RETURN OUTPUT to user ===============
+    if export_path is not None:
+        print(f"Export completed to {export_path}")
+    formatted_result = {
+        "content": result["final_summary"],
+        "entry": entry,
+    }
+    return formatted_result
+
+
+# Execute single case, yielding (event, data) pairs as graph nodes finish
+async def astream_workflow(graph, input_file_path, output_dir, workflow="baseline", pdf_text=None):
+    with track_run_metrics(workflow) as run_metrics:
+        # =============== Preprocess input (worker thread, skipped if the upload was parsed in memory) ===============
+        if pdf_text is None:
+            with time_stage("preprocess_pdf"):
+                pdf_text = await asyncio.to_thread(pdf_to_text_ver_fast, pdf_path = input_file_path)
+        contents = [pdf_text]
+
+        # =============== INFERENCE (streamed) ===============
+        initial_state = create_overall_state(
+            contents = contents,
+        )
+        result = None
+        async for stream_mode, chunk in graph.astream(initial_state, stream_mode=["updates", "values"]):
+            if stream_mode=="values":
+                result = chunk
+                continue
+            for node_name, update in chunk.items():
+                if node_name=="content_extraction":
+                    yield "extraction", {"extracted_content_dict": update["extracted_content_dict"]}
+                elif node_name in ["prefilter_content", "judge_content"]:
+                    # NOTE: pre-filter rejections are streamed as judgements too
+                    for criterion_state in update.get("collected_criterion_state", []):
+                        yield "judgement", {
+                            "criterion_of_interests": criterion_state["criterion_of_interests"],
+                            "extracted_content": criterion_state["extracted_content"],
+                            "verdict": criterion_state["judgement"]["verdict"],
+                            "rationale": criterion_state["judgement"]["explanation"].replace('\\n', '\n'),
+                        }
+
+    # =============== EXPORT to local (worker thread) ===============
+    entry = attach_run_metrics(create_output_entry(contents, result, workflow=workflow), run_metrics)
+    export_path = await asyncio.to_thread(export_workflow_output, output_dir, entry)
+    if export_path is not None:
+        print(f"Export completed to {export_path}")
+
+    # =============== RETURN OUTPUT to user ===============
+    yield "summary", {
+        "judgement_summary_dict": result["judgement_summary_dict"],
+        "content": result["final_summary"],
+    }
+    # NOTE: last pair, the full entry for the caller to store; not an event for clients
+    yield "entry", entry
+
+
+def basline_fn(input_file_path, output_dir, pdf_text=None):
+    return execute_workflow(get_graph("sync"), input_file_path, output_dir, workflow="baseline", pdf_text=pdf_text)
+
+
+async def basline_fn_async(input_file_path, output_dir, pdf_text=None):
+    return await aexecute_workflow(get_graph("async"), input_file_path, output_dir, workflow="baseline", pdf_text=pdf_text)
+
+
+def basline_stream_fn(input_file_path, output_dir, pdf_text=None):
+    return astream_workflow(get_graph("async"), input_file_path, output_dir, workflow="baseline", pdf_text=pdf_text)
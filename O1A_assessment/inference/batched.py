@@ -0,0 +1,177 @@
+import json
+import asyncio
+import functools
+from typing import List
+
+from langgraph.constants import Send
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.pydantic_v1 import BaseModel, Field
+from langchain_core.messages import HumanMessage
+
+from O1A_assessment.utils.token_counter import count_tokens
+from O1A_assessment.utils.tail_latency import DeadlineExceeded
+from O1A_assessment.inference.chain_registry import chain_registry
+from O1A_assessment.inference.baseline import (
+    get_llm,
+    llm_name,
+    structured_judgement,
+    get_criterion_description,
+    create_base_state,
+    content_extraction_node,
+    acontent_extraction_node,
+    judge_content_node,
+    ajudge_content_node,
+    invoke_llm,
+    ainvoke_llm,
+    build_graph,
+    execute_workflow,
+    aexecute_workflow,
+    astream_workflow,
+)
+
+# =============== Batch Config ===============
+# NOTE: max input tokens (criterion prompt + items) per batched judge call; larger criteria are split.
+batch_token_budget = 6000
+max_batch_size = 20
+
+# =============== Prompt Config ===============
+# [STAGE 2] Role play a judge, one call per criterion (batch of extracted items)
+# NOTE: static text only in the system message (instructions shared by all criteria first), the batch last.
+prompt_judge_batch_info = ChatPromptTemplate.from_messages(
+    [
+        ("system", "Please act as an impartial judge and assess whether each of the user's achievements meets the criterion specified below."\
+         " The user will provide a list of achievements, each with an index."\
+         " Assess every achievement independently, and return exactly one judgement per achievement with its index.\n"\
+         "{criterion_description}"\
+        ),
+        MessagesPlaceholder(variable_name="messages"),
+    ]
+)
+
+class structured_indexed_judgement(structured_judgement):
+    index: int = Field(
+        description="The index of the user's achievement being judged",
+    )
+
+class structured_judgement_batch(BaseModel):
+    """Judge each of the user's achievements against the specified criterion."""
+    judgements: List[structured_indexed_judgement] = Field(
+        description="One judgement per user achievement, in the same order as provided",
+    )
+
+
+# =============== Graph Edge Config ===============
+def split_into_batches(criterion_of_interests, extracted_contents):
+    # greedy split so each call stays within `batch_token_budget` and `max_batch_size`
+    prompt_tokens = count_tokens(get_criterion_description(criterion_of_interests), llm_name)
+    batches = []
+    batch, batch_tokens = [], prompt_tokens
+    for extracted_content in extracted_contents:
+        item_tokens = count_tokens(extracted_content, llm_name) + 8 # NOTE: index/json overhead
+        if batch and (batch_tokens + item_tokens > batch_token_budget or len(batch) >= max_batch_size):
+            batches.append(batch)
+            batch, batch_tokens = [], prompt_tokens
+        batch.append(extracted_content)
+        batch_tokens += item_tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def distribute_batched_judgement_cases(state):
+    tasks = []
+    for criterion_of_interests, extracted_contents in state['extracted_content_dict'].items():
+        for batch in split_into_batches(criterion_of_interests, extracted_contents):
+            package = create_base_state(
+                criterion_of_interests=criterion_of_interests,
+                extracted_contents=batch,
+            )
+            tasks.append(Send("judge_content", package))
+    return tasks
+
+
+def build_judge_batch_chain(criterion_of_interests):
+    judgement_prompt = prompt_judge_batch_info.partial(criterion_description=get_criterion_description(criterion_of_interests))
+    return judgement_prompt | get_llm().with_structured_output(structured_judgement_batch, include_raw=False)
+
+
+def prepare_judge_content_batch(state):
+    criterion_of_interests = state["criterion_of_interests"]
+    judge_chain = chain_registry.get(("judge_batch", criterion_of_interests, llm_name), lambda: build_judge_batch_chain(criterion_of_interests))
+    content_input = json.dumps(
+        {"user contents": [{"index": i, "content": content} for i, content in enumerate(state["extracted_contents"])]},
+        ensure_ascii=False,
+    )
+    return judge_chain, HumanMessage(content=content_input)
+
+
+def match_batch_judgements(state, response):
+    # returns {index: judgement}; items the model skipped are judged individually afterwards
+    judgements = {}
+    for judgement in (response.judgements if response is not None else []):
+        if 0 <= judgement.index < len(state["extracted_contents"]) and judgement.index not in judgements:
+            judgements[judgement.index] = {"explanation": judgement.explanation, "verdict": judgement.verdict}
+    return judgements
+
+
+def create_batch_output(state, judgements, fallback_states):
+    outputs = []
+    for i, extracted_content in enumerate(state["extracted_contents"]):
+        if i in judgements:
+            outputs.append(create_base_state(
+                criterion_of_interests = state["criterion_of_interests"],
+                extracted_content = extracted_content,
+                judgement = judgements[i],
+                judgement_meta = {"judge_batch_size": len(state["extracted_contents"])},
+            ))
+    for fallback_state in fallback_states:
+        outputs += fallback_state["collected_criterion_state"]
+    return {"collected_criterion_state": outputs}
+
+
+def judge_content_batch_node(state):
+    judge_chain, user_input = prepare_judge_content_batch(state)
+    try:
+        response = invoke_llm(judge_chain, {"messages": [user_input]}, stage="judging", hedge=True)
+    except DeadlineExceeded:
+        response = None # NOTE: the per-item fallback below marks every item of the batch as degraded
+    judgements = match_batch_judgements(state, response)
+    fallback_states = [
+        judge_content_node(create_base_state(criterion_of_interests=state["criterion_of_interests"], extracted_content=extracted_content))
+        for i, extracted_content in enumerate(state["extracted_contents"]) if i not in judgements
+    ]
+    return create_batch_output(state, judgements, fallback_states)
+
+
+async def ajudge_content_batch_node(state):
+    judge_chain, user_input = prepare_judge_content_batch(state)
+    try:
+        response = await ainvoke_llm(judge_chain, {"messages": [user_input]}, stage="judging", hedge=True)
+    except DeadlineExceeded:
+        response = None # NOTE: the per-item fallback below marks every item of the batch as degraded
+    judgements = match_batch_judgements(state, response)
+    fallback_states = await asyncio.gather(*[
+        ajudge_content_node(create_base_state(criterion_of_interests=state["criterion_of_interests"], extracted_content=extracted_content))
+        for i, extracted_content in enumerate(state["extracted_contents"]) if i not in judgements
+    ])
+    return create_batch_output(state, judgements, fallback_states)
+
+# =============== Graph Config ===============
+# NOTE: compiled on first use, not at import (see baseline.get_graph)
+@functools.lru_cache(maxsize=None)
+def get_graph(kind="sync"):
+    if kind=="async":
+        return build_graph(acontent_extraction_node, ajudge_content_batch_node, distribute_batched_judgement_cases)
+    return build_graph(content_extraction_node, judge_content_batch_node, distribute_batched_judgement_cases)
+
+# =============== workflow wrapper ===============
+def batched_fn(input_file_path, output_dir, pdf_text=None):
+    return execute_workflow(get_graph("sync"), input_file_path, output_dir, workflow="batched", pdf_text=pdf_text)
+
+
+async def batched_fn_async(input_file_path, output_dir, pdf_text=None):
+    return await aexecute_workflow(get_graph("async"), input_file_path, output_dir, workflow="batched", pdf_text=pdf_text)
+
+
+def batched_stream_fn(input_file_path, output_dir, pdf_text=None):
+    return astream_workflow(get_graph("async"), input_file_path, output_dir, workflow="batched", pdf_text=pdf_text)
@@ -0,0 +1,258 @@
+import json
+import asyncio
+import functools
+import collections
+
+from langchain_core.pydantic_v1 import Field
+from langchain_core.messages import HumanMessage
+
+from O1A_assessment.utils.llm_configs import LLM_API_dict
+from O1A_assessment.utils.judgement_cache import hash_text
+from O1A_assessment.utils.tail_latency import DeadlineExceeded
+from O1A_assessment.inference.chain_registry import chain_registry, get_chat_model
+from O1A_assessment.inference.baseline import (
+    params,
+    prompt_judge_info,
+    structured_judgement,
+    get_criterion_description,
+    create_base_state,
+    lookup_judgement_cache,
+    store_judgement_cache,
+    content_extraction_node,
+    acontent_extraction_node,
+    collect_judgement_node,
+    make_deadline_judgement,
+    invoke_llm,
+    ainvoke_llm,
+    build_graph,
+    execute_workflow,
+    aexecute_workflow,
+    astream_workflow,
+)
+
+# =============== Cascade Config ===============
+# NOTE: every judge call starts at the first tier. A judgement moves on to the next tier when its verdict is in
+# `escalate_verdicts`, its confidence is below `min_confidence`, or the structured output is malformed (or the call fails).
+# The last tier's judgement is final.
+cascade_tiers = [
+    {"model": "gpt-4o-mini", "escalate_verdicts": ["More information needed"], "min_confidence": 0.7},
+    {"model": "gpt-4o"},
+]
+VALID_VERDICTS = ["pass", "reject", "more information needed"]
+
+# =============== Prompt Config ===============
+# [STAGE 2] Role play a judge (same prompt as baseline), also reporting confidence
+class structured_judgement_with_confidence(structured_judgement):
+    confidence: float = Field(
+        description="Your confidence in the verdict, from 0.0 (a guess) to 1.0 (certain)",
+    )
+
+
+def get_tier_llm(model):
+    return get_chat_model(**{**params, "model": model, "api_key": LLM_API_dict[model]["api_key"], "base_url": LLM_API_dict[model]["base_url"]})
+
+
+def build_tier_judge_chain(criterion_of_interests, model):
+    judgement_prompt = prompt_judge_info.partial(criterion_description=get_criterion_description(criterion_of_interests))
+    # NOTE: include_raw, so a malformed output is escalated instead of raised
+    return judgement_prompt | get_tier_llm(model).with_structured_output(structured_judgement_with_confidence, include_raw=True)
+
+
+def get_tier_judge_chain(criterion_of_interests, model):
+    return chain_registry.get(("judge_cascade", criterion_of_interests, model), lambda: build_tier_judge_chain(criterion_of_interests, model))
+
+
+@functools.lru_cache(maxsize=None)
+def get_cascade_prompt_hash(criterion_of_interests):
+    # NOTE: cached verdicts depend on the whole tier config, not on a single model
+    criterion_description = get_criterion_description(criterion_of_interests)
+    system_prompt = prompt_judge_info.format_messages(criterion_description=criterion_description, messages=[])[0].content
+    return hash_text(json.dumps(cascade_tiers, sort_keys=True) + "\n" + system_prompt)
+
+# =============== Graph Edge Config ===============
+def check_escalation(tier, response):
+    # returns (judgement or None, reason to escalate or None)
+    if isinstance(response, Exception):
+        return None, "error"
+    if response["parsing_error"] is not None or response["parsed"] is None:
+        return None, "malformed"
+    judgement = dict(response["parsed"])
+    if judgement["verdict"].lower() not in VALID_VERDICTS:
+        return judgement, "malformed"
+    if judgement["verdict"].lower() in [verdict.lower() for verdict in tier.get("escalate_verdicts", [])]:
+        return judgement, "verdict"
+    if judgement["confidence"] < tier.get("min_confidence", 0.0):
+        return judgement, "low_confidence"
+    return judgement, None
+
+
+class CascadeAttempts:
+    """Judgements of one item through the tiers; the latest parsed judgement wins."""
+    def __init__(self):
+        self.judgement = None
+        self.final_tier = None
+        self.tiers_called = []
+        self.escalations = []
+        self.error = None
+        self.resolved = False
+        self.deadline_exceeded = False
+
+    def record(self, tier, response, is_last_tier):
+        # returns True once the judgement is final
+        self.tiers_called.append(tier["model"])
+        judgement, reason = check_escalation(tier, response)
+        if judgement is not None:
+            self.judgement, self.final_tier = judgement, tier["model"]
+        if isinstance(response, Exception):
+            self.error = response
+        # NOTE: resolved = this tier answered with a usable verdict that needs no further tier (or there is none)
+        self.resolved = judgement is not None and (reason is None or (is_last_tier and reason!="malformed"))
+        if reason is None or is_last_tier:
+            return True
+        self.escalations.append(reason)
+        return False
+
+    def record_deadline(self, tier):
+        # NOTE: the judging deadline passed during this tier's call; the item is degraded, whatever earlier tiers said
+        self.tiers_called.append(tier["model"])
+        self.deadline_exceeded = True
+
+    def result(self):
+        if self.deadline_exceeded:
+            judgement_meta = {
+                "cascade_tiers_called": self.tiers_called,
+                "cascade_final_tier": None,
+                "cascade_escalations": self.escalations,
+                "deadline_exceeded": "judging",
+            }
+            return make_deadline_judgement("judging"), judgement_meta
+        if self.judgement is None:
+            raise self.error or ValueError(f"[judge_cascade_node] malformed judgement from every tier: {self.tiers_called}")
+        judgement_meta = {
+            "cascade_tiers_called": self.tiers_called,
+            "cascade_final_tier": self.final_tier,
+            "cascade_escalations": self.escalations,
+        }
+        if not self.resolved:
+            # NOTE: a later tier failed or was malformed, so an earlier tier's escalated judgement stands in; degraded, never cached
+            judgement_meta["cascade_unresolved"] = True
+        return self.judgement, judgement_meta
+
+    def is_cacheable(self):
+        return self.resolved and self.error is None and not self.deadline_exceeded
+
+
+def make_judge_input(state):
+    return HumanMessage(content=json.dumps({"user content": state["extracted_content"]}, ensure_ascii=False))
+
+
+def judge_cascade_node(state):
+    prompt_hash = get_cascade_prompt_hash(state["criterion_of_interests"])
+    cache_key, judgement, judgement_meta = lookup_judgement_cache(state, prompt_hash)
+    if judgement is None:
+        user_input = make_judge_input(state)
+        attempts = CascadeAttempts()
+        for tier_index, tier in enumerate(cascade_tiers):
+            judge_chain = get_tier_judge_chain(state["criterion_of_interests"], tier["model"])
+            try:
+                response = invoke_llm(judge_chain, {"messages": [user_input]}, model=tier["model"], stage="judging", hedge=True)
+            except DeadlineExceeded:
+                attempts.record_deadline(tier)
+                break
+            except Exception as e:
+                response = e
+            if attempts.record(tier, response, is_last_tier=tier_index==len(cascade_tiers)-1):
+                break
+        judgement, cascade_meta = attempts.result()
+        judgement_meta = {**judgement_meta, **cascade_meta}
+        if attempts.is_cacheable():
+            store_judgement_cache(state, cache_key, judge_chain, user_input, judgement)
+    output = create_base_state(
+        criterion_of_interests = state["criterion_of_interests"],
+        extracted_content = state["extracted_content"],
+        judgement = judgement,
+        judgement_meta = judgement_meta,
+    )
+    return {"collected_criterion_state": [output]}
+
+
+async def ajudge_cascade_node(state):
+    prompt_hash = get_cascade_prompt_hash(state["criterion_of_interests"])
+    cache_key, judgement, judgement_meta = await asyncio.to_thread(lookup_judgement_cache, state, prompt_hash)
+    if judgement is None:
+        user_input = make_judge_input(state)
+        attempts = CascadeAttempts()
+        for tier_index, tier in enumerate(cascade_tiers):
+            judge_chain = get_tier_judge_chain(state["criterion_of_interests"], tier["model"])
+            try:
+                response = await ainvoke_llm(judge_chain, {"messages": [user_input]}, model=tier["model"], stage="judging", hedge=True)
+            except DeadlineExceeded:
+                attempts.record_deadline(tier)
+                break
+            except Exception as e:
+                response = e
+            if attempts.record(tier, response, is_last_tier=tier_index==len(cascade_tiers)-1):
+                break
+        judgement, cascade_meta = attempts.result()
+        judgement_meta = {**judgement_meta, **cascade_meta}
+        if attempts.is_cacheable():
+            await asyncio.to_thread(store_judgement_cache, state, cache_key, judge_chain, user_input, judgement)
+    output = create_base_state(
+        criterion_of_interests = state["criterion_of_interests"],
+        extracted_content = state["extracted_content"],
+        judgement = judgement,
+        judgement_meta = judgement_meta,
+    )
+    return {"collected_criterion_state": [output]}
+
+
+def collect_cascade_judgement_node(state):
+    output = collect_judgement_node(state)
+    judgement_metas = [j.get('judgement_meta', {}) for j in state['collected_criterion_state']]
+    tier_stats = {tier["model"]: {"calls": 0, "final": 0} for tier in cascade_tiers}
+    escalations = collections.Counter()
+    num_judged, num_escalated, num_unresolved = 0, 0, 0
+    for meta in judgement_metas:
+        if "cascade_tiers_called" not in meta:
+            continue # NOTE: cached judgement
+        num_judged += 1
+        num_escalated += len(meta["cascade_escalations"]) > 0
+        for model in meta["cascade_tiers_called"]:
+            tier_stats.setdefault(model, {"calls": 0, "final": 0})["calls"] += 1
+        if meta["cascade_final_tier"] is not None:
+            tier_stats.setdefault(meta["cascade_final_tier"], {"calls": 0, "final": 0})["final"] += 1
+        escalations.update(meta["cascade_escalations"])
+        num_unresolved += meta.get("cascade_unresolved", False)
+    output["run_stats"] = {
+        **output["run_stats"],
+        # NOTE: an escalated item costs one call per tier it went through
+        "judge_calls": sum(len(meta.get("cascade_tiers_called", [])) for meta in judgement_metas),
+        "cascade": {
+            "tiers": tier_stats,
+            "escalations": dict(escalations),
+            "escalation_rate": round(num_escalated/num_judged, 3) if num_judged else 0.0,
+        },
+    }
+    if num_unresolved:
+        output["run_stats"]["cascade_unresolved_items"] = num_unresolved
+    return output
+
+# =============== Graph Config ===============
+# NOTE: compiled on first use, not at import (see baseline.get_graph)
+@functools.lru_cache(maxsize=None)
+def get_graph(kind="sync"):
+    if kind=="async":
+        return build_graph(acontent_extraction_node, ajudge_cascade_node, collect_fn=collect_cascade_judgement_node)
+    return build_graph(content_extraction_node, judge_cascade_node, collect_fn=collect_cascade_judgement_node)
+
+# =============== workflow wrapper ===============
+def cascade_fn(input_file_path, output_dir, pdf_text=None):
+    return execute_workflow(get_graph("sync"), input_file_path, output_dir, workflow="cascade", pdf_text=pdf_text)
+
+
+async def cascade_fn_async(input_file_path, output_dir, pdf_text=None):
+    return await aexecute_workflow(get_graph("async"), input_file_path, output_dir, workflow="cascade", pdf_text=pdf_text)
+
+
+def cascade_stream_fn(input_file_path, output_dir, pdf_text=None):
+    return astream_workflow(get_graph("async"), input_file_path, output_dir, workflow="cascade", pdf_text=pdf_text)
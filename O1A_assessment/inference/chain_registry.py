@@ -0,0 +1,65 @@
+import json
+import threading
+import functools
+
+
+class ChainRegistry:
+    """Builds chains once, on first use, and reuses them for every later call."""
+    def __init__(self):
+        self._chains = {}
+        self._schema_tokens = {} # id(chain) -> (chain, tokens of its bound tool schema)
+        self._lock = threading.Lock()
+
+    def get(self, key, build_fn):
+        chain = self._chains.get(key)
+        if chain is None:
+            with self._lock:
+                chain = self._chains.get(key)
+                if chain is None:
+                    chain = build_fn()
+                    self._chains[key] = chain
+        return chain
+
+    def get_schema_tokens(self, chain, count_fn):
+        # tokens of the tool / structured-output schema bound into `chain`, measured once per chain
+        entry = self._schema_tokens.get(id(chain))
+        if entry is None or entry[0] is not chain:
+            entry = (chain, count_fn(serialize_bound_schema(chain)))
+            with self._lock:
+                self._schema_tokens[id(chain)] = entry
+        return entry[1]
+
+    def keys(self):
+        return list(self._chains.keys())
+
+    def clear(self):
+        with self._lock:
+            self._chains.clear()
+            self._schema_tokens.clear()
+        get_chat_model.cache_clear()
+
+
+chain_registry = ChainRegistry()
+
+
+def serialize_bound_schema(chain):
+    # tool / response format payload the chat model sends along with the messages ("" if none)
+    payload = {}
+    for step in getattr(chain, "steps", [chain]):
+        kwargs = getattr(step, "kwargs", None) or {}
+        payload.update({key: kwargs[key] for key in ["tools", "functions", "response_format"] if key in kwargs})
+    return json.dumps(payload, ensure_ascii=False, default=str) if payload else ""
+
+
+@functools.lru_cache(maxsize=None)
+def get_chat_model(**params):
+    # NOTE: langchain_openai is slow to import, so it is only loaded when the first client is built.
+    from langchain_openai import ChatOpenAI
+    from O1A_assessment.utils.metrics import LLMMetricsCallback, build_instrumented_http_clients
+    http_client, http_async_client = build_instrumented_http_clients(params["model"])
+    return ChatOpenAI(
+        **params,
+        callbacks=[LLMMetricsCallback(params["model"])],
+        http_client=http_client,
+        http_async_client=http_async_client,
+    )
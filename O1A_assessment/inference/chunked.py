@@ -0,0 +1,152 @@
+import json
+import asyncio
+import contextvars
+import concurrent.futures
+import functools
+
+from langchain_core.messages import HumanMessage
+
+from O1A_assessment.utils.token_counter import count_tokens
+from O1A_assessment.utils.fuzzy_dedup import dedupe_items
+from O1A_assessment.inference.baseline import (
+    llm_name,
+    criteria_map,
+    build_extraction_schemas,
+    get_extraction_chains,
+    create_overall_state,
+    invoke_llm,
+    ainvoke_llm,
+    judge_content_node,
+    ajudge_content_node,
+    build_graph,
+    execute_workflow,
+    aexecute_workflow,
+    astream_workflow,
+)
+
+# =============== Chunk Config ===============
+# NOTE: max resume tokens per extraction call; a resume within budget is a single chunk (same as baseline).
+chunk_token_budget = 1500
+chunk_overlap_lines = 2 # NOTE: repeated at the start of the next chunk, so an item split at a boundary is seen whole
+dedup_threshold = 0.85
+
+# =============== Graph Edge Config ===============
+def split_into_chunks(text):
+    # greedy split on line boundaries; sections (blank-line separated) stay together when they fit
+    lines = text.split("\n")
+    chunks = []
+    chunk, chunk_tokens = [], 0
+    for line in lines:
+        line_tokens = count_tokens(line, llm_name) + 1
+        if chunk and chunk_tokens + line_tokens > chunk_token_budget:
+            chunks.append("\n".join(chunk))
+            chunk = chunk[-chunk_overlap_lines:] if chunk_overlap_lines else []
+            chunk_tokens = sum(count_tokens(overlap_line, llm_name) + 1 for overlap_line in chunk)
+        chunk.append(line)
+        chunk_tokens += line_tokens
+    if any(line.strip() for line in chunk) or not chunks:
+        chunks.append("\n".join(chunk))
+    return chunks
+
+
+def prepare_chunk_inputs(state):
+    contents = state['contents']
+    assert len(contents)==1 # NOTE: support text mode only for now.
+    chunks = split_into_chunks(contents[0])
+    return [HumanMessage(content=json.dumps({"user resume": chunk}, ensure_ascii=False)) for chunk in chunks]
+
+
+def merge_chunk_extractions(chunk_responses):
+    # chunk_responses: [{chain name: structured output or exception}] in chunk order
+    merged = {criterion: [] for chain_name in build_extraction_schemas() for criterion in criteria_map[chain_name]}
+    extraction_errors = {}
+    for chunk_index, responses in enumerate(chunk_responses):
+        for chain_name, response in responses.items():
+            if isinstance(response, Exception):
+                print(f"[chunked_content_extraction_node] {chain_name} extraction of chunk {chunk_index} failed: {response!r}")
+                extraction_errors[f"{chain_name}[{chunk_index}]"] = repr(response)
+                continue
+            for key, val in dict(response).items():
+                merged[key] += val
+    if len(extraction_errors)==sum(len(responses) for responses in chunk_responses):
+        raise RuntimeError(f"[chunked_content_extraction_node] all extraction calls failed: {extraction_errors}")
+
+    extracted_content_dict = {}
+    num_duplicates = 0
+    for criterion, items in merged.items():
+        extracted_content_dict[criterion], num_dropped = dedupe_items(items, threshold=dedup_threshold)
+        num_duplicates += num_dropped
+    run_stats = {"extraction_chunks": len(chunk_responses), "extraction_duplicates_removed": num_duplicates}
+    if extraction_errors:
+        run_stats["extraction_errors"] = extraction_errors
+    return extracted_content_dict, run_stats
+
+
+def chunked_content_extraction_node(state):
+    user_inputs = prepare_chunk_inputs(state)
+    extraction_chains = get_extraction_chains()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(user_inputs)*len(extraction_chains)) as executor:
+        futures = [
+            {
+                # NOTE: copy context so callbacks attached to the graph run see these calls
+                chain_name: executor.submit(contextvars.copy_context().run, invoke_llm, chain, {"messages": [user_input]}, stage="extraction")
+                for chain_name, chain in extraction_chains.items()
+            }
+            for user_input in user_inputs
+        ]
+        chunk_responses = []
+        for chunk_futures in futures:
+            responses = {}
+            for chain_name, future in chunk_futures.items():
+                try:
+                    responses[chain_name] = future.result()
+                except Exception as e:
+                    responses[chain_name] = e
+            chunk_responses.append(responses)
+    extracted_content_dict, run_stats = merge_chunk_extractions(chunk_responses)
+    return create_overall_state(
+        contents=state['contents'],
+        extracted_content_dict=extracted_content_dict,
+        run_stats=run_stats,
+    )
+
+
+async def achunked_content_extraction_node(state):
+    user_inputs = prepare_chunk_inputs(state)
+    extraction_chains = get_extraction_chains()
+    # all chunks x chains at once, so wall time follows the slowest chunk rather than the document length
+    results = await asyncio.gather(
+        *[ainvoke_llm(chain, {"messages": [user_input]}, stage="extraction") for user_input in user_inputs for chain in extraction_chains.values()],
+        return_exceptions=True,
+    )
+    num_chains = len(extraction_chains)
+    chunk_responses = [
+        dict(zip(extraction_chains.keys(), results[i*num_chains:(i+1)*num_chains]))
+        for i in range(len(user_inputs))
+    ]
+    extracted_content_dict, run_stats = merge_chunk_extractions(chunk_responses)
+    return create_overall_state(
+        contents=state['contents'],
+        extracted_content_dict=extracted_content_dict,
+        run_stats=run_stats,
+    )
+
+# =============== Graph Config ===============
+# NOTE: compiled on first use, not at import (see baseline.get_graph)
+@functools.lru_cache(maxsize=None)
+def get_graph(kind="sync"):
+    if kind=="async":
+        return build_graph(achunked_content_extraction_node, ajudge_content_node)
+    return build_graph(chunked_content_extraction_node, judge_content_node)
+
+# =============== workflow wrapper ===============
+def chunked_fn(input_file_path, output_dir, pdf_text=None):
+    return execute_workflow(get_graph("sync"), input_file_path, output_dir, workflow="chunked", pdf_text=pdf_text)
+
+
+async def chunked_fn_async(input_file_path, output_dir, pdf_text=None):
+    return await aexecute_workflow(get_graph("async"), input_file_path, output_dir, workflow="chunked", pdf_text=pdf_text)
+
+
+def chunked_stream_fn(input_file_path, output_dir, pdf_text=None):
+    return astream_workflow(get_graph("async"), input_file_path, output_dir, workflow="chunked", pdf_text=pdf_text)
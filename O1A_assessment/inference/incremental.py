@@ -0,0 +1,227 @@
+import difflib
+import functools
+import collections
+
+from langgraph.constants import Send
+
+from O1A_assessment.utils.fuzzy_dedup import to_words, is_near_duplicate, dedupe_items
+from O1A_assessment.inference.baseline import (
+    create_base_state,
+    create_overall_state,
+    content_extraction_node,
+    acontent_extraction_node,
+    judge_content_node,
+    ajudge_content_node,
+    collect_judgement_node,
+    build_graph,
+    execute_workflow,
+    aexecute_workflow,
+    astream_workflow,
+)
+from O1A_assessment.inference.cascade import judge_cascade_node, ajudge_cascade_node, collect_cascade_judgement_node
+
+# =============== Incremental Config ===============
+# NOTE: unchanged lines re-read around each changed hunk, so an edited bullet keeps its heading/date
+diff_context_lines = 2
+# NOTE: above this fraction of changed lines, the whole resume is re-extracted (unchanged items still reuse their verdicts)
+max_changed_fraction = 0.5
+dedup_threshold = 0.85
+REUSABLE_VERDICTS = ["pass", "reject", "more information needed"]
+# NOTE: judge step (sync judge, async judge, collect) of the workflow versions a run can be continued with;
+# batched and rating_only schedule their judge calls themselves, their runs are re-assessed in full
+incremental_judges = {
+    "default": (judge_content_node, ajudge_content_node, collect_judgement_node),
+    "chunked": (judge_content_node, ajudge_content_node, collect_judgement_node),
+    "cascade": (judge_cascade_node, ajudge_cascade_node, collect_cascade_judgement_node),
+}
+WORKFLOW_VERSIONS = {"baseline": "default"} # NOTE: entry "workflow" -> workflow version, where they differ
+
+# =============== Graph Edge Config ===============
+def diff_resume(old_text, new_text):
+    # returns (new-text hunks that were inserted or replaced, with context; old lines removed or replaced; number of changed lines)
+    old_lines, new_lines = old_text.split("\n"), new_text.split("\n")
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    spans, removed_lines = [], []
+    num_changed_lines = 0
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag=="equal":
+            continue
+        num_changed_lines += max(i2-i1, j2-j1)
+        removed_lines += old_lines[i1:i2]
+        if j2==j1:
+            continue # NOTE: pure deletion, nothing new to extract
+        start, end = max(0, j1-diff_context_lines), min(len(new_lines), j2+diff_context_lines)
+        if spans and start <= spans[-1][1]:
+            spans[-1][1] = max(spans[-1][1], end)
+        else:
+            spans.append([start, end])
+    return ["\n".join(new_lines[start:end]) for start, end in spans], removed_lines, num_changed_lines
+
+
+def is_stale_item(item, lost_words, removed_words):
+    # NOTE: stale = mostly worded like the removed lines, and mentions a word the resume now has fewer of (e.g. an edited year)
+    words = set(to_words(item).split())
+    if not words or not words & lost_words:
+        return False
+    return len(words & removed_words) >= len(words)/2
+
+
+def get_run_workflow_version(entry):
+    # workflow version whose verdicts a stored run holds; an incremental run records the one it continued (older ones: default)
+    if entry.get("workflow")=="incremental":
+        return entry.get("run_stats", {}).get("incremental", {}).get("workflow", "default")
+    return WORKFLOW_VERSIONS.get(entry.get("workflow"), entry.get("workflow"))
+
+
+def check_incremental_workflow(previous_run, workflow_version):
+    # error message if `previous_run` cannot be continued with `workflow_version` (verdicts of two workflows would mix), else None
+    if workflow_version not in incremental_judges:
+        return f"Incremental re-assessment is not supported by the {workflow_version} workflow"
+    previous_workflow_version = get_run_workflow_version(previous_run["entry"])
+    if previous_workflow_version!=workflow_version:
+        return f"Run {previous_run['run_id']} was assessed with the {previous_workflow_version} workflow, not {workflow_version}"
+    return None
+
+
+def get_reusable_judgements(previous_entry):
+    # {(criterion, extracted_content): judgement} of the previous run; "Not judged" and degraded (deadline, unresolved cascade) items are judged again
+    reusable = {}
+    for criterion_of_interests, reformat_judgements in previous_entry.get("judgement_dict", {}).items():
+        for reformat_judgement in reformat_judgements:
+            if reformat_judgement["verdict"].lower() in REUSABLE_VERDICTS and not reformat_judgement.get("deadline_exceeded") and not reformat_judgement.get("cascade_unresolved"):
+                reusable[(criterion_of_interests, reformat_judgement["extracted_content"])] = {
+                    "verdict": reformat_judgement["verdict"],
+                    "explanation": reformat_judgement["rationale"],
+                }
+    return reusable
+
+
+def plan_incremental_extraction(new_text, previous_run, workflow_version="default"):
+    # which text to extract from, and which previous items still hold
+    old_text = previous_run["entry"]["contents"][0]
+    hunks, removed_lines, num_changed_lines = diff_resume(old_text, new_text)
+    total_lines = max(len(old_text.split("\n")), len(new_text.split("\n")))
+    full_extraction = num_changed_lines > max_changed_fraction*total_lines
+    lost_words = set(collections.Counter(to_words(old_text).split()) - collections.Counter(to_words(new_text).split()))
+    removed_words = set(to_words("\n".join(removed_lines)).split())
+    kept_items, num_stale = {}, 0
+    for criterion_of_interests, extracted_contents in previous_run["entry"]["extracted_content_dict"].items():
+        kept_items[criterion_of_interests] = [item for item in extracted_contents if not is_stale_item(item, lost_words, removed_words)]
+        num_stale += len(extracted_contents) - len(kept_items[criterion_of_interests])
+    if full_extraction:
+        extraction_text = new_text
+    else:
+        extraction_text = "\n...\n".join(hunks) if hunks else None
+    run_stats = {
+        "workflow": workflow_version,
+        "previous_run_id": previous_run["run_id"],
+        "changed_lines": num_changed_lines,
+        "total_lines": total_lines,
+        "full_extraction": full_extraction,
+        "extracted_chars": len(extraction_text or ""),
+        "items_stale": num_stale,
+    }
+    return extraction_text, kept_items, run_stats
+
+
+def merge_incremental_items(kept_items, new_items):
+    # previous wording wins over a near-duplicate re-extraction, so its verdict can be reused
+    merged = list(kept_items)
+    kept_words = [(to_words(item), set(to_words(item).split())) for item in kept_items]
+    num_added = 0
+    for item in dedupe_items(new_items, threshold=dedup_threshold)[0]:
+        normalized = to_words(item)
+        words = set(normalized.split())
+        if any(is_near_duplicate(normalized, entry[0], words, entry[1], dedup_threshold) for entry in kept_words):
+            continue
+        merged.append(item)
+        num_added += 1
+    return merged, num_added
+
+
+def finish_incremental_extraction(state, previous_run, kept_items, run_stats, extraction_state):
+    new_extracted = extraction_state["extracted_content_dict"] if extraction_state is not None else {}
+    extracted_content_dict = {}
+    num_added = 0
+    for criterion_of_interests in list(kept_items) + [criterion for criterion in new_extracted if criterion not in kept_items]:
+        extracted_content_dict[criterion_of_interests], num_criterion_added = merge_incremental_items(
+            kept_items.get(criterion_of_interests, []), new_extracted.get(criterion_of_interests, []),
+        )
+        num_added += num_criterion_added
+
+    # NOTE: verdicts of unchanged items go straight to collect_judgement, only the rest is sent to judge_content
+    reusable = get_reusable_judgements(previous_run["entry"])
+    reused_states = [
+        create_base_state(
+            criterion_of_interests = criterion_of_interests,
+            extracted_content = item,
+            judgement = reusable[(criterion_of_interests, item)],
+            judgement_meta = {"reused_from": previous_run["run_id"]},
+        )
+        for criterion_of_interests, extracted_contents in extracted_content_dict.items()
+        for item in extracted_contents
+        if (criterion_of_interests, item) in reusable
+    ]
+    run_stats = {"incremental": {**run_stats, "items_added": num_added, "items_reused": len(reused_states)}}
+    if extraction_state is not None:
+        run_stats.update(extraction_state["run_stats"])
+    return create_overall_state(
+        contents=state['contents'],
+        extracted_content_dict=extracted_content_dict,
+        collected_criterion_state=reused_states,
+        run_stats=run_stats,
+    )
+
+
+def incremental_extraction_node(state, previous_run, workflow_version="default"):
+    extraction_text, kept_items, run_stats = plan_incremental_extraction(state['contents'][0], previous_run, workflow_version)
+    extraction_state = None
+    if extraction_text is not None:
+        extraction_state = content_extraction_node(create_overall_state(contents=[extraction_text]))
+    return finish_incremental_extraction(state, previous_run, kept_items, run_stats, extraction_state)
+
+
+async def aincremental_extraction_node(state, previous_run, workflow_version="default"):
+    extraction_text, kept_items, run_stats = plan_incremental_extraction(state['contents'][0], previous_run, workflow_version)
+    extraction_state = None
+    if extraction_text is not None:
+        extraction_state = await acontent_extraction_node(create_overall_state(contents=[extraction_text]))
+    return finish_incremental_extraction(state, previous_run, kept_items, run_stats, extraction_state)
+
+
+def distribute_changed_items(state):
+    reused = {(j['criterion_of_interests'], j['extracted_content']) for j in state['collected_criterion_state']}
+    tasks = [
+        Send("judge_content", create_base_state(criterion_of_interests=criterion_of_interests, extracted_content=extracted_content))
+        for criterion_of_interests, extracted_contents in state['extracted_content_dict'].items()
+        for extracted_content in extracted_contents
+        if (criterion_of_interests, extracted_content) not in reused
+    ]
+    # NOTE: nothing changed that needs a verdict, skip straight to the summary
+    return tasks or "collect_judgement"
+
+# =============== Graph Config ===============
+# NOTE: the previous run is bound into the extraction node, so a graph is compiled per request (a few ms)
+def build_incremental_graph(previous_run, workflow_version="default"):
+    judge_fn, _, collect_fn = incremental_judges[workflow_version]
+    extraction_fn = functools.partial(incremental_extraction_node, previous_run=previous_run, workflow_version=workflow_version)
+    return build_graph(extraction_fn, judge_fn, distribute_changed_items, collect_fn=collect_fn)
+
+
+def build_incremental_async_graph(previous_run, workflow_version="default"):
+    _, judge_fn, collect_fn = incremental_judges[workflow_version]
+    extraction_fn = functools.partial(aincremental_extraction_node, previous_run=previous_run, workflow_version=workflow_version)
+    return build_graph(extraction_fn, judge_fn, distribute_changed_items, collect_fn=collect_fn)
+
+# =============== workflow wrapper ===============
+# NOTE: previous_run is a result store record: {"run_id", "entry" (with "contents"), ...}; check it with `check_incremental_workflow` first
+def incremental_fn(previous_run, input_file_path, output_dir, pdf_text=None, workflow_version="default"):
+    return execute_workflow(build_incremental_graph(previous_run, workflow_version), input_file_path, output_dir, workflow="incremental", pdf_text=pdf_text)
+
+
+async def incremental_fn_async(previous_run, input_file_path, output_dir, pdf_text=None, workflow_version="default"):
+    return await aexecute_workflow(build_incremental_async_graph(previous_run, workflow_version), input_file_path, output_dir, workflow="incremental", pdf_text=pdf_text)
+
+
+def incremental_stream_fn(previous_run, input_file_path, output_dir, pdf_text=None, workflow_version="default"):
+    return astream_workflow(build_incremental_async_graph(previous_run, workflow_version), input_file_path, output_dir, workflow="incremental", pdf_text=pdf_text)
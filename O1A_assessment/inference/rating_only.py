@@ -0,0 +1,216 @@
+import asyncio
+import threading
+import contextvars
+import collections
+import concurrent.futures
+import functools
+
+from O1A_assessment.inference.baseline import (
+    create_base_state,
+    content_extraction_node,
+    acontent_extraction_node,
+    judge_content_node,
+    ajudge_content_node,
+    CallNotNeeded,
+    current_call_needed,
+    get_rating,
+    summarize_judgement_node,
+    build_graph,
+    execute_workflow,
+    aexecute_workflow,
+    astream_workflow,
+)
+
+# =============== Rating-only Config ===============
+# NOTE: judge calls in flight at once; fewer means more calls skipped, more means lower latency.
+max_parallel_judgements = 8
+NOT_JUDGED_VERDICT = "Not judged"
+not_judged_explanation = "Not judged in rating-only mode: the rating could no longer change."
+
+# =============== Graph Edge Config ===============
+def prioritize_items(extracted_content_dict):
+    # round-robin over criteria: the first item of every criterion, then the second, ...
+    queues = [
+        [(criterion_of_interests, index, extracted_content) for index, extracted_content in enumerate(extracted_contents)]
+        for criterion_of_interests, extracted_contents in extracted_content_dict.items()
+    ]
+    order = []
+    for rank in range(max([len(queue) for queue in queues], default=0)):
+        order += [queue[rank] for queue in queues if rank < len(queue)]
+    return order
+
+
+class RatingOnlyScheduler:
+    """Hands out judge tasks in priority order, and drops those whose verdict can no longer change the rating.
+
+    The rating only grows with more "Pass" / "More information needed" verdicts, so it is settled once
+    the worst case (every open item rejected) and the best case (every open item passed) agree.
+    Items of a criterion that already has a "Pass" never matter.
+    """
+    def __init__(self, extracted_content_dict):
+        self.queue = collections.deque(prioritize_items(extracted_content_dict))
+        self.num_open = collections.Counter(item[0] for item in self.queue) # NOTE: queued or in flight
+        self.verdicts = collections.defaultdict(set)
+        self.outputs = {}
+        self.not_judged = {}
+
+    def rating_bounds(self):
+        solid_criteria = {criterion for criterion, verdicts in self.verdicts.items() if "pass" in verdicts}
+        questionable_criteria = {criterion for criterion, verdicts in self.verdicts.items() if "more information needed" in verdicts} - solid_criteria
+        open_criteria = {criterion for criterion, num_open in self.num_open.items() if num_open > 0} - solid_criteria
+        worst = get_rating(len(solid_criteria), len(questionable_criteria))
+        best = get_rating(len(solid_criteria | open_criteria), len(questionable_criteria - open_criteria))
+        return worst, best
+
+    def is_relevant(self, item):
+        worst, best = self.rating_bounds()
+        return worst!=best and "pass" not in self.verdicts[item[0]]
+
+    def next_items(self, num_slots):
+        items = []
+        while self.queue and len(items) < num_slots:
+            item = self.queue.popleft()
+            if self.is_relevant(item):
+                items.append(item)
+            else:
+                self.drop(item, "skipped")
+        return items
+
+    def complete(self, item, output):
+        self.num_open[item[0]] -= 1
+        self.verdicts[item[0]].add(output["judgement"]["verdict"].lower())
+        self.outputs[item] = output
+
+    def drop(self, item, reason):
+        self.num_open[item[0]] -= 1
+        self.not_judged[item] = reason
+
+    def collect(self, extracted_content_dict):
+        # judged and not-judged items, in extraction order
+        collected_criterion_state = []
+        for item in [(criterion, index, content) for criterion, contents in extracted_content_dict.items() for index, content in enumerate(contents)]:
+            if item in self.outputs:
+                collected_criterion_state.append(self.outputs[item])
+                continue
+            collected_criterion_state.append(create_base_state(
+                criterion_of_interests = item[0],
+                extracted_content = item[2],
+                judgement = {"verdict": NOT_JUDGED_VERDICT, "explanation": not_judged_explanation},
+                judgement_meta = {"not_judged": self.not_judged.get(item, "skipped")},
+            ))
+        reasons = collections.Counter(self.not_judged.values())
+        run_stats = {"rating_only": {
+            "judged": len(self.outputs),
+            "skipped": reasons["skipped"],
+            "cancelled": reasons["cancelled"],
+            "partial": len(self.not_judged) > 0,
+        }}
+        return {"collected_criterion_state": collected_criterion_state, "run_stats": run_stats}
+
+
+def route_to_priority_judge(state):
+    # NOTE: no fan-out, a single judge node schedules the items itself
+    return "judge_content"
+
+
+def make_item_state(item):
+    return create_base_state(criterion_of_interests=item[0], extracted_content=item[2])
+
+
+def judge_item_while_needed(state, is_needed):
+    # runs in a worker thread: the judge call is not sent if `is_needed()` turned False while it waited for its slot
+    current_call_needed.set(is_needed)
+    return judge_content_node(state)
+
+
+def judge_rating_only_node(state):
+    scheduler = RatingOnlyScheduler(state['extracted_content_dict'])
+    lock = threading.Lock() # NOTE: worker threads read the scheduler through `is_needed`
+    def is_needed(item):
+        with lock:
+            return scheduler.is_relevant(item)
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_parallel_judgements)
+    running = {}
+    try:
+        while True:
+            with lock:
+                for item in scheduler.next_items(max_parallel_judgements - len(running)):
+                    # NOTE: copy context so callbacks attached to the graph run see these calls
+                    future = executor.submit(contextvars.copy_context().run, judge_item_while_needed, make_item_state(item), functools.partial(is_needed, item))
+                    running[future] = item
+            if not running:
+                break
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            with lock:
+                for future in done:
+                    item = running.pop(future)
+                    if isinstance(future.exception(), CallNotNeeded):
+                        scheduler.drop(item, "cancelled")
+                    else:
+                        scheduler.complete(item, future.result()["collected_criterion_state"][0])
+                for future, item in list(running.items()):
+                    if not scheduler.is_relevant(item):
+                        # NOTE: a call still waiting for its slot is not sent (`judge_item_while_needed`); one already sent finishes in the background, its verdict is ignored
+                        future.cancel()
+                        scheduler.drop(running.pop(future), "cancelled")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return scheduler.collect(state['extracted_content_dict'])
+
+
+async def ajudge_rating_only_node(state):
+    scheduler = RatingOnlyScheduler(state['extracted_content_dict'])
+    running = {}
+    try:
+        while True:
+            for item in scheduler.next_items(max_parallel_judgements - len(running)):
+                running[asyncio.create_task(ajudge_content_node(make_item_state(item)))] = item
+            if not running:
+                break
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                scheduler.complete(running.pop(task), task.result()["collected_criterion_state"][0])
+            for task, item in list(running.items()):
+                if not scheduler.is_relevant(item):
+                    task.cancel()
+                    scheduler.drop(running.pop(task), "cancelled")
+    finally:
+        for task in running:
+            task.cancel()
+    return scheduler.collect(state['extracted_content_dict'])
+
+
+def summarize_rating_only_node(state):
+    # summarize judged items only, then keep the not-judged ones in the (partial) itemized list
+    judged_dict = {
+        criterion_of_interests: [judgement for judgement in judgements if judgement["verdict"]!=NOT_JUDGED_VERDICT]
+        for criterion_of_interests, judgements in state['judgement_dict'].items()
+    }
+    output = summarize_judgement_node({**state, "judgement_dict": judged_dict})
+    output["judgement_dict"] = state['judgement_dict']
+    num_not_judged = sum(len(state['judgement_dict'][criterion]) - len(judgements) for criterion, judgements in judged_dict.items())
+    output["judgement_summary_dict"]["Content not judged"] = num_not_judged
+    if num_not_judged:
+        output["final_summary"] += f"\n\n(Rating-only mode: {num_not_judged} extracted items were not judged once the rating was settled, so the list above is partial.)"
+    return output
+
+# =============== Graph Config ===============
+# NOTE: compiled on first use, not at import (see baseline.get_graph)
+@functools.lru_cache(maxsize=None)
+def get_graph(kind="sync"):
+    if kind=="async":
+        return build_graph(acontent_extraction_node, ajudge_rating_only_node, route_to_priority_judge, summarize_rating_only_node)
+    return build_graph(content_extraction_node, judge_rating_only_node, route_to_priority_judge, summarize_rating_only_node)
+
+# =============== workflow wrapper ===============
+def rating_only_fn(input_file_path, output_dir, pdf_text=None):
+    return execute_workflow(get_graph("sync"), input_file_path, output_dir, workflow="rating_only", pdf_text=pdf_text)
+
+
+async def rating_only_fn_async(input_file_path, output_dir, pdf_text=None):
+    return await aexecute_workflow(get_graph("async"), input_file_path, output_dir, workflow="rating_only", pdf_text=pdf_text)
+
+
+# NOTE: all items are judged inside one node, so `judgement` events arrive together once it finishes
+def rating_only_stream_fn(input_file_path, output_dir, pdf_text=None):
+    return astream_workflow(get_graph("async"), input_file_path, output_dir, workflow="rating_only", pdf_text=pdf_text)
@@ -1,6 +1,50 @@
-from O1A_assessment.inference.baseline import basline_fn
+from O1A_assessment.inference import baseline, batched, chunked, rating_only, cascade
+from O1A_assessment.inference.baseline import basline_fn, basline_fn_async, basline_stream_fn, llm_name as baseline_llm_name
+from O1A_assessment.inference.batched import batched_fn, batched_fn_async, batched_stream_fn
+from O1A_assessment.inference.chunked import chunked_fn, chunked_fn_async, chunked_stream_fn
+from O1A_assessment.inference.rating_only import rating_only_fn, rating_only_fn_async, rating_only_stream_fn
+from O1A_assessment.inference.cascade import cascade_fn, cascade_fn_async, cascade_stream_fn
 
 workflows_fn = {
   "default": basline_fn,
+  "batched": batched_fn,
+  "chunked": chunked_fn,
+  "rating_only": rating_only_fn,
+  "cascade": cascade_fn,
 }
 
+# NOTE: async-native versions, awaited directly by the FastAPI service.
+workflows_fn_async = {
+  "default": basline_fn_async,
+  "batched": batched_fn_async,
+  "chunked": chunked_fn_async,
+  "rating_only": rating_only_fn_async,
+  "cascade": cascade_fn_async,
+}
+
+# NOTE: streaming versions, yielding (event, data) pairs as graph nodes finish (see /process/stream).
+workflows_fn_stream = {
+  "default": basline_stream_fn,
+  "batched": batched_stream_fn,
+  "chunked": chunked_stream_fn,
+  "rating_only": rating_only_stream_fn,
+  "cascade": cascade_stream_fn,
+}
+
+# NOTE: models used by each workflow, part of the result cache key.
+workflows_llm_names = {
+  "default": [baseline_llm_name],
+  "batched": [baseline_llm_name],
+  "chunked": [baseline_llm_name],
+  "rating_only": [baseline_llm_name],
+  "cascade": [tier["model"] for tier in cascade.cascade_tiers],
+}
+
+# NOTE: graph getters (compiled on first call), for callers that preprocess inputs themselves (e.g. bulk_assessment.py).
+workflows_get_graph = {
+  "default": baseline.get_graph,
+  "batched": batched.get_graph,
+  "chunked": chunked.get_graph,
+  "rating_only": rating_only.get_graph,
+  "cascade": cascade.get_graph,
+}
@@ -0,0 +1,82 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+
+from O1A_assessment.utils.result_cache import hash_file
+from O1A_assessment.utils.result_store import create_result_store, parse_run_timestamp, RESULT_STORE_BACKENDS
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description='Import an existing results/ tree into the result store.')
+    parser.add_argument('--results_dir', type=str, default="./results", help='tree of <run_id>/<workflow_version>/workflows_output.jsonl')
+    parser.add_argument('--result_store_backend', type=str, default="sqlite", choices=list(RESULT_STORE_BACKENDS), help='result store backend')
+    parser.add_argument('--result_store_path', type=str, default=None, help='path to SQLite result store (default: <results_dir>/result_store.sqlite3)')
+    parser.add_argument('--remove_imported', action='store_true', help='delete each run directory once it is imported')
+    parser.add_argument('--dry_run', action='store_true', help='only list what would be imported')
+    return parser.parse_args()
+
+
+def find_runs(results_dir):
+    # yields (run_id, run_dir, task_dir) for every run directory holding a workflow output
+    for run_id in sorted(os.listdir(results_dir)):
+        run_dir = os.path.join(results_dir, run_id)
+        if not os.path.isdir(run_dir):
+            continue
+        for workflow_version in sorted(os.listdir(run_dir)):
+            task_dir = os.path.join(run_dir, workflow_version)
+            if os.path.isfile(os.path.join(task_dir, "workflows_output.jsonl")):
+                yield run_id, run_dir, task_dir
+
+
+def load_run(task_dir):
+    with open(os.path.join(task_dir, "workflows_output.jsonl"), 'r', encoding='utf-8') as file:
+        entry = json.loads(file.readline())
+    # NOTE: the uploaded PDF is kept next to the output, unless it was parsed in memory
+    pdf_paths = sorted(name for name in os.listdir(task_dir) if name.lower().endswith(".pdf"))
+    content_hash = hash_file(os.path.join(task_dir, pdf_paths[0])) if pdf_paths else None
+    created_at = parse_run_timestamp(os.path.basename(os.path.dirname(task_dir)))
+    if created_at is None:
+        created_at = os.path.getmtime(os.path.join(task_dir, "workflows_output.jsonl"))
+    return entry, content_hash, created_at
+
+
+def migrate_results(args):
+    result_store = None
+    if not args.dry_run:
+        result_store = create_result_store(
+            backend=args.result_store_backend,
+            db_path=args.result_store_path or os.path.join(args.results_dir, "result_store.sqlite3"),
+        )
+    report = {"imported": 0, "failed": 0, "removed": 0}
+    imported_run_dirs = set()
+    for run_id, run_dir, task_dir in find_runs(args.results_dir):
+        try:
+            entry, content_hash, created_at = load_run(task_dir)
+        except (OSError, ValueError) as e:
+            print(f"[migrate_results.py] Skipping {task_dir}: {e!r}")
+            report["failed"] += 1
+            continue
+        # NOTE: a run directory has one workflow output in practice; a second one would overwrite the first
+        if args.dry_run:
+            print(f"Would import {run_id} ({entry.get('workflow')}, {entry.get('judgement_summary_dict', {}).get('Rating')})")
+        else:
+            result_store.put(run_id, entry, content_hash=content_hash, run_dir=os.path.abspath(run_dir), created_at=created_at)
+        imported_run_dirs.add(run_dir)
+        report["imported"] += 1
+
+    if result_store is not None:
+        result_store.close()
+        if args.remove_imported:
+            for run_dir in sorted(imported_run_dirs):
+                shutil.rmtree(run_dir, ignore_errors=True)
+                report["removed"] += 1
+    return report
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    report = migrate_results(args)
+    print(f"Finished migration: {json.dumps(report)}")
+    sys.exit(1 if report["failed"] else 0)
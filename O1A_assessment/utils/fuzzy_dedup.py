@@ -0,0 +1,57 @@
+import re
+import difflib
+
+from O1A_assessment.utils.judgement_cache import normalize_text
+
+
+def to_words(text):
+    # punctuation-insensitive word sequence of a normalized item
+    return " ".join(re.findall(r"\w+", normalize_text(text)))
+
+
+def is_near_duplicate(text_a, text_b, words_a, words_b, threshold):
+    if text_a==text_b:
+        return True
+    # NOTE: items differing in a number (year, count, amount) are distinct achievements, however similar the wording
+    numbers_a, numbers_b = {word for word in words_a if word.isdigit()}, {word for word in words_b if word.isdigit()}
+    if numbers_a and numbers_b and numbers_a!=numbers_b:
+        return False
+    # NOTE: the same item extracted with more context from an overlapping chunk; very short items are too ambiguous
+    if min(len(words_a), len(words_b)) >= 3 and (text_a in text_b or text_b in text_a):
+        return True
+    # NOTE: cheap word-overlap filter first; SequenceMatcher only runs on plausible pairs
+    if not words_a or not words_b or len(words_a & words_b) / len(words_a | words_b) < threshold/2:
+        return False
+    matcher = difflib.SequenceMatcher(None, text_a, text_b, autojunk=False)
+    return matcher.real_quick_ratio() >= threshold and matcher.quick_ratio() >= threshold and matcher.ratio() >= threshold
+
+
+def cluster_items(items, threshold=0.85):
+    """Groups near-duplicate extracted items, in first-position order.
+
+    Returns [(kept item, [dropped items])]; the kept item is the most detailed (longest) wording of its group.
+    """
+    clusters = [] # [original text, normalized text, word set, dropped items]
+    for item in items:
+        normalized = to_words(item)
+        words = set(normalized.split())
+        for entry in clusters:
+            if is_near_duplicate(normalized, entry[1], words, entry[2], threshold):
+                if len(item) > len(entry[0]):
+                    entry[3].append(entry[0])
+                    entry[:3] = [item, normalized, words]
+                else:
+                    entry[3].append(item)
+                break
+        else:
+            clusters.append([item, normalized, words, []])
+    return [(entry[0], entry[3]) for entry in clusters]
+
+
+def dedupe_items(items, threshold=0.85):
+    """Drops near-duplicate extracted items, keeping the first position and the most detailed (longest) wording.
+
+    Returns (deduplicated items, number of items dropped).
+    """
+    clusters = cluster_items(items, threshold)
+    return [kept for kept, _ in clusters], len(items)-len(clusters)
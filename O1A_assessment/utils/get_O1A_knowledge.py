@@ -1,5 +1,7 @@
 import os
 import json
+import hashlib
+import functools
 
 def load_json(json_path):
   if os.path.isfile(json_path):
@@ -8,5 +10,39 @@ def load_json(json_path):
   else:
       raise ValueError('[get_O1A_knowledge.py] Could not load knowledge file at:\n', json_path)
   return data
-   
-O1A_DFFINITIONS = load_json(os.path.abspath("./knowledges/definitions.json"))
+
+def file_fingerprint(file_path):
+  with open(file_path, 'rb') as file:
+    return hashlib.sha256(file.read()).hexdigest()
+
+def resolve_knowledge_path(file_name):
+  # NOTE: prefer ./knowledges under the working directory, fall back to the copy next to the package.
+  cwd_path = os.path.abspath(os.path.join("./knowledges", file_name))
+  if os.path.isfile(cwd_path):
+    return cwd_path
+  repo_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+  return os.path.join(repo_dir, "knowledges", file_name)
+
+# Knowledge is loaded lazily, on first use
+@functools.lru_cache(maxsize=None)
+def get_O1A_definitions_path():
+  return resolve_knowledge_path("definitions.json")
+
+@functools.lru_cache(maxsize=None)
+def get_O1A_definitions():
+  return load_json(get_O1A_definitions_path())
+
+@functools.lru_cache(maxsize=None)
+def get_O1A_definitions_fingerprint():
+  # NOTE: changes to the knowledge file invalidate cached assessments
+  return file_fingerprint(get_O1A_definitions_path())
+
+def __getattr__(name):
+  # backward compatible module attributes, resolved lazily
+  if name=="O1A_DFFINITIONS":
+    return get_O1A_definitions()
+  if name=="O1A_DFFINITIONS_PATH":
+    return get_O1A_definitions_path()
+  if name=="O1A_DFFINITIONS_FINGERPRINT":
+    return get_O1A_definitions_fingerprint()
+  raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,168 @@
+import re
+import math
+import functools
+import collections
+
+from O1A_assessment.utils.metrics import Counter, register_collector
+from O1A_assessment.utils.fuzzy_dedup import to_words, is_near_duplicate, cluster_items
+from O1A_assessment.utils.get_O1A_knowledge import get_O1A_definitions
+
+# =============== Prefilter Config ===============
+# NOTE: rules only reject items no judge would pass (empty, coursework) and merge duplicates; anything ambiguous is left to the LLM judge.
+prefilter_enabled = True
+dedup_threshold = 0.85
+# NOTE: a copy of an item extracted under several criteria is dropped where it scores below this (and below its best criterion)
+min_relevance_score = 1.0
+EMPTY_ITEMS = ["", "none", "n a", "na", "nil", "unknown", "not applicable", "not available", "not mentioned", "not provided", "not specified", "no information", "no relevant information"]
+SCHOLASTIC_PATTERNS = [
+    r"\bcourse ?work\b", r"\brelevant courses?\b", r"\b(online|completed|elective) courses?\b", r"\bcourse projects?\b",
+    r"\bgpa\b", r"\bgrade point average\b", r"\bdean'?s (honou?rs? )?list\b", r"\bhonou?r roll\b", r"\bcum laude\b",
+]
+# NOTE: scholastic items worded like the recognized exceptions of the Awards considerations (Ph.D. scholarships, dissertation awards) are kept
+SCHOLASTIC_EXCEPTIONS = ["national", "international", "dissertation", "ph.d", "phd", "doctoral", "fellowship", "best paper"]
+# NOTE: a remuneration figure is a relevance signal for High_remuneration, not a rejection rule: items without one are still judged,
+# unless the same item was also extracted under a criterion it matches better (e.g. a bare job title, see `prefilter_items`).
+remuneration_figure_weight = 2.0
+CURRENCY_AMOUNT_PATTERNS = [
+    r"[$€£¥₹]\s?\d",
+    r"\b(usd|eur|gbp|hkd|cad|aud|sgd|cny|rmb|jpy|inr|chf)\s?\d",
+    r"\d[\d,.]*\s?(usd|eur|gbp|hkd|cad|aud|sgd|cny|rmb|jpy|inr|chf|dollars|euros|pounds)\b",
+]
+# NOTE: bare amounts and rankings only count next to a pay word ("Base salary 180000 per year", not "2m followers")
+BARE_AMOUNT_PATTERNS = [
+    r"\b\d{1,3}(,\d{3})+\b", r"\b\d{5,}\b", r"\b\d[\d,.]*\s?(k|m|mm|million|thousand|billion)\b",
+    r"\b\d{1,2}(st|nd|rd|th)? percentile\b", r"\btop \d+(\.\d+)?\s?%",
+]
+PAY_TERMS_PATTERN = r"\b(salary|salaries|compensation|remuneration|pay|paid|income|earn\w*|wages?|bonus\w*|equity|stock|package|annual\w*|per (year|annum|month))\b"
+STOPWORDS = {
+    "that", "this", "with", "from", "such", "have", "been", "their", "them", "they", "which", "whether", "will", "would", "should", "must", "also", "only",
+    "other", "than", "more", "many", "into", "under", "within", "those", "these", "were", "example", "including", "criteria", "criterion", "case", "detail",
+    "following", "general", "particular", "additional", "otherwise", "moreover", "simply", "likely", "might", "necessarily", "especially", "specifically",
+}
+
+PREFILTER_ITEMS = Counter("o1a_prefilter_items_total", "Number of extracted items rejected or merged by the local pre-filter, i.e. judge calls saved.")
+register_collector(PREFILTER_ITEMS.render)
+
+
+def configure_prefilter(enabled=True):
+    global prefilter_enabled
+    prefilter_enabled = enabled
+
+
+def to_terms(text):
+    # crude stems (plural "s" stripped) of the content words of a text
+    return {word[:-1] if len(word) > 4 and word.endswith("s") and not word.endswith("ss") else word
+            for word in to_words(text).split() if len(word) >= 4 and word.isalpha() and word not in STOPWORDS}
+
+
+@functools.lru_cache(maxsize=None)
+def get_criterion_vocabularies():
+    # {criterion: {term: weight}} from knowledges/definitions.json; terms shared by fewer criteria weigh more, terms of every criterion nothing
+    definitions = get_O1A_definitions()
+    criterion_terms = {}
+    for criterion, definition in definitions.items():
+        if "evidentiary criterion" not in definition:
+            continue
+        texts = [definition["evidentiary criterion"]]
+        for key in ["considerations", "examples"]:
+            texts += definition[key] if isinstance(definition[key], list) else [definition[key]]
+        criterion_terms[criterion] = to_terms(" ".join(texts))
+    document_frequency = collections.Counter(term for terms in criterion_terms.values() for term in terms)
+    return {
+        criterion: {term: math.log(len(criterion_terms)/document_frequency[term]) for term in terms if document_frequency[term] < len(criterion_terms)}
+        for criterion, terms in criterion_terms.items()
+    }
+
+
+def has_remuneration_figure(text):
+    text = text.lower()
+    if any(re.search(pattern, text) for pattern in CURRENCY_AMOUNT_PATTERNS):
+        return True
+    return re.search(PAY_TERMS_PATTERN, text) is not None and any(re.search(pattern, text) for pattern in BARE_AMOUNT_PATTERNS)
+
+
+def score_relevance(item, criterion):
+    vocabulary = get_criterion_vocabularies().get(criterion, {})
+    score = sum((vocabulary.get(term, 0.0) for term in to_terms(item)), 0.0)
+    if criterion=="High_remuneration" and has_remuneration_figure(item):
+        score += remuneration_figure_weight
+    return score
+
+
+def check_rules(item, criterion):
+    # returns (rule, reason) of the first rule rejecting the item, None if it should be judged
+    words = to_words(item)
+    if words in EMPTY_ITEMS:
+        return "empty_item", "The extracted item carries no information."
+    text = item.lower()
+    if any(re.search(pattern, text) for pattern in SCHOLASTIC_PATTERNS) and not any(term in text for term in SCHOLASTIC_EXCEPTIONS):
+        return "scholastic_item", "Coursework, grades and academic honor lists are not nationally or internationally recognized achievements."
+    return None
+
+
+def make_decision(criterion, item, action, rule, reason, merged_into=None):
+    decision = {
+        "criterion_of_interests": criterion,
+        "extracted_content": item,
+        "action": action,
+        "rule": rule,
+        "reason": reason,
+        "relevance_score": round(score_relevance(item, criterion), 3),
+    }
+    if merged_into is not None:
+        decision["merged_into"] = {"criterion_of_interests": merged_into[0], "extracted_content": merged_into[1]}
+    return decision
+
+
+def prefilter_items(extracted_content_dict, keep=()):
+    """Rejects and merges extracted items without an LLM call.
+
+    Items in `keep` ((criterion, item) pairs, e.g. already judged) are passed through untouched.
+    Returns (filtered extracted_content_dict, decisions); a decision records every dropped item, for auditing.
+    """
+    decisions = []
+    filtered = {}
+    # =============== Rules and duplicates within a criterion ===============
+    for criterion, items in extracted_content_dict.items():
+        candidates = []
+        for item in items:
+            rejection = None if (criterion, item) in keep else check_rules(item, criterion)
+            if rejection is None:
+                candidates.append(item)
+            else:
+                decisions.append(make_decision(criterion, item, "rejected", *rejection))
+        filtered[criterion] = []
+        for kept, dropped in cluster_items(candidates, threshold=dedup_threshold):
+            filtered[criterion].append(kept)
+            for item in dropped:
+                if (criterion, item) in keep:
+                    filtered[criterion].append(item)
+                    continue
+                decisions.append(make_decision(criterion, item, "merged", "duplicate", "Same achievement as a more detailed item of this criterion.", (criterion, kept)))
+
+    # =============== Duplicates across criteria ===============
+    # NOTE: the same item under several criteria is only dropped where it is off-criterion; an item relevant to two criteria is judged for both
+    entries = [(criterion, item, to_words(item)) for criterion, items in filtered.items() for item in items]
+    for criterion, item, normalized in entries:
+        if (criterion, item) in keep:
+            continue
+        score = score_relevance(item, criterion)
+        if score >= min_relevance_score:
+            continue
+        words = set(normalized.split())
+        best = None
+        for other_criterion, other_item, other_normalized in entries:
+            if other_criterion==criterion or other_item not in filtered[other_criterion]:
+                continue
+            if not is_near_duplicate(normalized, other_normalized, words, set(other_normalized.split()), dedup_threshold):
+                continue
+            other_score = score_relevance(other_item, other_criterion)
+            if other_score > score and (best is None or other_score > best[2]):
+                best = (other_criterion, other_item, other_score)
+        if best is not None:
+            filtered[criterion].remove(item)
+            decisions.append(make_decision(criterion, item, "merged", "off_criterion_duplicate", f"Also extracted under {best[0]}, which it matches better.", best[:2]))
+
+    for decision in decisions:
+        PREFILTER_ITEMS.inc(action=decision["action"], rule=decision["rule"])
+    return filtered, decisions
@@ -0,0 +1,74 @@
+import math
+import asyncio
+import traceback
+
+
+class JobQueue:
+    """Bounded queue drained by a fixed pool of asyncio workers.
+
+    `run_fn(workflow_version, input_file_path, output_dir)` is awaited for every job;
+    job state is persisted in `job_store` (see `O1A_assessment.utils.job_store`).
+    """
+    def __init__(self, job_store, run_fn, num_workers=4, max_queue_size=64):
+        self.job_store = job_store
+        self.run_fn = run_fn
+        self.num_workers = num_workers
+        self.max_queue_size = max_queue_size
+        self.queue = None
+        self.workers = []
+        self.avg_job_seconds = 30.0 # NOTE: running estimate, used for Retry-After
+
+    async def start(self):
+        self.queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self.workers = [asyncio.create_task(self._worker(i)) for i in range(self.num_workers)]
+        # Resume jobs left behind by a previous process (not bounded by max_queue_size)
+        unfinished_jobs = await asyncio.to_thread(self.job_store.list_unfinished_jobs)
+        if unfinished_jobs:
+            print(f"[job_queue.py] Resuming {len(unfinished_jobs)} unfinished job(s)")
+            asyncio.create_task(self._requeue([job["job_id"] for job in unfinished_jobs]))
+
+    async def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    async def _requeue(self, job_ids):
+        for job_id in job_ids:
+            await self.queue.put(job_id)
+
+    def full(self):
+        return self.queue.full()
+
+    def depth(self):
+        return self.queue.qsize()
+
+    def retry_after(self):
+        # seconds until one of the workers is likely to free up a queue slot
+        return max(1, math.ceil(self.avg_job_seconds / max(self.num_workers, 1)))
+
+    def submit(self, job_id):
+        # raises asyncio.QueueFull when the queue is at capacity
+        self.queue.put_nowait(job_id)
+
+    async def _worker(self, worker_id):
+        loop = asyncio.get_running_loop()
+        while True:
+            job_id = await self.queue.get()
+            try:
+                job = await asyncio.to_thread(self.job_store.get_job, job_id)
+                if job is None or job["status"] not in ["queued", "running"]:
+                    continue
+                await asyncio.to_thread(self.job_store.update_job, job_id, "running")
+                print(f"[job_queue.py] worker {worker_id} executing job {job_id}")
+                start_time = loop.time()
+                result = await self.run_fn(job["workflow_version"], input_file_path=job["file_path"], output_dir=job["task_dir"])
+                self.avg_job_seconds = 0.8*self.avg_job_seconds + 0.2*(loop.time()-start_time)
+                await asyncio.to_thread(self.job_store.update_job, job_id, "succeeded", result=result)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                traceback.print_exc()
+                await asyncio.to_thread(self.job_store.update_job, job_id, "failed", error=repr(e))
+            finally:
+                self.queue.task_done()
@@ -0,0 +1,69 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+# NOTE: job states: queued -> running -> succeeded / failed (rejected if the queue was full)
+JOB_STATUS = ["queued", "running", "succeeded", "failed", "rejected"]
+
+class JobStore:
+    """SQLite-backed job table, so queued/finished jobs survive a server restart."""
+    def __init__(self, db_path):
+        self.db_path = os.path.abspath(db_path)
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " job_id TEXT PRIMARY KEY,"
+                " status TEXT NOT NULL,"
+                " workflow_version TEXT NOT NULL,"
+                " file_path TEXT NOT NULL,"
+                " task_dir TEXT NOT NULL,"
+                " result TEXT,"
+                " error TEXT,"
+                " created_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def create_job(self, job_id, workflow_version, file_path, task_dir, status="queued"):
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, status, workflow_version, file_path, task_dir, created_at, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, status, workflow_version, file_path, task_dir, now, now),
+            )
+
+    def update_job(self, job_id, status, result=None, error=None):
+        assert status in JOB_STATUS, f"[job_store.py] unexpected status: {status}"
+        result = None if result is None else json.dumps(result, ensure_ascii=False)
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status=?, result=?, error=?, updated_at=? WHERE job_id=?",
+                (status, result, error, time.time(), job_id),
+            )
+
+    def get_job(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id=?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = None if job["result"] is None else json.loads(job["result"])
+        return job
+
+    def list_unfinished_jobs(self):
+        # jobs left queued/running by a previous process, oldest first
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT * FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        return [dict(row) for row in rows]
@@ -0,0 +1,92 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+
+
+def normalize_text(text):
+    # case/whitespace/punctuation-insensitive form of an extracted item
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = re.sub(r"\s+", " ", text)
+    return text.strip(" .;,:-")
+
+
+def hash_text(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class JudgementCache:
+    """On-disk LRU store of judge verdicts keyed by (criterion, normalized item, prompt hash).
+
+    The SQLite file can be shared by every server worker on the same host.
+    """
+    def __init__(self, db_path, max_entries=100000):
+        self.db_path = os.path.abspath(db_path)
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._puts_since_evict = 0
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS judgements ("
+                " key TEXT PRIMARY KEY,"
+                " criterion TEXT NOT NULL,"
+                " judgement TEXT NOT NULL,"
+                " prompt_tokens INTEGER NOT NULL,"
+                " completion_tokens INTEGER NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS judgements_last_access ON judgements (last_access)")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    @staticmethod
+    def make_key(criterion_of_interests, extracted_content, prompt_hash):
+        return hash_text(json.dumps([criterion_of_interests, normalize_text(extracted_content), prompt_hash], ensure_ascii=False))
+
+    def get(self, key):
+        with self._connect() as conn:
+            row = conn.execute("SELECT judgement, prompt_tokens, completion_tokens FROM judgements WHERE key=?", (key,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE judgements SET last_access=? WHERE key=?", (time.time(), key))
+        return {"judgement": json.loads(row[0]), "prompt_tokens": row[1], "completion_tokens": row[2]}
+
+    def put(self, key, criterion_of_interests, judgement, prompt_tokens=0, completion_tokens=0):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO judgements (key, criterion, judgement, prompt_tokens, completion_tokens, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (key, criterion_of_interests, json.dumps(judgement, ensure_ascii=False), prompt_tokens, completion_tokens, time.time()),
+            )
+            # NOTE: evict in batches, counting rows on every put is wasteful
+            self._puts_since_evict += 1
+            if self._puts_since_evict >= 100:
+                self._puts_since_evict = 0
+                self._evict(conn)
+
+    def _evict(self, conn):
+        num_entries = conn.execute("SELECT COUNT(*) FROM judgements").fetchone()[0]
+        if num_entries > self.max_entries:
+            conn.execute(
+                "DELETE FROM judgements WHERE key IN (SELECT key FROM judgements ORDER BY last_access LIMIT ?)",
+                (num_entries - self.max_entries,),
+            )
+
+
+# =============== Shared instance ===============
+_judgement_cache = None
+
+def configure_judgement_cache(db_path, max_entries=100000):
+    global _judgement_cache
+    _judgement_cache = None if db_path is None else JudgementCache(db_path, max_entries=max_entries)
+    return _judgement_cache
+
+def get_judgement_cache():
+    return _judgement_cache
@@ -0,0 +1,364 @@
+import json
+import time
+import asyncio
+import threading
+import contextlib
+import collections
+
+from O1A_assessment.utils.llm_configs import LLM_API_dict
+from O1A_assessment.utils.metrics import Counter, Gauge, current_run_metrics, current_llm_call_usage, register_collector, register_rate_limit_listener
+
+# =============== Controller Config ===============
+# NOTE: per-model concurrency starts at `initial` and adapts within [min, max] (AIMD):
+# +1 per successful call until the first congestion signal (slow start), then +1/limit per call;
+# x`decrease_factor` on a 429, x`latency_decrease_factor` when a call is `latency_tolerance` times slower than usual.
+DEFAULT_CONCURRENCY = {"initial": 16, "min": 1, "max": 256}
+decrease_factor = 0.5
+latency_decrease_factor = 0.9
+latency_tolerance = 2.0
+latency_smoothing = 0.1
+latency_min_samples = 5
+cooldown_seconds = 1.0 # NOTE: at most one decrease per model per cooldown, a burst of 429s is one congestion event
+completion_reserve_tokens = 500 # NOTE: completion tokens charged to the token budget before usage is known, reconciled after the call
+max_poll_seconds = 0.5
+
+
+def parse_retry_after(headers):
+    # seconds to wait from `retry-after-ms` / `retry-after` (OpenAI sends both), None if absent
+    for name, scale in [("retry-after-ms", 1e-3), ("retry-after", 1.0)]:
+        try:
+            return float(headers[name]) * scale
+        except (KeyError, TypeError, ValueError):
+            continue
+    return None
+
+
+class ModelBudget:
+    """Concurrency limit, request/token buckets and wait queue of one model; guarded by the controller's lock."""
+    def __init__(self, model, requests_per_minute=None, tokens_per_minute=None, initial=16, min=1, max=256):
+        self.model = model
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.limit = float(initial)
+        self.min_limit = min
+        self.max_limit = max
+        self.slow_start = True
+        self.in_flight = 0
+        self.request_allowance = requests_per_minute or 0
+        self.token_allowance = tokens_per_minute or 0
+        self.refilled_at = time.monotonic()
+        self.paused_until = 0.0
+        self.last_decrease = 0.0
+        self.latency_baselines = {} # NOTE: (moving average, samples) per call kind (chain), prompts of different size have different latency
+        self.queues = collections.OrderedDict() # request key -> waiters, served round-robin
+        self.counters = {"granted": 0, "rate_limited": 0, "slow_calls": 0, "decreases": 0}
+
+    def refill(self, now):
+        elapsed, self.refilled_at = now - self.refilled_at, now
+        if self.requests_per_minute:
+            self.request_allowance = min(self.requests_per_minute, self.request_allowance + elapsed*self.requests_per_minute/60)
+        if self.tokens_per_minute:
+            self.token_allowance = min(self.tokens_per_minute, self.token_allowance + elapsed*self.tokens_per_minute/60)
+
+    def wait_seconds(self, tokens, now):
+        # seconds until a call of `tokens` fits the request/token budget (0: fits now)
+        waits = [max(self.paused_until - now, 0.0)]
+        if self.requests_per_minute and self.request_allowance < 1:
+            waits.append((1 - self.request_allowance)*60/self.requests_per_minute)
+        if self.tokens_per_minute:
+            needed = min(tokens, self.tokens_per_minute)
+            if self.token_allowance < needed:
+                waits.append((needed - self.token_allowance)*60/self.tokens_per_minute)
+        return max(waits)
+
+    def can_start(self, tokens, now):
+        return self.in_flight < int(self.limit) and self.wait_seconds(tokens, now)==0
+
+    def start(self, tokens):
+        self.in_flight += 1
+        self.counters["granted"] += 1
+        if self.requests_per_minute:
+            self.request_allowance -= 1
+        if self.tokens_per_minute:
+            self.token_allowance -= min(tokens, self.tokens_per_minute)
+
+    def reconcile(self, charged_tokens, used_tokens):
+        # replace the estimate charged at `start` with the tokens the provider reported
+        if self.tokens_per_minute:
+            self.token_allowance = min(self.tokens_per_minute, self.token_allowance + min(charged_tokens, self.tokens_per_minute) - min(used_tokens, self.tokens_per_minute))
+
+    def num_queued(self):
+        return sum(len(waiters) for waiters in self.queues.values())
+
+    def increase(self):
+        # NOTE: only grow while the limit is what holds calls back (not the request/token budget)
+        if self.in_flight + 1 < int(self.limit):
+            return
+        step = 1.0 if self.slow_start else 1.0/self.limit
+        self.limit = min(self.max_limit, self.limit + step)
+
+    def decrease(self, factor, now):
+        if now - self.last_decrease < cooldown_seconds:
+            return
+        self.last_decrease = now
+        self.slow_start = False
+        self.limit = max(self.min_limit, self.limit*factor)
+        self.counters["decreases"] += 1
+
+    def observe_latency(self, latency_key, latency, now):
+        # returns False if the call was congested (much slower than the usual latency of its kind)
+        usual, num_samples = self.latency_baselines.get(latency_key, (latency, 0))
+        self.latency_baselines[latency_key] = (usual + latency_smoothing*(latency - usual), num_samples + 1)
+        if num_samples >= latency_min_samples and latency > latency_tolerance*usual:
+            self.counters["slow_calls"] += 1
+            self.decrease(latency_decrease_factor, now)
+            return False
+        return True
+
+    def stats(self):
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": self.num_queued(),
+            "queued_requests": len(self.queues),
+            "slow_start": self.slow_start,
+            "requests_per_minute": self.requests_per_minute,
+            "tokens_per_minute": self.tokens_per_minute,
+            "paused_seconds": round(max(self.paused_until - time.monotonic(), 0.0), 3),
+            **self.counters,
+        }
+
+
+class _ThreadWaiter:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.granted = False
+        self.event = threading.Event()
+
+    def wake(self):
+        self.event.set()
+
+
+class _AsyncWaiter:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.granted = False
+        self.loop = asyncio.get_running_loop()
+        self.future = self.loop.create_future()
+
+    def wake(self):
+        # NOTE: may be called from another thread or event loop
+        self.loop.call_soon_threadsafe(lambda: self.future.done() or self.future.set_result(True))
+
+
+class AdaptiveLLMController:
+    """Process-wide gate for LLM calls: adaptive per-model concurrency, request/token budgets, and fair queueing.
+
+    Waiting calls are grouped by request (the current run) and served round-robin, so one large fan-out
+    cannot starve other requests. Thread-safe and usable from any event loop.
+    """
+    def __init__(self, model_limits=None, max_concurrency=None):
+        self.model_limits = model_limits or {}
+        self.max_concurrency = max_concurrency
+        self._budgets = {}
+        self._lock = threading.Lock()
+
+    def _get_budget(self, model):
+        budget = self._budgets.get(model)
+        if budget is None:
+            limits = {**DEFAULT_CONCURRENCY, **LLM_API_dict.get(model, {}).get("rate_limits", {}), **self.model_limits.get(model, {})}
+            if self.max_concurrency is not None:
+                limits["max"] = min(limits["max"], self.max_concurrency)
+            limits["initial"] = min(max(limits["initial"], limits["min"]), limits["max"])
+            budget = self._budgets[model] = ModelBudget(model, **limits)
+        return budget
+
+    def _dispatch(self, budget, now):
+        while budget.queues:
+            request_key, waiters = next(iter(budget.queues.items()))
+            if not budget.can_start(waiters[0].tokens, now):
+                break
+            waiter = waiters.popleft()
+            budget.start(waiter.tokens)
+            waiter.granted = True
+            waiter.wake()
+            if waiters:
+                budget.queues.move_to_end(request_key)
+            else:
+                del budget.queues[request_key]
+
+    def enqueue(self, model, waiter, request_key):
+        # returns True if the call may start at once
+        with self._lock:
+            budget = self._get_budget(model)
+            now = time.monotonic()
+            budget.refill(now)
+            if not budget.queues and budget.can_start(waiter.tokens, now):
+                budget.start(waiter.tokens)
+                waiter.granted = True
+                return True
+            budget.queues.setdefault(request_key, collections.deque()).append(waiter)
+            return False
+
+    def poll(self, model, waiter):
+        # returns (granted, seconds to wait before polling again)
+        with self._lock:
+            budget = self._get_budget(model)
+            now = time.monotonic()
+            budget.refill(now)
+            self._dispatch(budget, now)
+            if waiter.granted:
+                return True, 0.0
+            wait = budget.wait_seconds(waiter.tokens, now)
+            return False, min(wait, max_poll_seconds) if wait > 0 else max_poll_seconds
+
+    def abandon(self, model, waiter, request_key):
+        # the caller gave up (e.g. cancelled) while queued
+        with self._lock:
+            budget = self._get_budget(model)
+            if waiter.granted:
+                budget.in_flight -= 1
+            elif waiter in budget.queues.get(request_key, ()):
+                budget.queues[request_key].remove(waiter)
+                if not budget.queues[request_key]:
+                    del budget.queues[request_key]
+            self._dispatch(budget, time.monotonic())
+
+    def release(self, model, latency, latency_key=None, failed=False, charged_tokens=0, used_tokens=None):
+        # `used_tokens`: tokens reported for the call (None if unknown, the estimate stays charged)
+        with self._lock:
+            budget = self._get_budget(model)
+            budget.in_flight -= 1
+            if used_tokens is not None:
+                budget.reconcile(charged_tokens, used_tokens)
+            now = time.monotonic()
+            if not failed and budget.observe_latency(latency_key, latency, now):
+                budget.increase()
+            budget.refill(now)
+            self._dispatch(budget, now)
+
+    def record_rate_limited(self, model, retry_after=None):
+        # NOTE: called for every 429, including those retried inside the OpenAI client
+        with self._lock:
+            budget = self._get_budget(model)
+            now = time.monotonic()
+            budget.counters["rate_limited"] += 1
+            budget.decrease(decrease_factor, now)
+            if retry_after:
+                budget.paused_until = max(budget.paused_until, now + retry_after)
+
+    def has_token_budget(self, model):
+        # calls of `model` are charged against a tokens-per-minute budget (otherwise their tokens need not be counted)
+        with self._lock:
+            return bool(self._get_budget(model).tokens_per_minute)
+
+    def has_spare_capacity(self, model):
+        # a call of `model` could start right now (e.g. a hedge, see tail_latency.py)
+        with self._lock:
+            budget = self._get_budget(model)
+            return not budget.queues and budget.in_flight < int(budget.limit)
+
+    def stats(self):
+        with self._lock:
+            return {model: budget.stats() for model, budget in sorted(self._budgets.items())}
+
+
+# =============== Shared instance ===============
+_llm_controller = AdaptiveLLMController()
+
+def configure_llm_controller(model_limits=None, max_concurrency=None):
+    # NOTE: model_limits: {model: {"requests_per_minute", "tokens_per_minute", "initial", "min", "max"}}, over `rate_limits` in llm_configs.py
+    global _llm_controller
+    _llm_controller = AdaptiveLLMController(model_limits=model_limits, max_concurrency=max_concurrency)
+    return _llm_controller
+
+def get_llm_controller():
+    return _llm_controller
+
+def set_llm_concurrency_limit(limit):
+    # NOTE: caps every model's adaptive limit (None: DEFAULT_CONCURRENCY["max"])
+    configure_llm_controller(model_limits=_llm_controller.model_limits, max_concurrency=limit)
+
+def parse_model_limits(text):
+    # `--llm_rate_limits` value: JSON string or path to a JSON file
+    if text is None:
+        return None
+    if text.strip().startswith("{"):
+        return json.loads(text)
+    with open(text, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def current_request_key():
+    # NOTE: calls of one assessment share a queue (see `track_run_metrics`); calls outside a run share another
+    run_metrics = current_run_metrics.get()
+    return None if run_metrics is None else id(run_metrics)
+
+
+@contextlib.asynccontextmanager
+async def llm_call_slot(model, tokens=0, latency_key=None):
+    controller, waiter, request_key = _llm_controller, _AsyncWaiter(tokens), current_request_key()
+    if not controller.enqueue(model, waiter, request_key):
+        try:
+            while True:
+                granted, wait = controller.poll(model, waiter)
+                if granted:
+                    break
+                try:
+                    await asyncio.wait_for(asyncio.shield(waiter.future), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            controller.abandon(model, waiter, request_key)
+            raise
+    start_time, failed = time.monotonic(), True
+    call_usage = []
+    usage_token = current_llm_call_usage.set(call_usage)
+    try:
+        yield
+        failed = False
+    finally:
+        current_llm_call_usage.reset(usage_token)
+        controller.release(model, time.monotonic() - start_time, latency_key, failed, tokens, sum(call_usage) if call_usage else None)
+
+
+@contextlib.contextmanager
+def llm_call_slot_sync(model, tokens=0, latency_key=None):
+    controller, waiter, request_key = _llm_controller, _ThreadWaiter(tokens), current_request_key()
+    if not controller.enqueue(model, waiter, request_key):
+        try:
+            while True:
+                granted, wait = controller.poll(model, waiter)
+                if granted:
+                    break
+                waiter.event.wait(wait)
+        except BaseException:
+            controller.abandon(model, waiter, request_key)
+            raise
+    start_time, failed = time.monotonic(), True
+    call_usage = []
+    usage_token = current_llm_call_usage.set(call_usage)
+    try:
+        yield
+        failed = False
+    finally:
+        current_llm_call_usage.reset(usage_token)
+        controller.release(model, time.monotonic() - start_time, latency_key, failed, tokens, sum(call_usage) if call_usage else None)
+
+
+# =============== Monitoring ===============
+LLM_CONCURRENCY_LIMIT = Gauge("o1a_llm_concurrency_limit", "Current adaptive limit on concurrent LLM calls per model.")
+LLM_IN_FLIGHT = Gauge("o1a_llm_in_flight", "Number of LLM calls in flight per model.")
+LLM_QUEUE_DEPTH = Gauge("o1a_llm_queue_depth", "Number of LLM calls waiting for a slot per model.")
+LLM_RATE_LIMITED = Counter("o1a_llm_rate_limited_total", "Number of 429 responses seen by the LLM controller per model.")
+
+def render_llm_controller():
+    for model, stats in _llm_controller.stats().items():
+        LLM_CONCURRENCY_LIMIT.set(stats["limit"], model=model)
+        LLM_IN_FLIGHT.set(stats["in_flight"], model=model)
+        LLM_QUEUE_DEPTH.set(stats["queued"], model=model)
+        LLM_RATE_LIMITED.set(stats["rate_limited"], model=model)
+    return LLM_CONCURRENCY_LIMIT.render() + LLM_IN_FLIGHT.render() + LLM_QUEUE_DEPTH.render() + LLM_RATE_LIMITED.render()
+
+register_collector(render_llm_controller)
+register_rate_limit_listener(lambda model, retry_after: _llm_controller.record_rate_limited(model, retry_after))
@@ -1,12 +1,16 @@
 from O1A_assessment.utils.get_oai_key import DEFAULT_OAI_KEY
 
+# NOTE: cost is in USD per 1M tokens, used to estimate the cost of each request.
+# `cached_prompt` applies to prompt tokens served from the provider's prefix cache.
 LLM_API_dict = {
     "gpt-4o":{
         "api_key":DEFAULT_OAI_KEY, 
         "base_url":None,
+        "cost_per_1M_tokens":{"prompt":2.50, "cached_prompt":1.25, "completion":10.00},
     },
     "gpt-4o-mini":{
         "api_key":DEFAULT_OAI_KEY, 
         "base_url":None,
+        "cost_per_1M_tokens":{"prompt":0.15, "cached_prompt":0.075, "completion":0.60},
     },
-}
\ No newline at end of file
+}
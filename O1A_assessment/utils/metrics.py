@@ -0,0 +1,353 @@
+import time
+import bisect
+import asyncio
+import functools
+import threading
+import contextlib
+import contextvars
+import collections
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from O1A_assessment.utils.llm_configs import LLM_API_dict
+from O1A_assessment.utils.token_counter import count_tokens
+
+# =============== Prometheus-style metrics ===============
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250)
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, metric_type="counter"):
+        self.name = name
+        self.help_text = help_text
+        self.metric_type = metric_type
+        self._values = collections.defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, value=1, **labels):
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] += value
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[tuple(sorted(labels.items()))] = value
+
+    def values(self):
+        with self._lock:
+            return dict(self._values)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.metric_type}"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{format_labels(labels)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    def __init__(self, name, help_text):
+        super().__init__(name, help_text, metric_type="gauge")
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self._counts = {}
+        self._sums = collections.defaultdict(float)
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            if key not in self._counts:
+                self._counts[key] = [0]*(len(self.buckets)+1)
+            self._counts[key][bisect.bisect_left(self.buckets, value)] += 1
+            self._sums[key] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, counts in sorted(self._counts.items()):
+                cumulative = 0
+                for bucket, count in zip(list(self.buckets)+["+Inf"], counts):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{format_labels(labels+(('le', bucket),))} {cumulative}")
+                lines.append(f"{self.name}_sum{format_labels(labels)} {self._sums[labels]}")
+                lines.append(f"{self.name}_count{format_labels(labels)} {cumulative}")
+        return lines
+
+
+NODE_SECONDS = Histogram("o1a_node_duration_seconds", "Wall time of each workflow stage (graph nodes and PDF preprocessing).")
+REQUEST_SECONDS = Histogram("o1a_request_duration_seconds", "Wall time of each assessment request.")
+REQUEST_COST = Histogram("o1a_request_cost_usd", "Estimated LLM cost of each assessment request in USD.", buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1))
+REQUESTS = Counter("o1a_requests_total", "Number of assessment requests.")
+LLM_CALLS = Counter("o1a_llm_calls_total", "Number of LLM calls.")
+LLM_ERRORS = Counter("o1a_llm_errors_total", "Number of LLM calls that failed after all retries.")
+LLM_HTTP_REQUESTS = Counter("o1a_llm_http_requests_total", "Number of LLM HTTP requests, including retries.")
+LLM_TOKENS = Counter("o1a_llm_tokens_total", "Number of LLM tokens.")
+LLM_COST = Counter("o1a_llm_cost_usd_total", "Estimated LLM cost in USD.")
+
+METRICS = [NODE_SECONDS, REQUEST_SECONDS, REQUEST_COST, REQUESTS, LLM_CALLS, LLM_ERRORS, LLM_HTTP_REQUESTS, LLM_TOKENS, LLM_COST]
+
+# NOTE: extra sources (e.g. queue depth, cache counters) rendered at scrape time, each returning metric lines
+_collectors = []
+
+def register_collector(collect_fn):
+    _collectors.append(collect_fn)
+
+def render_llm_retries():
+    # NOTE: each finished or failed call made one first attempt; any further HTTP request was a retry
+    lines = ["# HELP o1a_llm_retries_total Number of retried LLM HTTP requests.", "# TYPE o1a_llm_retries_total counter"]
+    calls, errors = LLM_CALLS.values(), LLM_ERRORS.values()
+    for labels, value in sorted(LLM_HTTP_REQUESTS.values().items()):
+        attempts = calls.get(labels, 0) + errors.get(labels, 0)
+        lines.append(f"o1a_llm_retries_total{format_labels(labels)} {max(value - attempts, 0)}")
+    return lines
+
+
+def render_prometheus():
+    lines = []
+    for metric in METRICS:
+        lines += metric.render()
+    lines += render_llm_retries()
+    for collect_fn in _collectors:
+        lines += collect_fn()
+    return "\n".join(lines) + "\n"
+
+
+def estimate_cost(llm_name, prompt_tokens, completion_tokens, cached_prompt_tokens=0):
+    # NOTE: cached_prompt_tokens are part of prompt_tokens, billed at the (cheaper) cached rate
+    cost = LLM_API_dict.get(llm_name, {}).get("cost_per_1M_tokens", {"prompt": 0.0, "completion": 0.0})
+    cached_rate = cost.get("cached_prompt", cost["prompt"])
+    return ((prompt_tokens-cached_prompt_tokens)*cost["prompt"] + cached_prompt_tokens*cached_rate + completion_tokens*cost["completion"]) / 1e6
+
+# =============== Per-run metrics ===============
+class RunMetrics:
+    """Latency, token, retry and cost figures of one assessment, attached to its workflows_output.jsonl entry."""
+    def __init__(self, workflow):
+        self.workflow = workflow
+        self.start_time = time.perf_counter()
+        self.wall_seconds = None
+        self.node_seconds = collections.defaultdict(list)
+        self.llm = collections.defaultdict(lambda: {"calls": 0, "errors": 0, "http_requests": 0, "prompt_tokens": 0, "cached_prompt_tokens": 0, "completion_tokens": 0})
+        self.stage_start_times = {}
+        self.hedging = {"hedged_calls": 0, "hedge_wins": 0}
+        self._lock = threading.Lock()
+
+    def record_node(self, node_name, seconds):
+        with self._lock:
+            self.node_seconds[node_name].append(seconds)
+
+    def record_llm_call(self, llm_name, prompt_tokens, completion_tokens, cached_prompt_tokens=0):
+        with self._lock:
+            self.llm[llm_name]["calls"] += 1
+            self.llm[llm_name]["prompt_tokens"] += prompt_tokens
+            self.llm[llm_name]["cached_prompt_tokens"] += cached_prompt_tokens
+            self.llm[llm_name]["completion_tokens"] += completion_tokens
+
+    def record_llm_error(self, llm_name):
+        with self._lock:
+            self.llm[llm_name]["errors"] += 1
+
+    def record_http_request(self, llm_name):
+        with self._lock:
+            self.llm[llm_name]["http_requests"] += 1
+
+    def start_stage(self, stage_name):
+        # time of the first call of a stage in this run, the start of its deadline (see tail_latency.py)
+        with self._lock:
+            return self.stage_start_times.setdefault(stage_name, time.perf_counter())
+
+    def record_hedge(self, won):
+        with self._lock:
+            self.hedging["hedged_calls"] += 1
+            self.hedging["hedge_wins"] += int(won)
+
+    def finish(self):
+        self.wall_seconds = time.perf_counter() - self.start_time
+        REQUESTS.inc(workflow=self.workflow)
+        REQUEST_SECONDS.observe(self.wall_seconds, workflow=self.workflow)
+        REQUEST_COST.observe(self.to_dict()["estimated_cost_usd"], workflow=self.workflow)
+
+    def to_dict(self):
+        with self._lock:
+            llm = {}
+            for llm_name, usage in self.llm.items():
+                llm[llm_name] = {
+                    "calls": usage["calls"],
+                    "errors": usage["errors"],
+                    "retries": max(usage["http_requests"] - usage["calls"] - usage["errors"], 0),
+                    "prompt_tokens": usage["prompt_tokens"],
+                    "cached_prompt_tokens": usage["cached_prompt_tokens"],
+                    "completion_tokens": usage["completion_tokens"],
+                    "estimated_cost_usd": estimate_cost(llm_name, usage["prompt_tokens"], usage["completion_tokens"], usage["cached_prompt_tokens"]),
+                }
+            nodes = {
+                node_name: {"count": len(seconds), "total_seconds": sum(seconds), "max_seconds": max(seconds)}
+                for node_name, seconds in self.node_seconds.items()
+            }
+            hedging = dict(self.hedging)
+        return {
+            "wall_seconds": self.wall_seconds if self.wall_seconds is not None else time.perf_counter() - self.start_time,
+            "nodes": nodes,
+            "llm": llm,
+            "prompt_tokens": sum(usage["prompt_tokens"] for usage in llm.values()),
+            "cached_prompt_tokens": sum(usage["cached_prompt_tokens"] for usage in llm.values()),
+            "completion_tokens": sum(usage["completion_tokens"] for usage in llm.values()),
+            "retries": sum(usage["retries"] for usage in llm.values()),
+            "estimated_cost_usd": sum(usage["estimated_cost_usd"] for usage in llm.values()),
+            "hedging": hedging,
+        }
+
+
+current_run_metrics = contextvars.ContextVar("current_run_metrics", default=None)
+# NOTE: tokens reported for the LLM call holding a controller slot, to reconcile its token budget (see llm_concurrency.py)
+current_llm_call_usage = contextvars.ContextVar("current_llm_call_usage", default=None)
+
+@contextlib.contextmanager
+def track_run_metrics(workflow):
+    run_metrics = RunMetrics(workflow)
+    token = current_run_metrics.set(run_metrics)
+    try:
+        yield run_metrics
+    finally:
+        try:
+            current_run_metrics.reset(token)
+        except ValueError:
+            pass # NOTE: a streaming generator closed from another context (e.g. client disconnect)
+        run_metrics.finish()
+
+
+@contextlib.contextmanager
+def time_stage(stage_name):
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start_time
+        NODE_SECONDS.observe(seconds, node=stage_name)
+        run_metrics = current_run_metrics.get()
+        if run_metrics is not None:
+            run_metrics.record_node(stage_name, seconds)
+
+
+def instrument_node(node_name, node_fn):
+    # wraps a graph node (sync or async) with a wall-time measurement
+    if asyncio.iscoroutinefunction(node_fn):
+        @functools.wraps(node_fn)
+        async def timed_node(state):
+            with time_stage(node_name):
+                return await node_fn(state)
+    else:
+        @functools.wraps(node_fn)
+        def timed_node(state):
+            with time_stage(node_name):
+                return node_fn(state)
+    return timed_node
+
+
+def record_llm_call(llm_name, prompt_tokens, completion_tokens, cached_prompt_tokens=0):
+    LLM_CALLS.inc(model=llm_name)
+    LLM_TOKENS.inc(prompt_tokens, model=llm_name, type="prompt")
+    LLM_TOKENS.inc(cached_prompt_tokens, model=llm_name, type="cached_prompt")
+    LLM_TOKENS.inc(completion_tokens, model=llm_name, type="completion")
+    LLM_COST.inc(estimate_cost(llm_name, prompt_tokens, completion_tokens, cached_prompt_tokens), model=llm_name)
+    run_metrics = current_run_metrics.get()
+    if run_metrics is not None:
+        run_metrics.record_llm_call(llm_name, prompt_tokens, completion_tokens, cached_prompt_tokens)
+    call_usage = current_llm_call_usage.get()
+    if call_usage is not None:
+        call_usage.append(prompt_tokens + completion_tokens)
+
+
+# =============== LLM instrumentation ===============
+class LLMMetricsCallback(BaseCallbackHandler):
+    """Records calls, tokens and cost of one chat model, attributed to the current run.
+
+    Provider-reported usage is preferred; a tiktoken estimate is used when the response carries none.
+    """
+    run_inline = True # NOTE: keep the caller's context so `current_run_metrics` resolves to the right run
+
+    def __init__(self, llm_name):
+        self.llm_name = llm_name
+        self._estimated_prompt_tokens = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._estimated_prompt_tokens[run_id] = sum(
+            count_tokens(str(message.content), self.llm_name) for batch in messages for message in batch
+        )
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        estimated_prompt_tokens = self._estimated_prompt_tokens.pop(run_id, 0)
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+        prompt_tokens = token_usage.get("prompt_tokens") or estimated_prompt_tokens
+        completion_tokens = token_usage.get("completion_tokens")
+        if completion_tokens is None:
+            completion_tokens = sum(
+                count_tokens(str(generation.message.additional_kwargs or generation.text), self.llm_name)
+                for generations in response.generations for generation in generations
+            )
+        # NOTE: prompt tokens served from the provider's prefix cache (see benchmarks/prompt_prefix_report.py)
+        cached_prompt_tokens = (token_usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+        record_llm_call(self.llm_name, prompt_tokens, completion_tokens, cached_prompt_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._estimated_prompt_tokens.pop(run_id, None)
+        record_llm_error(self.llm_name)
+
+
+def build_instrumented_http_clients(llm_name):
+    # every HTTP attempt passes the request hook, so retries = attempts - completed calls
+    import openai
+
+    def on_request(request):
+        record_http_request(llm_name)
+
+    async def aon_request(request):
+        record_http_request(llm_name)
+
+    # NOTE: 429s are seen here, even when the OpenAI client retries them internally
+    def on_response(response):
+        if response.status_code==429:
+            record_rate_limited(llm_name, response.headers)
+
+    async def aon_response(response):
+        on_response(response)
+
+    http_client = openai.DefaultHttpxClient(event_hooks={"request": [on_request], "response": [on_response]})
+    http_async_client = openai.DefaultAsyncHttpxClient(event_hooks={"request": [aon_request], "response": [aon_response]})
+    return http_client, http_async_client
+
+
+def record_llm_error(llm_name):
+    LLM_ERRORS.inc(model=llm_name)
+    run_metrics = current_run_metrics.get()
+    if run_metrics is not None:
+        run_metrics.record_llm_error(llm_name)
+
+
+# NOTE: react to provider rate limits (e.g. the LLM concurrency controller), called with (llm_name, retry-after seconds or None)
+_rate_limit_listeners = []
+
+def register_rate_limit_listener(listener_fn):
+    _rate_limit_listeners.append(listener_fn)
+
+def record_rate_limited(llm_name, headers):
+    from O1A_assessment.utils.llm_concurrency import parse_retry_after
+    retry_after = parse_retry_after(headers)
+    for listener_fn in _rate_limit_listeners:
+        listener_fn(llm_name, retry_after)
+
+
+def record_http_request(llm_name):
+    LLM_HTTP_REQUESTS.inc(model=llm_name)
+    run_metrics = current_run_metrics.get()
+    if run_metrics is not None:
+        run_metrics.record_http_request(llm_name)
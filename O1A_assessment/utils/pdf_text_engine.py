@@ -0,0 +1,123 @@
+import os
+import math
+import hashlib
+import threading
+import multiprocessing
+import collections
+import concurrent.futures
+
+
+class PDFLimitError(ValueError):
+    pass
+
+
+def open_pdf(pdf_bytes):
+    import fitz
+    return fitz.open(stream=pdf_bytes, filetype="pdf")
+
+
+def extract_page_range(pdf_bytes, start, end):
+    # runs in a worker process for long documents; every worker opens its own copy of the document
+    with open_pdf(pdf_bytes) as doc:
+        return [doc[page_number].get_text() for page_number in range(start, end)]
+
+
+def get_worker_mp_context():
+    # NOTE: never fork, worker pools are created from multi-threaded processes (held locks would be inherited)
+    start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return multiprocessing.get_context(start_method)
+
+
+def check_page_limit(num_pages, max_pages):
+    if max_pages is not None and num_pages > max_pages:
+        raise PDFLimitError(f"PDF has {num_pages} pages, the limit is {max_pages} pages.")
+
+
+class PDFTextEngine:
+    """Extracts resume text with PyMuPDF directly, caching it by the SHA-256 of the PDF bytes.
+
+    Documents with at least `parallel_min_pages` pages are split into page ranges extracted by a process pool.
+    The text is identical to `pdf_to_text_ver_basic`: every page prefixed with a newline.
+    """
+    def __init__(self, max_cache_entries=256, parallel_min_pages=16, num_workers=None):
+        self.max_cache_entries = max_cache_entries
+        self.parallel_min_pages = parallel_min_pages
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.counters = {"hit": 0, "miss": 0}
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.num_workers, mp_context=get_worker_mp_context())
+            return self._pool
+
+    def _cache_get(self, key):
+        # returns (page count, text), None on a miss
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+            self.counters["hit" if cached is not None else "miss"] += 1
+            return cached
+
+    def _cache_put(self, key, num_pages, text):
+        with self._lock:
+            self._cache[key] = (num_pages, text)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_cache_entries:
+                self._cache.popitem(last=False)
+
+    def _extract_pages_in_parallel(self, pdf_bytes, num_pages):
+        pages_per_task = math.ceil(num_pages / self.num_workers)
+        page_ranges = [(start, min(start + pages_per_task, num_pages)) for start in range(0, num_pages, pages_per_task)]
+        pool = self._get_pool()
+        futures = [pool.submit(extract_page_range, pdf_bytes, start, end) for start, end in page_ranges]
+        return [page_text for future in futures for page_text in future.result()]
+
+    def extract_text(self, pdf_path=None, pdf_bytes=None, max_pages=None, parallel=True):
+        if pdf_bytes is None:
+            with open(pdf_path, 'rb') as file:
+                pdf_bytes = file.read()
+        key = hashlib.sha256(pdf_bytes).hexdigest()
+        cached = self._cache_get(key)
+        if cached is not None:
+            # NOTE: the text may have been cached by a caller without a page limit, so the limit is checked on hits too
+            check_page_limit(cached[0], max_pages)
+            return cached[1]
+        with open_pdf(pdf_bytes) as doc:
+            num_pages = doc.page_count
+            check_page_limit(num_pages, max_pages)
+            use_pool = parallel and self.num_workers > 1 and num_pages >= self.parallel_min_pages
+            page_texts = None if use_pool else [page.get_text() for page in doc]
+        if use_pool:
+            page_texts = self._extract_pages_in_parallel(pdf_bytes, num_pages)
+        # NOTE: a single join instead of repeated `+=`, so long documents are copied once
+        text = "".join("\n" + page_text for page_text in page_texts)
+        self._cache_put(key, num_pages, text)
+        return text
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+
+
+# NOTE: shared by every workflow in the process
+pdf_text_engine = PDFTextEngine()
+
+def configure_pdf_text_engine(max_cache_entries=256, parallel_min_pages=16, num_workers=None):
+    global pdf_text_engine
+    pdf_text_engine.shutdown()
+    pdf_text_engine = PDFTextEngine(max_cache_entries, parallel_min_pages, num_workers)
+    return pdf_text_engine
+
+def get_pdf_text_engine():
+    return pdf_text_engine
@@ -1,9 +1,11 @@
 import os
-from llama_index.readers.file import PyMuPDFReader 
-#NOTE: require llama_index==0.10.4 or >=0.10.20
+from O1A_assessment.utils.pdf_text_engine import PDFLimitError, get_pdf_text_engine
 
 # extract_pdf_pages
 def extract_pdf_pages(file_path):
+    # NOTE: llama_index is slow to import, so it is only loaded when the first PDF is read.
+    from llama_index.readers.file import PyMuPDFReader 
+    #NOTE: require llama_index==0.10.4 or >=0.10.20
     print(f"Reading PDF from {file_path}.")
     reader = PyMuPDFReader()
     pages = reader.load(file_path)
@@ -12,12 +14,25 @@ def extract_pdf_pages(file_path):
 # convert pages to text chunk
 def pages_to_text_chunk(pages, prepend="", page_template="\n{text}"):
     content = "{prepend}".format(prepend=prepend)
-    for _, page in enumerate(pages):
-      content += page_template.format(text=page.text)
+    content += "".join(page_template.format(text=page.text) for page in pages)
     return(content)
 
 def pdf_to_text_ver_basic(pdf_path):
     assert os.path.isfile(pdf_path)
     pages = extract_pdf_pages(pdf_path)
     text = pages_to_text_chunk(pages)
-    return text
\ No newline at end of file
+    return text
+
+
+# PyMuPDF directly: pages extracted in parallel for long documents, text cached by file hash
+def pdf_to_text_ver_fast(pdf_path, parallel=True):
+    assert os.path.isfile(pdf_path)
+    print(f"Reading PDF from {pdf_path}.")
+    return get_pdf_text_engine().extract_text(pdf_path=pdf_path, parallel=parallel)
+
+# same text as pdf_to_text_ver_basic, read from in-memory bytes (no temp file)
+def pdf_bytes_to_text(pdf_bytes, max_bytes=None, max_pages=None):
+    if max_bytes is not None and len(pdf_bytes) > max_bytes:
+        raise PDFLimitError(f"PDF is {len(pdf_bytes)} bytes, the limit is {max_bytes} bytes.")
+    print(f"Reading PDF from {len(pdf_bytes)} bytes in memory.")
+    return get_pdf_text_engine().extract_text(pdf_bytes=pdf_bytes, max_pages=max_pages)
@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+
+
+def hash_file(file_path, chunk_size=1<<20):
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def make_cache_key(*parts):
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Content-addressed store of `workflows_output.jsonl` entries.
+
+    Entries are evicted when older than `max_age_seconds`, or least-recently-used first
+    once the cache holds more than `max_entries` entries or `max_bytes` bytes.
+    Concurrent `get_or_run` calls with the same key share one in-flight run.
+    """
+    def __init__(self, db_path, max_entries=10000, max_bytes=512*(1<<20), max_age_seconds=30*24*3600):
+        self.db_path = os.path.abspath(db_path)
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.counters = {"hit": 0, "miss": 0, "coalesced": 0, "evicted": 0}
+        self.in_flight = {}
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " key TEXT PRIMARY KEY,"
+                " entry TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_last_access ON results (last_access)")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT entry, created_at FROM results WHERE key=?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.max_age_seconds:
+                conn.execute("DELETE FROM results WHERE key=?", (key,))
+                self.counters["evicted"] += 1
+                return None
+            conn.execute("UPDATE results SET last_access=? WHERE key=?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, key, entry):
+        now = time.time()
+        entry = json.dumps(entry, ensure_ascii=False)
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, entry, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, entry, len(entry), now, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        evicted = conn.execute("DELETE FROM results WHERE created_at < ?", (now - self.max_age_seconds,)).rowcount
+        num_entries, num_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        if num_entries > self.max_entries or num_bytes > self.max_bytes:
+            # drop least recently used entries until both limits hold
+            for key, size in conn.execute("SELECT key, size FROM results ORDER BY last_access").fetchall():
+                if num_entries <= self.max_entries and num_bytes <= self.max_bytes:
+                    break
+                conn.execute("DELETE FROM results WHERE key=?", (key,))
+                num_entries -= 1
+                num_bytes -= size
+                evicted += 1
+        self.counters["evicted"] += evicted
+
+    async def _join_in_flight(self, future):
+        # entry of the leading run, None if the leader was cancelled; a cancellation of this request itself is raised
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if future.cancelled():
+                return None
+            raise
+
+    async def get_or_run(self, key, run_fn, should_store=None):
+        """Return `(entry, cache_status)` where cache_status is "hit", "coalesced" or "miss".
+
+        `run_fn` is an async callable returning the entry to store on a miss; entries rejected by
+        `should_store(entry)` (e.g. degraded results) are returned but not stored.
+        """
+        while True:
+            if key in self.in_flight:
+                entry = await self._join_in_flight(self.in_flight[key])
+                if entry is None:
+                    continue # NOTE: the leading request was cancelled (e.g. client disconnect), run or join again
+                self.counters["coalesced"] += 1
+                return entry, "coalesced"
+            entry = await asyncio.to_thread(self.get, key)
+            if entry is not None:
+                self.counters["hit"] += 1
+                return entry, "hit"
+            if key not in self.in_flight: # NOTE: otherwise started while we were reading the store, join it
+                break
+
+        self.counters["miss"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        try:
+            entry = await run_fn()
+            if should_store is None or should_store(entry):
+                await asyncio.to_thread(self.put, key, entry)
+            future.set_result(entry)
+        except asyncio.CancelledError:
+            future.cancel() # NOTE: waiters re-run instead of failing with this request's cancellation
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception() # NOTE: mark as retrieved when nobody else is waiting
+            raise
+        finally:
+            del self.in_flight[key]
+        return entry, "miss"
+
+    def stats(self):
+        with self._connect() as conn:
+            num_entries, num_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results").fetchone()
+        lookups = self.counters["hit"] + self.counters["miss"] + self.counters["coalesced"]
+        return {
+            **self.counters,
+            "hit_ratio": (self.counters["hit"] + self.counters["coalesced"]) / lookups if lookups else 0.0,
+            "entries": num_entries,
+            "bytes": num_bytes,
+            "in_flight": len(self.in_flight),
+        }
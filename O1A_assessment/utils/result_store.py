@@ -0,0 +1,231 @@
+import os
+import abc
+import json
+import time
+import zlib
+import shutil
+import sqlite3
+import datetime
+import threading
+
+# NOTE: columns a listing can filter on
+RESULT_FILTERS = ["workflow", "rating", "content_hash"]
+
+
+def parse_run_timestamp(run_id):
+    # run ids from `create_unique_id` start with `%Y%m%d_%H%M%S`
+    try:
+        return datetime.datetime.strptime(run_id[:15], '%Y%m%d_%H%M%S').timestamp()
+    except ValueError:
+        return None
+
+
+def compress_json(value):
+    return zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"), 6)
+
+
+def decompress_json(blob):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+class ResultStore(abc.ABC):
+    """Interface of a result store backend: an index of finished assessments by run id.
+
+    `put` may buffer writes; `get` and `list` see buffered entries once they are flushed (`get` sees them at once).
+    """
+    @abc.abstractmethod
+    def put(self, run_id, entry, content_hash=None, run_dir=None, created_at=None):
+        pass
+
+    @abc.abstractmethod
+    def get(self, run_id, include_contents=True):
+        pass
+
+    @abc.abstractmethod
+    def list(self, workflow=None, rating=None, content_hash=None, since=None, until=None, limit=50, offset=0):
+        pass
+
+    @abc.abstractmethod
+    def apply_retention(self):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class SQLiteResultStore(ResultStore):
+    """SQLite result store; `contents` (the resume text) is zlib-compressed, the rest of the entry is kept as JSON.
+
+    Writes are buffered and committed `batch_size` at a time (or every `flush_seconds`).
+    Retention drops runs older than `max_age_seconds` and the oldest runs beyond `max_entries`,
+    and with `remove_run_dirs` also deletes their run directory (`results/<run_id>/`).
+    """
+    def __init__(self, db_path, max_age_seconds=None, max_entries=None, remove_run_dirs=False, batch_size=32, flush_seconds=1.0):
+        self.db_path = os.path.abspath(db_path)
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.max_age_seconds = max_age_seconds
+        self.max_entries = max_entries
+        self.remove_run_dirs = remove_run_dirs
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.counters = {"written": 0, "flushes": 0, "expired": 0}
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._timer = None
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS runs ("
+                " run_id TEXT PRIMARY KEY,"
+                " content_hash TEXT,"
+                " workflow TEXT NOT NULL,"
+                " rating TEXT,"
+                " created_at REAL NOT NULL,"
+                " run_dir TEXT,"
+                " entry TEXT NOT NULL,"
+                " contents BLOB NOT NULL,"
+                " size INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS runs_created_at ON runs (created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS runs_content_hash ON runs (content_hash, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS runs_workflow ON runs (workflow, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS runs_rating ON runs (rating, created_at)")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _make_row(self, run_id, entry, content_hash, run_dir, created_at):
+        entry = dict(entry)
+        contents = compress_json(entry.pop("contents", []))
+        entry_json = json.dumps(entry, ensure_ascii=False)
+        return (
+            run_id,
+            content_hash,
+            entry.get("workflow", "default"),
+            entry.get("judgement_summary_dict", {}).get("Rating"),
+            created_at if created_at is not None else time.time(),
+            run_dir,
+            entry_json,
+            contents,
+            len(entry_json) + len(contents),
+        )
+
+    def put(self, run_id, entry, content_hash=None, run_dir=None, created_at=None):
+        row = self._make_row(run_id, entry, content_hash, run_dir, created_at)
+        with self._lock:
+            self._pending[run_id] = row
+            num_pending = len(self._pending)
+            if num_pending < self.batch_size and self._timer is None:
+                self._timer = threading.Timer(self.flush_seconds, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        if num_pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                rows = list(self._pending.values())
+                self._pending = {}
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not rows:
+                return 0
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO runs (run_id, content_hash, workflow, rating, created_at, run_dir, entry, contents, size)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+            self.counters["written"] += len(rows)
+            self.counters["flushes"] += 1
+        self.apply_retention()
+        return len(rows)
+
+    def _row_to_entry(self, row, include_contents):
+        entry = json.loads(row["entry"])
+        if include_contents:
+            entry["contents"] = decompress_json(row["contents"])
+        return {
+            "run_id": row["run_id"],
+            "content_hash": row["content_hash"],
+            "created_at": row["created_at"],
+            "entry": entry,
+        }
+
+    def get(self, run_id, include_contents=True):
+        with self._lock:
+            pending = self._pending.get(run_id)
+        if pending is not None:
+            columns = ["run_id", "content_hash", "workflow", "rating", "created_at", "run_dir", "entry", "contents", "size"]
+            return self._row_to_entry(dict(zip(columns, pending)), include_contents)
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM runs WHERE run_id=?", (run_id,)).fetchone()
+        return None if row is None else self._row_to_entry(row, include_contents)
+
+    def list(self, workflow=None, rating=None, content_hash=None, since=None, until=None, limit=50, offset=0):
+        # newest first; index columns only, fetch an entry with `get`
+        conditions, params = [], []
+        for column, value in zip(RESULT_FILTERS, [workflow, rating, content_hash]):
+            if value is not None:
+                conditions.append(f"{column}=?")
+                params.append(value)
+        if since is not None:
+            conditions.append("created_at>=?")
+            params.append(since)
+        if until is not None:
+            conditions.append("created_at<?")
+            params.append(until)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT run_id, content_hash, workflow, rating, created_at, size FROM runs{where} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def apply_retention(self):
+        if self.max_age_seconds is None and self.max_entries is None:
+            return 0
+        with self._connect() as conn:
+            expired = []
+            if self.max_age_seconds is not None:
+                expired += conn.execute("SELECT run_id, run_dir FROM runs WHERE created_at < ?", (time.time() - self.max_age_seconds,)).fetchall()
+            if self.max_entries is not None:
+                expired += conn.execute("SELECT run_id, run_dir FROM runs ORDER BY created_at DESC LIMIT -1 OFFSET ?", (self.max_entries,)).fetchall()
+            expired = {row["run_id"]: row["run_dir"] for row in expired}
+            conn.executemany("DELETE FROM runs WHERE run_id=?", [(run_id,) for run_id in expired])
+        if self.remove_run_dirs:
+            for run_dir in expired.values():
+                if run_dir and os.path.isdir(run_dir):
+                    shutil.rmtree(run_dir, ignore_errors=True)
+        self.counters["expired"] += len(expired)
+        return len(expired)
+
+    def stats(self):
+        with self._connect() as conn:
+            num_runs, num_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM runs").fetchone()
+        with self._lock:
+            num_pending = len(self._pending)
+        return {**self.counters, "runs": num_runs, "bytes": num_bytes, "pending": num_pending}
+
+    def close(self):
+        self.flush()
+
+
+# NOTE: backends by name, selected with --result_store_backend
+RESULT_STORE_BACKENDS = {
+    "sqlite": SQLiteResultStore,
+}
+
+def create_result_store(backend="sqlite", **kwargs):
+    if backend not in RESULT_STORE_BACKENDS:
+        raise ValueError(f"[result_store.py] unknown result store backend: {backend}")
+    return RESULT_STORE_BACKENDS[backend](**kwargs)
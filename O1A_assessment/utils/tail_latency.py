@@ -0,0 +1,227 @@
+import time
+import asyncio
+import threading
+import contextvars
+import collections
+import concurrent.futures
+
+from O1A_assessment.utils.metrics import Counter, current_run_metrics, register_collector
+from O1A_assessment.utils.llm_concurrency import get_llm_controller
+
+# =============== Deadline Config ===============
+# NOTE: seconds per stage, counted from the first LLM call of that stage in a run; None disables.
+# Summarization is local (no LLM call) and has no deadline.
+stage_deadlines = {"extraction": None, "judging": None}
+
+# =============== Hedging Config ===============
+# NOTE: a call still running after the `hedge_percentile` latency of its kind (chain) gets a duplicate; the first answer wins.
+# Hedge keys are (model, chain id); a duplicate is only sent while the model has a free concurrency slot.
+hedging_enabled = False
+hedge_percentile = 95
+hedge_min_samples = 20 # NOTE: no hedging until this many latencies of the kind were observed
+hedge_window = 200
+guard_max_workers = 64 # NOTE: sync calls under a deadline or hedge run on this pool, so they can be abandoned
+
+LLM_HEDGES = Counter("o1a_llm_hedges_total", "Number of hedged LLM calls by outcome (won: the duplicate answered first).")
+DEADLINES_EXCEEDED = Counter("o1a_stage_deadlines_exceeded_total", "Number of LLM calls abandoned at their stage deadline.")
+register_collector(lambda: LLM_HEDGES.render() + DEADLINES_EXCEEDED.render())
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+def configure_tail_latency(extraction_deadline=None, judging_deadline=None, hedging=False, percentile=95):
+    global hedging_enabled, hedge_percentile
+    stage_deadlines.update({"extraction": extraction_deadline, "judging": judging_deadline})
+    hedging_enabled, hedge_percentile = hedging, percentile
+
+
+class LatencyWindow:
+    """Recent latencies of one kind of call, for the hedge delay."""
+    def __init__(self, size=hedge_window):
+        self._latencies = collections.deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def percentile(self, percentile):
+        with self._lock:
+            if len(self._latencies) < hedge_min_samples:
+                return None
+            latencies = sorted(self._latencies)
+        return latencies[min(len(latencies)-1, int(len(latencies)*percentile/100))]
+
+
+_latency_windows = collections.defaultdict(LatencyWindow)
+
+def get_hedge_delay(hedge_key):
+    if hedge_key is None or not hedging_enabled:
+        return None
+    return _latency_windows[hedge_key].percentile(hedge_percentile)
+
+
+def get_stage_deadline(stage):
+    # absolute `time.perf_counter()` deadline of the stage in the current run, None if unset
+    budget = stage_deadlines.get(stage)
+    if budget is None:
+        return None
+    run_metrics = current_run_metrics.get()
+    start_time = run_metrics.start_stage(stage) if run_metrics is not None else time.perf_counter()
+    return start_time + budget
+
+
+class GuardedCall:
+    """Deadline and hedge bookkeeping of one call, shared by the sync and async drivers.
+
+    Latency is counted from `mark_started` (the call got its concurrency slot, see `invoke_llm`),
+    so calls waiting in the controller's queue are neither hedged nor counted as slow.
+    Once the call is given up (deadline, or another attempt answered), attempts that have not sent
+    their request yet raise instead of making a paid call.
+    """
+    def __init__(self, stage, hedge_key):
+        self.stage = stage
+        self.hedge_key = hedge_key
+        self.start_time = None
+        self.deadline = get_stage_deadline(stage)
+        self.hedge_delay = get_hedge_delay(hedge_key)
+        self.hedged = False
+        self.abandoned = False
+
+    def ensure_live(self):
+        if self.abandoned or (self.deadline is not None and time.perf_counter() >= self.deadline):
+            raise DeadlineExceeded(f"{self.stage} call abandoned before its request was sent")
+
+    def run_attempt(self, call_fn):
+        self.ensure_live() # NOTE: an attempt queued in the guard executor starts late, check before waiting for a slot
+        return call_fn(self.mark_started)
+
+    def mark_started(self):
+        self.ensure_live() # NOTE: the slot came after the call was given up; raising releases it right away
+        if self.start_time is None:
+            self.start_time = time.perf_counter()
+
+    def is_guarded(self):
+        return self.deadline is not None or self.hedge_delay is not None
+
+    def next_timeout(self):
+        # seconds until the next event (hedge or deadline), None: wait for an answer
+        now = time.perf_counter()
+        timeouts = []
+        if self.deadline is not None:
+            timeouts.append(self.deadline - now)
+        if not self.hedged and self.hedge_delay is not None:
+            # NOTE: while queued, check again after one hedge delay
+            timeouts.append(self.hedge_delay if self.start_time is None else self.start_time + self.hedge_delay - now)
+        return max(min(timeouts), 0.0) if timeouts else None
+
+    def should_hedge(self):
+        if self.hedged or self.hedge_delay is None or self.start_time is None:
+            return False
+        if time.perf_counter() - self.start_time < self.hedge_delay:
+            return False
+        if not get_llm_controller().has_spare_capacity(self.hedge_key[0]):
+            self.hedged = True # NOTE: no spare capacity, give up on hedging this call
+            return False
+        return True
+
+    def check_deadline(self):
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            DEADLINES_EXCEEDED.inc(stage=self.stage)
+            raise DeadlineExceeded(f"{self.stage} deadline of {stage_deadlines[self.stage]}s exceeded")
+
+    def finish(self, won_by_hedge):
+        if self.hedge_key is not None and self.start_time is not None:
+            _latency_windows[self.hedge_key].observe(time.perf_counter() - self.start_time)
+        if self.hedged:
+            LLM_HEDGES.inc(outcome="won" if won_by_hedge else "lost")
+            run_metrics = current_run_metrics.get()
+            if run_metrics is not None:
+                run_metrics.record_hedge(won_by_hedge)
+
+
+def pick_answer(done, attempts):
+    # first successful attempt among `done` (as (result, index)), None if all failed
+    for attempt in sorted(done, key=attempts.index):
+        if attempt.exception() is None:
+            return attempt.result(), attempts.index(attempt)
+    return None
+
+
+_guard_executor = None
+_guard_executor_lock = threading.Lock()
+
+def get_guard_executor():
+    global _guard_executor
+    with _guard_executor_lock:
+        if _guard_executor is None:
+            _guard_executor = concurrent.futures.ThreadPoolExecutor(max_workers=guard_max_workers, thread_name_prefix="llm-guard")
+        return _guard_executor
+
+
+def run_guarded(call_fn, stage=None, hedge_key=None):
+    # call_fn(mark_started) under the stage deadline, hedged once if slow; abandoned sync calls finish in the background
+    guard = GuardedCall(stage, hedge_key)
+    if not guard.is_guarded():
+        result = call_fn(guard.mark_started)
+        guard.finish(won_by_hedge=False)
+        return result
+    guard.check_deadline() # NOTE: no call once the stage is over
+    executor = get_guard_executor()
+    attempts = [executor.submit(contextvars.copy_context().run, guard.run_attempt, call_fn)]
+    pending = set(attempts)
+    try:
+        while True:
+            done, pending = concurrent.futures.wait(pending, timeout=guard.next_timeout(), return_when=concurrent.futures.FIRST_COMPLETED)
+            answer = pick_answer(done, attempts)
+            if answer is not None:
+                guard.finish(won_by_hedge=answer[1] > 0)
+                return answer[0]
+            if not pending:
+                return attempts[0].result() # NOTE: every attempt failed, raise the first error
+            guard.check_deadline()
+            if guard.should_hedge():
+                guard.hedged = True
+                attempt = executor.submit(contextvars.copy_context().run, guard.run_attempt, call_fn)
+                attempts.append(attempt)
+                pending.add(attempt)
+    finally:
+        # NOTE: queued attempts are cancelled; one already waiting for a slot or a response bails out at `mark_started` or finishes in the background
+        guard.abandoned = True
+        for attempt in attempts:
+            if not attempt.done():
+                attempt.cancel()
+
+
+async def arun_guarded(call_fn, stage=None, hedge_key=None):
+    # await call_fn(mark_started) under the stage deadline, hedged once if slow; the losing attempt is cancelled
+    guard = GuardedCall(stage, hedge_key)
+    if not guard.is_guarded():
+        result = await call_fn(guard.mark_started)
+        guard.finish(won_by_hedge=False)
+        return result
+    guard.check_deadline()
+    attempts = [asyncio.ensure_future(call_fn(guard.mark_started))]
+    pending = set(attempts)
+    try:
+        while True:
+            done, pending = await asyncio.wait(pending, timeout=guard.next_timeout(), return_when=asyncio.FIRST_COMPLETED)
+            answer = pick_answer(done, attempts)
+            if answer is not None:
+                guard.finish(won_by_hedge=answer[1] > 0)
+                return answer[0]
+            if not pending:
+                return attempts[0].result()
+            guard.check_deadline()
+            if guard.should_hedge():
+                guard.hedged = True
+                attempt = asyncio.ensure_future(call_fn(guard.mark_started))
+                attempts.append(attempt)
+                pending.add(attempt)
+    finally:
+        guard.abandoned = True
+        for attempt in attempts:
+            if not attempt.done():
+                attempt.cancel()
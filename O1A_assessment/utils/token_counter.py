@@ -0,0 +1,46 @@
+import functools
+import threading
+import tiktoken
+from langchain_core.callbacks import BaseCallbackHandler
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoding(model_name):
+    try:
+        return tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        # NOTE: gpt-4o family uses o200k_base; older tiktoken releases may not know the model name.
+        return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # NOTE: tiktoken downloads its BPE files on first use, which fails on offline hosts.
+        print(f"[token_counter.py] Could not load tokenizer for {model_name}, using approximate counts: {e!r}")
+        return None
+
+
+def count_tokens(text, model_name="gpt-4o-mini"):
+    if not text:
+        return 0
+    encoding = get_encoding(model_name)
+    if encoding is None:
+        return max(1, len(text)//4)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """Accumulates provider-reported token usage of every LLM call it is attached to."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.llm_calls = 0
+
+    def on_llm_end(self, response, **kwargs):
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+        with self._lock:
+            self.llm_calls += 1
+            self.prompt_tokens += token_usage.get("prompt_tokens", 0) or 0
+            self.completion_tokens += token_usage.get("completion_tokens", 0) or 0
+
+    @property
+    def total_tokens(self):
+        return self.prompt_tokens + self.completion_tokens